@@ -0,0 +1,5 @@
+# # BEPMAT benchmarks
+# Offline benchmarks of BEPMAT on a synthetic GAEZ-like dataset, run with python -m benchmarks (see __main__.py).
+
+from .synthetic import generate_dataset
+from .run import run_benchmarks, compare_results, print_comparison
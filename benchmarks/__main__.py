@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # BEPMAT benchmarks
+
+# ### Command line
+# Run from the folder of bepmat_core.py:
+#
+#     python -m benchmarks --output results.json                          # time every stage at every scale
+#     python -m benchmarks --scales small country --baseline baseline.json
+#
+# The synthetic dataset is generated in --data-dir on the first run (about 40 MB for the default bounds and scenarios)
+# and reused afterwards. With --baseline the timings are compared with the ones of a previous run and the command
+# exits with an error when a stage got slower than the tolerance; --save-baseline writes the timings of this run as the
+# new baseline.
+
+# In[ ]:
+
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+from .synthetic import generate_dataset, all_rcps, all_time_periods
+from .run import run_benchmarks, compare_results, print_comparison, scale_regions, stage_names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Offline benchmarks of BEPMAT')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'bepmat-benchmark-data'),
+                        help='folder of the synthetic dataset, generated if needed')
+    parser.add_argument('--scales', nargs='+', choices=list(scale_regions), default=list(scale_regions))
+    parser.add_argument('--stages', nargs='+', choices=stage_names, default=stage_names)
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs of each stage (default: 3)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes of the graph_plotter sweeps (default: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic dataset')
+    parser.add_argument('--output', help='JSON file of the timings')
+    parser.add_argument('--baseline', help='JSON file of the timings to compare with')
+    parser.add_argument('--save-baseline', help='JSON file to save the timings of this run to, as a new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='slowdown allowed before failing, as a fraction of the baseline time (default: 0.25)')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='slowdown in seconds below which a stage never fails (default: 0.05)')
+    args = parser.parse_args(argv)
+
+    print(f"Generating the synthetic dataset in {args.data_dir}")
+    generate_dataset(args.data_dir, rcps=all_rcps, time_periods=all_time_periods, seed=args.seed)
+
+    results = run_benchmarks(args.data_dir, args.scales, args.stages, args.repeat, args.workers)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('dataset') != results['dataset']:
+        print("Warning: the baseline was run on a different synthetic dataset", file=sys.stderr)
+
+    comparison = compare_results(results, baseline, args.tolerance, args.min_seconds)
+    print_comparison(comparison)
+    regressions = [row for row in comparison if row['regression']]
+    if regressions:
+        print(f"PERFORMANCE REGRESSION: {len(regressions)} stage(s) are more than {args.tolerance:.0%} slower than "
+              f"the baseline {args.baseline}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
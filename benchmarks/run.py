@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # BEPMAT benchmarks
+
+# ### Timing the stages of BEPMAT
+# run_benchmarks times every stage of BEPMAT on the synthetic dataset (see synthetic.py) for regions of three sizes:
+# a small region of 2x2 degrees, a country of 10x10 degrees and a continent. Each stage is run once to warm up the
+# file system cache and then `repeat` times on a new RegionGrid, so that the layers memoized on the region are read
+# again as in a fresh run. The graph_plotter_* sweeps are timed through run_scenarios, which does all their
+# computation, without drawing the plots. The timings are returned as a dictionary which is saved as JSON, and
+# compare_results checks them against the timings of a baseline.
+
+# In[ ]:
+
+
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+
+import numpy as np
+import geopandas as gpd
+import rasterio
+from shapely.geometry import Polygon
+
+import bepmat_core as core
+
+
+# Regions of the three scales inside the default bounds of the synthetic dataset
+scale_regions = {
+    'small': Polygon([(30.0, 0.0), (32.0, 0.2), (31.8, 2.0), (30.1, 1.9)]),
+    'country': Polygon([(25.0, -5.0), (35.0, -4.0), (34.0, 5.0), (26.0, 4.5)]),
+    'continent': Polygon([(-17.0, 14.0), (10.0, 37.0), (33.0, 31.0), (51.0, 11.0), (40.0, -15.0), (20.0, -34.5),
+                          (10.0, -10.0), (-5.0, 4.0)]),
+}
+
+stage_names = ['region_grid', 'biomass_potential_past', 'future_potential_cropland', 'find_max_for_each_pixel',
+               'get_biomass_potential_for_marginal', 'graph_plotter_cropland', 'graph_plotter_marginal',
+               'graph_plotter_all']
+
+default_scenario = {'time_period': '2041-2070', 'climate_model': 'GFDL-ESM2M', 'rcp': 'RCP4.5',
+                    'water_supply_future': 'Irr', 'input_level': 'High', 'water_supply_2010': 'Total'}
+
+
+def region_shapefile(scale):
+    return gpd.GeoDataFrame({'NAME_0': [scale]}, geometry=[scale_regions[scale]], crs='EPSG:4326')
+
+
+# Every stage is a function of the shapefile and of a new RegionGrid of it
+def stage_functions(scenario, max_workers=1):
+    time_period, climate_model, rcp = scenario['time_period'], scenario['climate_model'], scenario['rcp']
+    water_supply_future, input_level = scenario['water_supply_future'], scenario['input_level']
+    water_supply_2010 = scenario['water_supply_2010']
+
+    def find_max(shapefile, region):
+        excluded_pixels = core.build_exclusion_mask(region, time_period, rcp)
+        return core.find_max_for_each_pixel(time_period, climate_model, rcp, water_supply_future, input_level,
+                                            shapefile, excluded_pixels, region)
+
+    def sweep(land_types):
+        return lambda shapefile, region: core.run_scenarios(region, climate_model, water_supply_future=water_supply_future,
+                                                            input_level=input_level, water_supply_2010=water_supply_2010,
+                                                            land_types=land_types, max_workers=max_workers)
+
+    return {
+        'region_grid': lambda shapefile, region: core.RegionGrid(shapefile),
+        'biomass_potential_past': lambda shapefile, region: core.biomass_potential_past(shapefile, 2010, 'Total', region),
+        'future_potential_cropland': lambda shapefile, region: core.future_potential_cropland(
+            time_period, climate_model, rcp, water_supply_future, input_level, shapefile, water_supply_2010, region),
+        'find_max_for_each_pixel': find_max,
+        'get_biomass_potential_for_marginal': lambda shapefile, region: core.get_biomass_potential_for_marginal(
+            shapefile, time_period, climate_model, rcp, water_supply_future, input_level, region),
+        'graph_plotter_cropland': sweep(('cropland',)),
+        'graph_plotter_marginal': sweep(('marginal',)),
+        'graph_plotter_all': sweep(('cropland', 'marginal')),
+    }
+
+
+def time_stage(function, shapefile, repeat):
+    function(shapefile, core.RegionGrid(shapefile))
+
+    runs = []
+    for _ in range(repeat):
+        region = core.RegionGrid(shapefile)
+        start = time.perf_counter()
+        function(shapefile, region)
+        runs.append(time.perf_counter() - start)
+    return {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def environment():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'numpy': np.__version__, 'rasterio': rasterio.__version__, 'gdal': rasterio.__gdal_version__}
+
+
+def run_benchmarks(data_dir, scales=('small', 'country', 'continent'), stages=None, repeat=3, max_workers=1,
+                   scenario=None, log=print):
+    scenario = dict(default_scenario, **(scenario or {}))
+    functions = stage_functions(scenario, max_workers)
+    stages = stages or stage_names
+
+    # The scenarios are always computed, never read back from a results store
+    core.set_data_dir(data_dir)
+    core.result_store = None
+    with open(os.path.join(data_dir, 'dataset.json')) as f:
+        dataset = json.load(f)
+
+    results = {}
+    for scale in scales:
+        shapefile = region_shapefile(scale)
+        results[scale] = {}
+        for stage in stages:
+            results[scale][stage] = time_stage(functions[stage], shapefile, repeat)
+            log(f"{scale:>10} {stage:<36} {results[scale][stage]['median']:9.3f} s")
+
+    return {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(), 'dataset': dataset,
+            'scenario': scenario, 'repeat': repeat, 'max_workers': max_workers, 'results': results}
+
+
+# The stages whose median time grew by more than the tolerance (as a fraction of the baseline time) and by more than
+# min_seconds, to ignore the noise on the fastest stages
+def compare_results(results, baseline, tolerance=0.25, min_seconds=0.05):
+    comparison = []
+    for scale, stages in results['results'].items():
+        for stage, timing in stages.items():
+            base = baseline['results'].get(scale, {}).get(stage)
+            if base is None:
+                continue
+            ratio = timing['median'] / base['median'] if base['median'] else float('inf')
+            regression = ratio > 1 + tolerance and timing['median'] - base['median'] > min_seconds
+            comparison.append({'scale': scale, 'stage': stage, 'baseline': base['median'], 'current': timing['median'],
+                               'ratio': ratio, 'regression': regression})
+    return comparison
+
+
+def print_comparison(comparison, file=sys.stdout):
+    for row in comparison:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['scale']:>10} {row['stage']:<36} {row['baseline']:9.3f} s -> {row['current']:9.3f} s "
+              f"({row['ratio']:6.2f}x){flag}", file=file)
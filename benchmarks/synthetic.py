@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # BEPMAT benchmarks
+
+# ### Synthetic GAEZ-like dataset
+# generate_dataset writes a folder which can be used as the data folder of BEPMAT (see bepmat_core.set_data_dir)
+# without any network access: GeoTIFFs on the GAEZ grids and the catalog CSVs pointing at them, with the same columns
+# as potentialyield.csv, harvest_data_actual.csv, productionvalues_actualyield.csv, Classificationzones57.csv,
+# Exclusionareas.csv and Treecover_share_GAEZ.csv. The crop rasters are on the 5 arc-minute grid and the AEZ, exclusion
+# and tree cover layers on the 30 arc-second grid, as the GAEZ v4 layers, but only cover the given bounds. The values
+# are smooth random fields (constant over blocks of pixels, so that the files compress like the real ones) with a
+# shared land mask, generated from a seed so that the same dataset is generated every time. The parameters of the
+# dataset are written to dataset.json and an existing dataset with the same parameters is not generated again.
+
+# In[ ]:
+
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.transform import from_origin
+
+
+crop_resolution = 1 / 12  # 5 arc-minutes
+fine_factor = 10  # 30 arc-seconds for the AEZ, exclusion and tree cover layers
+
+# The crops of the GAEZ harvested area and production catalogs, and the potential yield crops having residue data
+harvested_crops = ['Banana', 'Barley', 'Cassava', 'Cotton', 'Fodder crops', 'Fruits and nuts', 'Groundnut', 'Maize',
+                   'Millet', 'Oil palm', 'Olive', 'Other cereals', 'Potato and sweet potato', 'Pulses', 'Rapeseed',
+                   'Rest of crops', 'Sorghum', 'Soybean', 'Stimulants', 'Sugarbeet', 'Sugarcane', 'Sunflower',
+                   'Tobacco', 'Vegetables', 'Wetland rice', 'Wheat', 'Yams and other roots']
+potential_yield_crops = ['Alfalfa', 'Banana', 'Barley', 'Cassava', 'Cotton', 'Dryland rice', 'Groundnut', 'Maize',
+                         'Millet', 'Miscanthus', 'Oil palm', 'Olive', 'Pearl millet', 'Rapeseed', 'Sorghum', 'Soybean',
+                         'Sugarbeet', 'Sunflower', 'Sweet potato', 'Switchgrass', 'Tobacco', 'Wetland rice', 'Wheat']
+
+all_time_periods = ['2011-2040', '2041-2070', '2071-2100']
+all_rcps = ['RCP2.6', 'RCP4.5', 'RCP6.0', 'RCP8.5']
+
+# Africa
+default_bounds = (-20.0, -36.0, 55.0, 38.0)
+
+
+def snap_bounds(bounds, resolution=crop_resolution):
+    west, south, east, north = bounds
+    return (np.floor(west / resolution) * resolution, np.floor(south / resolution) * resolution,
+            np.ceil(east / resolution) * resolution, np.ceil(north / resolution) * resolution)
+
+
+def grid_shape(bounds, resolution):
+    west, south, east, north = bounds
+    return int(round((north - south) / resolution)), int(round((east - west) / resolution))
+
+
+# A random field which is constant over blocks of block x block pixels
+def block_field(rng, shape, block=8):
+    coarse = rng.random((-(-shape[0] // block), -(-shape[1] // block)), dtype='float32')
+    return np.repeat(np.repeat(coarse, block, axis=0), block, axis=1)[:shape[0], :shape[1]]
+
+
+def write_raster(path, array, bounds, resolution, nodata=None):
+    profile = {'driver': 'GTiff', 'height': array.shape[0], 'width': array.shape[1], 'count': 1, 'dtype': array.dtype,
+               'crs': 'EPSG:4326', 'transform': from_origin(bounds[0], bounds[3], resolution, resolution),
+               'nodata': nodata, 'tiled': True, 'blockxsize': 256, 'blockysize': 256, 'compress': 'deflate'}
+    with rasterio.open(path, 'w', **profile) as dst:
+        dst.write(array, 1)
+
+
+def catalog_row(columns, **values):
+    row = dict.fromkeys(columns, '')
+    row.update(values)
+    return row
+
+
+potential_yield_columns = ['Name', 'File Identifier', 'Sub-Theme Name', 'Variable Name', 'Description', 'Time Period',
+                           'Climate Model', 'RCP', 'Crop', 'Water Supply', 'Input Level', 'Data Units',
+                           'Recommended Renderer', 'Thumbnail', 'Download URL']
+actual_yield_columns = ['Name', 'File Identifier', 'Sub-Theme Name', 'Variable Name', 'Description', 'Time Period',
+                        'Crop', 'Water Supply', 'Data Units', 'Recommended Renderer', 'Download URL']
+layer_columns = ['Name', 'Sub-Theme Name', 'Variable Name', 'Description', 'Time Period', 'Climate Model', 'RCP',
+                 'Data Units', 'Recommended Renderer', 'Download URL', 'Thumbnail', 'File Identifier']
+
+
+def generate_dataset(path, bounds=default_bounds, climate_models=('GFDL-ESM2M',), rcps=all_rcps,
+                     time_periods=all_time_periods, water_supply=('Irr',), input_levels=('High',), seed=0):
+    bounds = snap_bounds(bounds)
+    params = {'bounds': list(bounds), 'climate_models': list(climate_models), 'rcps': list(rcps),
+              'time_periods': list(time_periods), 'water_supply': list(water_supply),
+              'input_levels': list(input_levels), 'seed': seed}
+
+    params_path = os.path.join(path, 'dataset.json')
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            if json.load(f) == params:
+                return params
+
+    raster_dir = os.path.join(path, 'rasters')
+    os.makedirs(raster_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    shape = grid_shape(bounds, crop_resolution)
+    land = block_field(rng, shape, block=32) > 0.15
+
+    def crop_layer(scale, nodata=None):
+        values = np.round(block_field(rng, shape) * scale, 2)
+        if nodata is not None:
+            values[~land] = nodata
+        return values.astype('float32')
+
+    # Future potential yields, in kg DW/ha
+    rows = []
+    for time_period in time_periods:
+        for rcp in rcps:
+            for climate_model in climate_models:
+                for supply in water_supply:
+                    for input_level in input_levels:
+                        for crop in potential_yield_crops:
+                            name = f"yld_{crop.replace(' ', '_')}_{climate_model}_{rcp}_{time_period}_{supply}_{input_level}"
+                            raster_path = os.path.join(raster_dir, name + '.tif')
+                            write_raster(raster_path, crop_layer(8000, nodata=-1), bounds, crop_resolution, nodata=-1)
+                            rows.append(catalog_row(potential_yield_columns, **{
+                                'Name': name, 'Sub-Theme Name': 'Suitability and Attainable Yield',
+                                'Variable Name': 'Average attainable yield of current cropland',
+                                'Description': f"Average attainable yield for {crop} under {supply} conditions",
+                                'Time Period': time_period, 'Climate Model': climate_model, 'RCP': rcp, 'Crop': crop,
+                                'Water Supply': supply, 'Input Level': input_level, 'Data Units': 'kg DW/ha',
+                                'Download URL': ' ' + raster_path}))
+    pd.DataFrame(rows, columns=potential_yield_columns).to_csv(os.path.join(path, 'potentialyield.csv'), index=False)
+
+    # 2000 and 2010 harvested areas (in 1000 ha) and productions (in 1000 t)
+    for file_name, suffix, variable, scale, units in (
+            ('harvest_data_actual.csv', 'har', 'Harvested area', 2.0, '1000 ha'),
+            ('productionvalues_actualyield.csv', 'prd', 'Production', 10.0, '1000 t')):
+        rows = []
+        for year in (2000, 2010):
+            for crop in harvested_crops:
+                name = f"{crop.replace(' ', '_').lower()}_{year}_{suffix}"
+                raster_path = os.path.join(raster_dir, name + '.tif')
+                write_raster(raster_path, crop_layer(scale, nodata=0), bounds, crop_resolution)
+                rows.append(catalog_row(actual_yield_columns, **{
+                    'Name': name, 'Sub-Theme Name': 'Area, Yield and Production', 'Variable Name': variable,
+                    'Description': f"{variable} for the year {year} for {crop} under Total water supply conditions",
+                    'Time Period': year, 'Crop': crop, 'Water Supply': 'Total', 'Data Units': units,
+                    'Recommended Renderer': 'Actual Yields and Production Symbology', 'Download URL': ' ' + raster_path}))
+        pd.DataFrame(rows, columns=actual_yield_columns).to_csv(os.path.join(path, file_name), index=False)
+
+    # The AEZ, exclusion and tree cover layers on the 30 arc-second grid
+    fine_resolution = crop_resolution / fine_factor
+    fine_shape = (shape[0] * fine_factor, shape[1] * fine_factor)
+
+    rows = []
+    for time_period in time_periods:
+        for rcp in rcps:
+            name = f"aez_{rcp}_{time_period}"
+            raster_path = os.path.join(raster_dir, name + '.tif')
+            classes = (block_field(rng, fine_shape, block=16) * 57 + 1).astype('uint8')
+            write_raster(raster_path, classes, bounds, fine_resolution)
+            rows.append(catalog_row(layer_columns, **{
+                'Name': name, 'Sub-Theme Name': 'Agro-ecological Zones',
+                'Variable Name': 'AEZ classification by climate/soil/terrain/LC (57 classes)',
+                'Time Period': time_period, 'Climate Model': 'ENSEMBLE', 'RCP': rcp, 'Data Units': 'Class',
+                'Recommended Renderer': 'AEZ Classification (57 classes)', 'Download URL': raster_path}))
+    pd.DataFrame(rows, columns=layer_columns).to_csv(os.path.join(path, 'Classificationzones57.csv'), index=False)
+
+    for file_name, name, scale, variable, units in (
+            ('Exclusionareas.csv', 'exclusion_2017', 8, 'Exclusion class', 'Class'),
+            ('Treecover_share_GAEZ.csv', 'GLCSv11_04_5m', 100, 'Tree-covered land', '%')):
+        raster_path = os.path.join(raster_dir, name + '.tif')
+        write_raster(raster_path, np.round(block_field(rng, fine_shape, block=16) * scale).astype('uint8'), bounds,
+                     fine_resolution)
+        row = catalog_row(layer_columns, **{'Name': name, 'Variable Name': variable, 'Time Period': 'n.a.',
+                                            'Climate Model': 'n.a.', 'RCP': 'n.a.', 'Data Units': units,
+                                            'Download URL': raster_path})
+        pd.DataFrame([row], columns=layer_columns).to_csv(os.path.join(path, file_name), index=False)
+
+    # Share of pasture on the 5 arc-minute grid
+    write_raster(os.path.join(path, 'pasture_cubic_reproject.tif'), block_field(rng, shape), bounds, crop_resolution)
+
+    with open(params_path, 'w') as f:
+        json.dump(params, f, indent=2)
+    return params
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Biomass Energy Potential Mapping and Analysis Tool (BEPMAT)
+
+# ### Command line
+# Runs the scenario sweeps of BEPMAT without a notebook, e.g. on a server:
+#
+#     python bepmat.py run manifest.yaml --workers 8
+#
+# or answers the potential of a region under a scenario over HTTP (see bepmat_service):
+#
+#     python bepmat.py serve --port 8150 --workers 4
+#
+# and builds a local mirror of Cloud-Optimized GeoTIFFs of the catalogs (see CogMirror), which is then used by the
+# other commands when BEPMAT_MIRROR_DIR points at it:
+#
+#     python bepmat.py mirror --dir /data/bepmat-mirror --rcp RCP4.5 RCP8.5 --workers 4
+#
+# or downloads the rasters of the catalogs into the raster cache (see RasterCache), with the same filters, so that the
+# runs can then be done offline with BEPMAT_OFFLINE set:
+#
+#     python bepmat.py prefetch --themes potential_yield --climate-model GFDL-ESM2M --rcp RCP4.5
+#
+# The manifest is a YAML or JSON file listing the regions and the scenarios to compute:
+#
+#     output: results              # folder of the results, next to the manifest (default: named after the manifest)
+#     workers: 8                   # number of worker processes (default: BEPMAT_WORKERS, or in the main process)
+#     regions:
+#       - country: India
+#         province: Goa
+#       - country: Nepal
+#       - file: boundaries/catchment.gpkg   # any file readable by geopandas
+#         name: Catchment
+#     climate_models: [GFDL-ESM2M, HadGEM2-ES]
+#     rcps: [RCP2.6, RCP8.5]       # default: all the RCPs
+#     time_periods: [2011-2040]    # default: all the time periods
+#     water_supply: [Irr, Rain]
+#     input_levels: [High]
+#     water_supply_2010: Total
+#     land_types: [cropland, marginal]
+#
+# Every scenario is written to the results store in the output folder (see ResultStore) as soon as it is computed,
+# and the scenarios already in the store are not computed again, so an interrupted run is resumed by running the
+# same command again. A summary table of the potentials in PJ (summary.csv) is rewritten after every region.
+
+# In[ ]:
+
+
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import bepmat_core as core
+
+
+logger = logging.getLogger('bepmat')
+
+summary_columns = ['region', 'climate_model', 'rcp', 'time_period', 'water_supply_future', 'input_level',
+                   'water_supply_2010', 'land_type', 'potential_pj']
+
+
+def load_manifest(path):
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    if not manifest.get('regions'):
+        raise ValueError(f"The manifest {path} has no regions")
+    if not manifest.get('climate_models'):
+        raise ValueError(f"The manifest {path} has no climate_models")
+    return manifest
+
+
+def as_list(value, default=None):
+    if value is None:
+        return default
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def load_region(region, manifest_dir='.'):
+    if 'file' in region:
+        import geopandas as gpd
+        path = os.path.join(manifest_dir, region['file'])
+        return region.get('name', os.path.splitext(os.path.basename(path))[0]), gpd.read_file(path)
+
+    name = '_'.join(str(region[key]) for key in ('country', 'province') if region.get(key))
+    return name, core.shapefile_generator(region['country'], region.get('province'))
+
+
+# One row per region, scenario and land type with the potential in PJ. The past cropland only depends on the 2010
+# water supply, so its rows have no future water supply or input level.
+def summary_rows(region_name, results, water_supply_future, input_level, water_supply_2010):
+    rows = []
+    scenario = {'region': region_name, 'water_supply_future': water_supply_future, 'input_level': input_level,
+                'water_supply_2010': water_supply_2010}
+
+    for key, dataset in results['cropland'].items():
+        if isinstance(key, str):
+            rows.append(dict(scenario, water_supply_future=None, input_level=None, climate_model=None, rcp=None,
+                             time_period=key, land_type='past_cropland',
+                             potential_pj=float(dataset.attrs['Net Potential in PetaJ'])))
+        else:
+            rows.append(dict(scenario, climate_model=key[0], rcp=key[1], time_period=key[2], land_type='cropland',
+                             potential_pj=float(dataset.attrs['net_sum in PJ'])))
+    for key, final_potential in results['marginal_arrays'].items():
+        rows.append(dict(scenario, climate_model=key[0], rcp=key[1], time_period=key[2], land_type='marginal',
+                         potential_pj=float(np.nansum(final_potential))))
+    for key, dataset in results['total'].items():
+        rows.append(dict(scenario, climate_model=key[0], rcp=key[1], time_period=key[2], land_type='total',
+                         potential_pj=float(dataset.attrs['net_energy_potential'])))
+    return rows
+
+
+def write_table(table, path):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.csv')
+    os.close(fd)
+    table.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def run_manifest(manifest_path, output=None, max_workers=None):
+    manifest = load_manifest(manifest_path)
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    # The output of the manifest is next to it, the one given on the command line is relative to the working directory
+    if output is None:
+        output = os.path.join(manifest_dir, manifest.get('output', os.path.splitext(os.path.basename(manifest_path))[0]
+                                                         + '_results'))
+    output = os.path.abspath(output)
+    os.makedirs(output, exist_ok=True)
+    if max_workers is None:
+        max_workers = core.worker_count(manifest.get('workers'))
+
+    store = core.ResultStore(os.path.join(output, 'store'))
+    climate_models = as_list(manifest['climate_models'])
+    rcps = as_list(manifest.get('rcps'), core.all_rcps)
+    time_periods = as_list(manifest.get('time_periods'), core.all_time_periods)
+    water_supplies = as_list(manifest.get('water_supply'), ['Irr'])
+    input_levels = as_list(manifest.get('input_levels'), ['High'])
+    water_supply_2010 = manifest.get('water_supply_2010', 'Total')
+    land_types = tuple(as_list(manifest.get('land_types'), ['cropland', 'marginal']))
+
+    summary_path = os.path.join(output, 'summary.csv')
+    rows = []
+    for region_spec in manifest['regions']:
+        region_name, shapefile = load_region(region_spec, manifest_dir)
+        if not len(shapefile):
+            raise ValueError(f"No boundaries were found for the region {region_spec}")
+        region = core.RegionGrid(shapefile)
+
+        # The past cropland is the same for every future water supply and input level, so it is run with the first
+        past_years = (2000, 2010)
+        for water_supply_future in water_supplies:
+            for input_level in input_levels:
+                logger.info("Running %s with %s water supply and %s inputs", region_name, water_supply_future,
+                            input_level)
+                results = core.run_scenarios(region, climate_models, rcps, time_periods, water_supply_future,
+                                             input_level, water_supply_2010, land_types=land_types,
+                                             past_years=past_years, max_workers=max_workers, store=store)
+                rows.extend(summary_rows(region_name, results, water_supply_future, input_level, water_supply_2010))
+                past_years = ()
+
+        write_table(pd.DataFrame(rows, columns=summary_columns), summary_path)
+        logger.info("Wrote the summary of %s to %s", region_name, summary_path)
+
+    return pd.DataFrame(rows, columns=summary_columns)
+
+
+# Options of the mirror and prefetch commands filtering the catalogs on one of their columns
+mirror_filters = {'--crop': 'Crop', '--time-period': 'Time Period', '--climate-model': 'Climate Model', '--rcp': 'RCP',
+                  '--water-supply': 'Water Supply', '--input-level': 'Input Level'}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bepmat', description='Biomass Energy Potential Mapping and Analysis Tool')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the scenarios of a manifest file')
+    run.add_argument('manifest', help='YAML or JSON manifest of the regions and scenarios')
+    run.add_argument('--output', help='folder of the results, overriding the manifest')
+    run.add_argument('--workers', type=int, help='number of worker processes, overriding the manifest')
+    run.add_argument('--trace', help="record the stages of the run in a JSON lines file, or 'log' to log them")
+
+    serve = commands.add_parser('serve', help='answer the potential of regions and scenarios over HTTP')
+    serve.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8150, help='port to listen on (default: 8150)')
+    serve.add_argument('--workers', type=int, help='number of worker processes (default: BEPMAT_WORKERS or the number of cores)')
+    serve.add_argument('--max-queue', type=int, help='number of scenarios waiting for a worker before answering 503 (default: 64)')
+    serve.add_argument('--store', help='folder of the results store (default: BEPMAT_RESULTS_DIR)')
+    serve.add_argument('--data-dir', help='folder of the catalogs, e.g. pointing at a local copy of the rasters')
+    serve.add_argument('--trace', help="record the stages of the computations in a JSON lines file, or 'log' to log them")
+
+    mirror = commands.add_parser('mirror', help='convert the rasters of the catalogs into a local mirror of Cloud-Optimized GeoTIFFs')
+    mirror.add_argument('--dir', help='folder of the mirror (default: BEPMAT_MIRROR_DIR or ~/.cache/bepmat/mirror)')
+    mirror.add_argument('--themes', nargs='+', choices=list(core.catalog_files), default=list(core.catalog_files),
+                        help='catalogs to mirror (default: all)')
+    for option, column in mirror_filters.items():
+        mirror.add_argument(option, nargs='+', dest=column, metavar=column.upper().replace(' ', '_'),
+                            help=f"only the rasters of these values of the '{column}' column, in the catalogs having it")
+    mirror.add_argument('--workers', type=int, default=1, help='number of worker processes (default: 1)')
+    mirror.add_argument('--overwrite', action='store_true', help='convert the rasters already in the mirror again')
+    mirror.add_argument('--data-dir', help='folder of the catalogs')
+
+    prefetch = commands.add_parser('prefetch', help='download the rasters of the catalogs into the raster cache')
+    prefetch.add_argument('--themes', nargs='+', choices=list(core.catalog_files), default=list(core.catalog_files),
+                          help='catalogs to prefetch (default: all)')
+    for option, column in mirror_filters.items():
+        prefetch.add_argument(option, nargs='+', dest=column, metavar=column.upper().replace(' ', '_'),
+                              help=f"only the rasters of these values of the '{column}' column, in the catalogs having it")
+    prefetch.add_argument('--data-dir', help='folder of the catalogs')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    # Through the environment so that the worker processes record their stages too
+    if getattr(args, 'trace', None):
+        os.environ['BEPMAT_TRACE'] = args.trace
+        core.set_instrumentation(core.sink_from_environment())
+
+    if args.command == 'run':
+        run_manifest(args.manifest, args.output, args.workers)
+        core.instrumentation.summary()
+    elif args.command in ('mirror', 'prefetch'):
+        if args.data_dir:
+            core.set_data_dir(args.data_dir)
+        filters = {column: getattr(args, column) for column in mirror_filters.values() if getattr(args, column)}
+        if args.command == 'mirror':
+            paths = core.build_cog_mirror(core.set_cog_mirror(args.dir), args.themes, args.workers, args.overwrite,
+                                          **filters)
+            logger.info("Converted %s rasters into the mirror", len(paths))
+        else:
+            paths = core.prefetch_rasters(args.themes, **filters)
+            logger.info("Fetched %s rasters into the cache at %s", len(paths), core.get_raster_cache().cache_dir)
+    elif args.command == 'serve':
+        import asyncio
+        import bepmat_service
+        store = core.ResultStore(args.store) if args.store else None
+        try:
+            asyncio.run(bepmat_service.serve(args.host, args.port, store, args.workers, args.max_queue, args.data_dir))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
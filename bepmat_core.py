@@ -0,0 +1,3894 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Biomass Energy Potential Mapping and Analysis Tool (BEPMAT)
+
+# ### This notebook contains all the functions used in the project along with the data. We request you to kindly go through the supporting text on the GitHub repository and the article, available as a preprint (Insert Zenodo doi) to get an idea of the objectives and the methodology.
+
+# ### Computational core
+# This module holds everything needed to compute the biomass energy potentials and nothing needed to plot them,
+# so that the worker processes and the command line start quickly. The plotting functions (bokeh_plot,
+# bokeh_max_min_plot, crop_show and the graph_plotter functions) are in bepmat_visualisation, and Functions
+# gathers both for the notebooks.
+
+# ## Loading all the CSVs containing the required raster files
+
+# In[31]:
+
+
+# Importing a few important libraries essential to the work.
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import itertools
+import threading
+import contextvars
+import sqlite3
+import hashlib
+import tempfile
+import urllib.request
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+from functools import partial, wraps
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+import numpy as np
+import xarray as xr
+
+# Importing the Geoprocessing libraries 
+import rasterio
+import rasterio.shutil
+from rasterio.transform import Affine
+from rasterio.enums import Resampling
+from rasterio.errors import WindowError
+from rasterio.features import geometry_mask, geometry_window, rasterize
+from rasterio.windows import Window
+
+from shapely.geometry import Point, MultiPolygon
+
+# geopandas, gadm and pycountry are only imported by the functions which use them, as they are slow to import and
+# not needed by the computations themselves
+
+
+# ### Instrumentation
+# To find out where the time of a run goes, the stages of the computation (building the region grid, reading the
+# layers, the exclusion mask, the potentials of each land type, the assembly of the xarrays, ...) are recorded as
+# nested spans, and counters are kept of the rasters opened, the bytes read and downloaded per layer and the size of
+# the main arrays allocated per stage. When a span ends an event is sent to the sink with its duration, the counters
+# incremented inside it (including in the nested spans) and the peak resident memory of the process so far. Three
+# sinks are available: LoggingSink, JsonLinesSink (one JSON object per line) and MemorySink (keeps the events in a
+# list, e.g. for tests); any object with an emit(event) method can be used. The instrumentation is off by default,
+# and then every span and counter is a single attribute check. It is turned on with set_instrumentation(sink) or
+# with the BEPMAT_TRACE environment variable, set to 'log' or to the path of a JSON lines file. The worker processes
+# started by run_scenarios and run_tiled inherit it from the environment variable, or from the parent process when
+# they are forked.
+
+# In[ ]:
+
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger('bepmat')
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in kilobytes on Linux and in bytes on macOS
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+class LoggingSink:
+
+    def __init__(self, log=None, level=logging.INFO):
+        self.log = log or logger
+        self.level = level
+
+    def emit(self, event):
+        self.log.log(self.level, "%s %s %.3f s %s", event['event'], event['name'], event.get('duration', 0),
+                     json.dumps(event.get('counters', {})))
+
+
+class JsonLinesSink:
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        line = json.dumps(event, default=str) + '\n'
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line)
+
+
+class MemorySink:
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def spans(self, name=None):
+        return [event for event in self.events if event['event'] == 'span' and name in (None, event['name'])]
+
+
+class Span:
+
+    def __init__(self, instrumentation, name, attrs):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.attrs = attrs
+        self.counters = {}
+
+    def __enter__(self):
+        stack = active_spans.get()
+        self.parent = stack[-1].id if stack else None
+        self.id = next(self.instrumentation.span_ids)
+        self.token = active_spans.set(stack + (self,))
+        self.started = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.start
+        active_spans.reset(self.token)
+        event = {'event': 'span', 'name': self.name, 'id': self.id, 'parent': self.parent, 'pid': os.getpid(),
+                 'started': self.started, 'duration': duration, 'attrs': self.attrs, 'counters': self.counters,
+                 'peak_rss_mb': peak_rss_mb()}
+        if exc_type is not None:
+            event['error'] = exc_type.__name__
+        self.instrumentation.emit(event)
+        return False
+
+
+class NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+null_span = NullSpan()
+
+# The spans open in the current thread or task, innermost last
+active_spans = contextvars.ContextVar('bepmat_active_spans', default=())
+
+
+class Instrumentation:
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.enabled = sink is not None
+        self.counters = {}
+        self.span_ids = itertools.count(1)
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return null_span
+        return Span(self, name, attrs)
+
+    # Counters are kept per label, e.g. count('bytes_read', data.nbytes, 'aez.tif'), in the totals of the run and in
+    # every open span
+    def count(self, name, value=1, label=None):
+        if not self.enabled:
+            return
+        for counters in (self.counters,) + tuple(span.counters for span in active_spans.get()):
+            values = counters.setdefault(name, {})
+            values[label] = values.get(label, 0) + int(value)
+
+    def emit(self, event):
+        try:
+            self.sink.emit(event)
+        except Exception:
+            logger.exception("The instrumentation sink failed")
+
+    # The counters of the whole run, also sent to the sink
+    def summary(self):
+        event = {'event': 'summary', 'name': 'run', 'pid': os.getpid(), 'counters': self.counters,
+                 'peak_rss_mb': peak_rss_mb()}
+        if self.enabled:
+            self.emit(event)
+        return event
+
+
+def sink_from_environment():
+    trace = os.environ.get('BEPMAT_TRACE')
+    if not trace:
+        return None
+    if trace.lower() == 'log':
+        return LoggingSink()
+    return JsonLinesSink(trace)
+
+
+instrumentation = Instrumentation(sink_from_environment())
+
+
+def set_instrumentation(sink=None):
+    global instrumentation
+    instrumentation = Instrumentation(sink)
+    return instrumentation
+
+
+def trace_span(name, **attrs):
+    return instrumentation.span(name, **attrs)
+
+
+def trace_count(name, value=1, label=None):
+    instrumentation.count(name, value, label)
+
+
+# Recording every call of a function as a span
+def traced(name=None):
+    def decorate(function):
+        span_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return function(*args, **kwargs)
+            with instrumentation.span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def layer_name(raster_path):
+    if isinstance(raster_path, str):
+        return os.path.basename(raster_path.strip())
+    return getattr(raster_path, 'name', type(raster_path).__name__)
+
+
+# In[2]:
+
+
+# Uploading all the CSVs into pandas DataFrmes
+# The CSVs are read from the dataset folder next to this file (or from BEPMAT_DATA_DIR), whatever the working
+# directory, and only when they are first used. They can still be used as module attributes, e.g.
+# Functions.potential_yield, or with load_catalog_table('potential_yield').
+
+data_dir = os.environ.get('BEPMAT_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset'))
+
+catalog_files = {'potential_yield': 'potentialyield.csv',
+                 'harvested_area': 'harvest_data_actual.csv', #The year is integer type
+                 'production_values': 'productionvalues_actualyield.csv',
+                 'exclusion_areas': 'Exclusionareas.csv',
+                 'tree_cover_share': 'Treecover_share_GAEZ.csv',
+                 'aez_classification': 'Classificationzones57.csv'}
+
+catalog_tables = {}
+
+
+def load_catalog_table(name):
+    if name not in catalog_tables:
+        catalog_tables[name] = pd.read_csv(os.path.join(data_dir, catalog_files[name]))
+    return catalog_tables[name]
+
+
+def __getattr__(name):
+    if name in catalog_files:
+        return load_catalog_table(name)
+    # The default raster cache and boundary store, which create their folders, are only made when first used
+    if name == 'raster_cache':
+        return get_raster_cache()
+    if name == 'boundary_store':
+        return get_boundary_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def set_data_dir(path):
+    global data_dir
+    data_dir = path
+    catalog_tables.clear()
+    catalog.clear()
+
+
+# The production_values defined here will be used for calculating crop residue from the year 2000 and 2010 
+# under different conditions. The harvested area will be used for future residue from cropland calculations
+# and the potential yield will be used for future residue from cropland as well as biomass potential from future
+# marginal land. The remaining will be used to find the Total Available Land.
+
+
+# ### Index of the raster catalogs
+# Looking up a raster by filtering the DataFrames above for every crop of every scenario is slow, so the
+# potential_yield, harvested_area and production_values catalogs are indexed once in a dictionary keyed by
+# (theme, crop, time period, climate model, RCP, water supply, input level), with None for the columns a theme does
+# not have, holding the stripped Download URL. catalog.select() returns the rasters of a list of crops for one
+# scenario and raises an error listing every missing combination before any raster is read.
+
+# In[ ]:
+
+
+catalog_columns = ('Crop', 'Time Period', 'Climate Model', 'RCP', 'Water Supply', 'Input Level')
+
+
+class CatalogIndex:
+
+    # The catalogs are given as DataFrames or as functions loading them, in which case they are only loaded and
+    # indexed when the index is first used
+    def __init__(self, catalogs):
+        self.catalogs = catalogs
+        self.clear()
+
+    def clear(self):
+        self._urls = None
+        self._crops = None
+
+    def _index(self):
+        if self._urls is None:
+            urls, crops = {}, {}
+            for theme, table in self.catalogs.items():
+                if callable(table):
+                    table = table()
+                columns = [column if column in table.columns else None for column in catalog_columns]
+                for record in table.to_dict('records'):
+                    key = self.key(theme, *(record[column] if column else None for column in columns))
+                    # As with the filtering of the DataFrames, the first matching row is used
+                    urls.setdefault(key, str(record['Download URL']).strip())
+                crops[theme] = tuple(table['Crop'].unique())
+            self._urls, self._crops = urls, crops
+        return self._urls
+
+    @staticmethod
+    def _value(value):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return None
+        return str(value).strip()
+
+    # The time periods are kept as strings, 2010 and '2010' being the same period
+    @classmethod
+    def key(cls, theme, crop=None, time_period=None, climate_model=None, rcp=None, water_supply=None, input_level=None):
+        return (theme,) + tuple(cls._value(value) for value in (crop, time_period, climate_model, rcp, water_supply,
+                                                                 input_level))
+
+    def crops(self, theme):
+        self._index()
+        return self._crops[theme]
+
+    def url(self, theme, crop, **scenario):
+        return self._index().get(self.key(theme, crop, **scenario))
+
+    # Without a list of crops every crop of the theme available for the scenario is returned. With a list, all the
+    # crops must be available.
+    def select(self, theme, crops=None, **scenario):
+        strict = crops is not None
+        if crops is None:
+            crops = self.crops(theme)
+
+        selected, missing = {}, []
+        for crop in crops:
+            url = self.url(theme, crop, **scenario)
+            if url is None:
+                missing.append(crop)
+            else:
+                selected[crop] = url
+
+        if strict and missing:
+            raise ValueError(f"The {theme} catalog has no raster for the crops {missing} with {scenario}")
+        return selected
+
+    # Any raster on the 5 arc-minute grid, used as the reference for the grid of a region
+    @property
+    def reference_raster(self):
+        return next(url for key, url in self._index().items() if key[0] == 'potential_yield')
+
+
+catalog = CatalogIndex({theme: partial(load_catalog_table, theme)
+                        for theme in ('potential_yield', 'harvested_area', 'production_values')})
+
+
+# Rasters of the future potential yield of the given crops for a scenario
+def potential_yield_rasters(crops, time_period, climate_model, rcp, water_supply_future, input_level):
+    return catalog.select('potential_yield', crops, time_period=time_period, climate_model=climate_model, rcp=rcp,
+                          water_supply=water_supply_future, input_level=input_level)
+
+
+# ## Local cache for the GAEZ rasters
+# All the rasters listed in the CSVs above are global GeoTIFFs hosted on the FAO S3 bucket. Instead of streaming
+# them over HTTP on every run, every raster used by the functions below is opened through `open_raster`, which
+# resolves the Download URL to a local copy kept in an on-disk cache. The cache is keyed by the URL and the ETag
+# returned by the server, so a raster updated upstream is downloaded again. A cached raster is trusted without asking
+# the server: its ETag is checked again at most once per process, and only once the last check is older than the time
+# to live. The cache has a size limit after which the least recently used rasters are removed and an offline mode in
+# which only the cached rasters are read. The index of the cache is only changed under a lock file, so the worker
+# processes of run_scenarios and run_tiled can share the cache folder.
+# 
+# The following environment variables can be used to configure the default cache:
+# - BEPMAT_CACHE_DIR : Folder where the rasters are stored (default: ~/.cache/bepmat/rasters)
+# - BEPMAT_CACHE_SIZE_GB : Maximum size of the cache in gigabytes (default: 50)
+# - BEPMAT_CACHE_TTL_HOURS : Hours after which the ETag of a cached raster is checked again (default: 24)
+# - BEPMAT_OFFLINE : Set to 1 to only read rasters which are already in the cache
+
+# In[ ]:
+
+
+# An exclusive lock on a file, held by one process at a time
+@contextmanager
+def file_lock(path):
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class RasterCache:
+
+    # The last access of a cached raster is only written to the index when it is older than this, in seconds
+    access_resolution = 60
+
+    def __init__(self, cache_dir=None, max_size_gb=None, offline=None, ttl_hours=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get('BEPMAT_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'bepmat', 'rasters'))
+        if max_size_gb is None:
+            max_size_gb = float(os.environ.get('BEPMAT_CACHE_SIZE_GB', 50))
+        if offline is None:
+            offline = os.environ.get('BEPMAT_OFFLINE', '0').lower() in ('1', 'true', 'yes')
+        if ttl_hours is None:
+            ttl_hours = float(os.environ.get('BEPMAT_CACHE_TTL_HOURS', 24))
+
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_gb * 1024**3)
+        self.offline = offline
+        self.ttl = ttl_hours * 3600
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.lock_path = os.path.join(cache_dir, 'index.lock')
+        self._validated = set()  # The URLs whose ETag was checked by this process
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # The index maps every URL to the cached file, its ETag, size, the last time its ETag was checked and the last
+    # time it was used. It is replaced atomically, so it can be read at any time, and is only changed through
+    # _locked_index so that the processes sharing the cache folder do not lose each other's entries.
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    @contextmanager
+    def _locked_index(self):
+        with file_lock(self.lock_path):
+            index = self._load_index()
+            yield index
+            self._save_index(index)
+
+    def _needs_validation(self, url, entry):
+        return url not in self._validated and time.time() - entry.get('validated', 0) > self.ttl
+
+    def _remote_etag(self, url):
+        request = urllib.request.Request(url, method='HEAD')
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.headers.get('ETag', '').strip('"')
+
+    def _download(self, url, etag):
+        key = hashlib.sha256(f"{url}|{etag}".encode()).hexdigest()
+        file_path = os.path.join(self.cache_dir, key + os.path.splitext(url)[1])
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+        try:
+            with trace_span('download', url=url), urllib.request.urlopen(url, timeout=60) as response, \
+                    os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(response, f, length=1024 * 1024)
+                etag = response.headers.get('ETag', etag).strip('"')
+                trace_count('bytes_downloaded', f.tell(), layer_name(url))
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return file_path, etag
+
+    def evict(self, index=None):
+        if index is None:
+            with self._locked_index() as index:
+                return self.evict(index)
+
+        # Remove the least recently used rasters until the cache fits within the size limit
+        total_size = sum(entry['size'] for entry in index.values())
+        for url, entry in sorted(index.items(), key=lambda item: item[1]['last_access']):
+            if total_size <= self.max_size:
+                break
+            if os.path.exists(entry['path']):
+                os.remove(entry['path'])
+            total_size -= entry['size']
+            del index[url]
+        return index
+
+    def resolve(self, url):
+        url = url.strip()
+        entry = self._load_index().get(url)
+        if entry is not None and not os.path.exists(entry['path']):
+            entry = None
+
+        # A cached raster is used straight away, without any request to the server
+        if entry is not None and (self.offline or not self._needs_validation(url, entry)):
+            if time.time() - entry['last_access'] > self.access_resolution:
+                with self._locked_index() as index:
+                    if url in index:
+                        index[url]['last_access'] = time.time()
+            return entry['path']
+
+        if self.offline:
+            raise FileNotFoundError(f"{url} is not in the raster cache at {self.cache_dir} and offline mode is on")
+
+        try:
+            etag = self._remote_etag(url)
+        except OSError:
+            # Fall back on the cached copy whenever the server cannot be reached
+            if entry is None:
+                raise
+            etag = entry['etag']
+        self._validated.add(url)
+
+        # The download is done outside of the lock, which is only held to record it
+        if entry is None or entry['etag'] != etag:
+            file_path, etag = self._download(url, etag)
+            entry = {'path': file_path, 'etag': etag, 'size': os.path.getsize(file_path)}
+
+        with self._locked_index() as index:
+            previous = index.get(url)
+            if previous is not None and previous['path'] != entry['path'] and os.path.exists(previous['path']):
+                os.remove(previous['path'])
+            index[url] = dict(entry, validated=time.time(), last_access=time.time())
+            self.evict(index)
+
+            # The raster just used is never evicted, unless it is larger than the whole cache
+            return entry['path'] if url in index else url
+
+    def contains(self, url):
+        entry = self._load_index().get(url.strip())
+        return entry is not None and os.path.exists(entry['path'])
+
+    def size(self):
+        return sum(entry['size'] for entry in self._load_index().values())
+
+
+def get_raster_cache():
+    if 'raster_cache' not in globals():
+        set_raster_cache()
+    return raster_cache
+
+
+def set_raster_cache(cache_dir=None, max_size_gb=None, offline=None, ttl_hours=None):
+    global raster_cache
+    raster_cache = RasterCache(cache_dir, max_size_gb, offline, ttl_hours)
+    return raster_cache
+
+
+# Every raster in the module is opened with this function. The rasters in the COG mirror (see CogMirror below) are read
+# from it. Otherwise local paths and in-memory rasters are opened directly while the catalog URLs are read from the
+# cache.
+def open_raster(raster_path):
+    trace_count('raster_opens', 1, layer_name(raster_path))
+    if isinstance(raster_path, str):
+        mirrored = cog_mirror.lookup(raster_path) if cog_mirror is not None else None
+        if mirrored is not None:
+            raster_path = mirrored
+        elif raster_path.strip().startswith(('http://', 'https://')):
+            raster_path = get_raster_cache().resolve(raster_path)
+    return rasterio.open(raster_path)
+
+
+# ### Prefetching rasters into the cache
+# The prefetch function fills the cache with the rasters of a selection of the potential_yield, harvested_area and
+# production_values catalogs so that runs can later be done fully offline. Every keyword argument is used as a 
+# filter on the column of the same name, for example prefetch_rasters(themes=['potential_yield'], RCP='RCP4.5',
+# **{'Climate Model': 'GFDL-ESM2M'}). A list can be passed to select several values. A filter on a column which a
+# catalog does not have leaves that catalog unfiltered, and the rasters which are already local files are skipped. It
+# is also run from the command line with python bepmat.py prefetch.
+
+# In[ ]:
+
+
+# The stripped URLs of the rows of a catalog matching the filters, compared as strings so that the years of the
+# harvested area and production catalogs can be given as '2010'
+def catalog_urls(theme, **filters):
+    table = load_catalog_table(theme)
+    selection = pd.Series(True, index=table.index)
+    for column, value in filters.items():
+        if column not in table.columns:
+            continue
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        selection &= table[column].astype(str).isin([str(value) for value in values])
+
+    return list(table.loc[selection, 'Download URL'].astype(str).str.strip().unique())
+
+
+def prefetch_rasters(themes=('potential_yield', 'harvested_area', 'production_values'), **filters):
+    fetched = []
+    for theme in themes:
+        for url in catalog_urls(theme, **filters):
+            if url.startswith(('http://', 'https://')):
+                fetched.append(get_raster_cache().resolve(url))
+
+    return fetched
+
+
+# ### Local mirror of Cloud-Optimized GeoTIFFs
+# The GAEZ rasters of the catalogs are plain GeoTIFFs, so reading a small window of one of them, or downsampling the
+# 30 arc-second AEZ, exclusion and tree cover layers to the 5 arc-minute grid, reads much more of the file than
+# needed. The CogMirror converts the rasters of the catalogs into Cloud-Optimized GeoTIFFs (internally tiled,
+# compressed, with overviews) in a local folder. The 30 arc-second layers get overviews at 10x (the 5 arc-minute
+# working grid of the crop rasters), 20x, 40x, ... built with the resampling of their exclusion rule (mode for the AEZ and exclusion
+# classes, average for the tree cover), which serve the reads resampled by GDAL and the display of the layers, and
+# the other rasters get overviews at 2x, 4x, ... for display. The block aggregation of the exclusion layers (see
+# aggregate_blocks) reads the full resolution tiles of the window, which the tiling of the mirror makes cheap.
+#
+# Once a raster is in the mirror open_raster reads the mirror instead of the catalog URL, so nothing else has to
+# change. The mirror is used when the BEPMAT_MIRROR_DIR environment variable is set, or after set_cog_mirror(). It is
+# built with build_cog_mirror(), or from the command line with python bepmat.py mirror, which take the same filters as
+# prefetch_rasters.
+
+# In[ ]:
+
+
+# The resampling of the overviews of each catalog, as in default_exclusion_rules for the exclusion layers
+mirror_resampling = {'aez_classification': Resampling.mode, 'exclusion_areas': Resampling.mode,
+                     'tree_cover_share': Resampling.average, 'pasture': Resampling.average}
+
+
+# Resolution of the working grid, the one of the crop rasters
+def working_resolution():
+    with open_raster(catalog.reference_raster) as src:
+        return abs(src.res[0])
+
+
+def overview_factors(width, height, resolution, grid_resolution, blocksize=512):
+    ratio = grid_resolution / resolution
+    first = int(round(ratio)) if ratio > 1.5 else 2
+    factors = [first]
+    while max(width, height) // (factors[-1] * 2) >= blocksize:
+        factors.append(factors[-1] * 2)
+    return factors
+
+
+def write_cog(source_path, target_path, resampling=Resampling.average, grid_resolution=None, blocksize=512):
+    if grid_resolution is None:
+        grid_resolution = working_resolution()
+
+    directory = os.path.dirname(target_path)
+    fd, tiled_path = tempfile.mkstemp(dir=directory, suffix='.tif')
+    os.close(fd)
+    fd, cog_path = tempfile.mkstemp(dir=directory, suffix='.tif')
+    os.close(fd)
+
+    try:
+        with rasterio.open(source_path) as src:
+            profile = src.profile.copy()
+            profile.update(driver='GTiff', tiled=True, blockxsize=blocksize, blockysize=blocksize, compress='deflate',
+                           bigtiff='if_safer')
+            profile.pop('photometric', None)
+            factors = overview_factors(src.width, src.height, abs(src.res[0]), grid_resolution, blocksize)
+
+            # Copying the raster by strips of blocks so that a global raster never has to fit in memory
+            with rasterio.open(tiled_path, 'w', **profile) as dst:
+                for row in range(0, src.height, blocksize):
+                    window = Window(0, row, src.width, min(blocksize, src.height - row))
+                    dst.write(src.read(window=window), window=window)
+                dst.build_overviews(factors, resampling)
+                dst.update_tags(ns='rio_overview', resampling=resampling.name)
+
+        predictor = 'FLOATING_POINT' if np.dtype(profile['dtype']).kind == 'f' else 'STANDARD'
+        rasterio.shutil.copy(tiled_path, cog_path, driver='COG', blocksize=blocksize, compress='DEFLATE',
+                             predictor=predictor, overviews='FORCE_USE_EXISTING', bigtiff='IF_SAFER')
+        os.replace(cog_path, target_path)
+    finally:
+        for path in (tiled_path, cog_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    return {'factors': factors, 'resampling': resampling.name}
+
+
+class CogMirror:
+
+    def __init__(self, mirror_dir=None):
+        if mirror_dir is None:
+            mirror_dir = os.environ.get('BEPMAT_MIRROR_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'bepmat', 'mirror'))
+
+        self.mirror_dir = mirror_dir
+        self.index_path = os.path.join(mirror_dir, 'index.json')
+        os.makedirs(mirror_dir, exist_ok=True)
+        self._index = {}
+        self._index_mtime = None
+
+    @staticmethod
+    def _source_key(raster_path):
+        raster_path = raster_path.strip()
+        if raster_path.startswith(('http://', 'https://')):
+            return raster_path
+        return os.path.abspath(raster_path)
+
+    # The index maps every source URL or path to its COG. It is only read again when the file changes, since
+    # open_raster looks every raster up in it.
+    def index(self):
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            return {}
+        if mtime != self._index_mtime:
+            with open(self.index_path) as f:
+                self._index = json.load(f)
+            self._index_mtime = mtime
+        return self._index
+
+    def _save_index(self, index):
+        fd, tmp_path = tempfile.mkstemp(dir=self.mirror_dir, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def lookup(self, raster_path):
+        entry = self.index().get(self._source_key(raster_path))
+        if entry is None:
+            return None
+        path = os.path.join(self.mirror_dir, entry['file'])
+        return path if os.path.exists(path) else None
+
+    # Writing the COG of a raster, which can be done in another process, and returning its entry in the index
+    def convert(self, raster_path, resampling=Resampling.average, grid_resolution=None):
+        key = self._source_key(raster_path)
+        source = get_raster_cache().resolve(key) if key.startswith(('http://', 'https://')) else key
+        file_name = hashlib.sha256(key.encode()).hexdigest()[:16] + '_' + os.path.basename(key)
+        with trace_span('write_cog', layer=os.path.basename(key)):
+            entry = write_cog(source, os.path.join(self.mirror_dir, file_name), resampling, grid_resolution)
+        return dict(entry, file=file_name, created=time.time())
+
+    def record(self, raster_path, entry):
+        # Read again in case another process added rasters in the meantime
+        index = dict(self.index())
+        index[self._source_key(raster_path)] = entry
+        self._save_index(index)
+        return os.path.join(self.mirror_dir, entry['file'])
+
+    def add(self, raster_path, resampling=Resampling.average, overwrite=False, grid_resolution=None):
+        mirrored = self.lookup(raster_path)
+        if mirrored is not None and not overwrite:
+            return mirrored
+        return self.record(raster_path, self.convert(raster_path, resampling, grid_resolution))
+
+
+cog_mirror = CogMirror() if os.environ.get('BEPMAT_MIRROR_DIR') else None
+
+
+def set_cog_mirror(mirror_dir=None):
+    global cog_mirror
+    cog_mirror = CogMirror(mirror_dir)
+    return cog_mirror
+
+
+# The rasters of the catalogs matching the filters (as in prefetch_rasters) with the resampling of their overviews,
+# along with the pasture layer
+def mirror_sources(themes=tuple(catalog_files), **filters):
+    sources = {}
+    for theme in themes:
+        for url in catalog_urls(theme, **filters):
+            sources[url] = mirror_resampling.get(theme, Resampling.average)
+
+    pasture_path = exclusion_layer_path('pasture', None, None)
+    if os.path.exists(pasture_path):
+        sources[pasture_path] = mirror_resampling['pasture']
+    return sources
+
+
+def build_cog_mirror(mirror=None, themes=tuple(catalog_files), max_workers=1, overwrite=False, **filters):
+    if mirror is None:
+        mirror = cog_mirror if cog_mirror is not None else set_cog_mirror()
+    sources = {source: resampling for source, resampling in mirror_sources(themes, **filters).items()
+               if overwrite or mirror.lookup(source) is None}
+    grid_resolution = working_resolution()
+
+    if max_workers <= 1:
+        return [mirror.add(source, resampling, True, grid_resolution) for source, resampling in sources.items()]
+
+    # The COGs are written by the workers and recorded in the index by this process only
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {source: executor.submit(mirror.convert, source, resampling, grid_resolution)
+                   for source, resampling in sources.items()}
+        return [mirror.record(source, future.result()) for source, future in futures.items()]
+
+
+# ## Creating a shapefile generator which can generate the gadm shapefile for any region.
+
+# In[3]:
+
+
+def shapefile_generator(country, province=None, simplified=False):
+    if province:
+        # Shapefile for a specific province
+        return get_boundary_store().get(country, province, simplified=simplified)
+    else:
+        # Shapefile for the entire country
+        return get_boundary_store().get(country, simplified=simplified)
+
+
+# ### Local store of the GADM boundaries
+# Downloading the GADM file of a country for every region is slow and needs a connection, so the boundaries are kept
+# in a local GeoPackage (BEPMAT_BOUNDARY_DIR, by default ~/.cache/bepmat/boundaries) with one layer per
+# administrative level, both at full resolution and simplified. The GeoPackage keeps a spatial index of every layer
+# and the store adds an index on the country code and province name, so that a lookup only reads the polygons it
+# needs. A country is downloaded the first time it is used, or all the countries of Countries&Provinces.csv can be
+# added at once with boundary_store.build(). Boundaries which are not in GADM (or a different version of them) can be
+# added from any file readable by geopandas with boundary_store.add_boundaries(); they are used before the GADM ones.
+# With BEPMAT_OFFLINE set, only the boundaries already in the store are used.
+# 
+# The simplified boundaries are simplified with a tolerance of 0.01 degrees, well below the 5 arc-minute pixels.
+
+# In[ ]:
+
+
+class BoundaryStore:
+
+    def __init__(self, store_dir=None, simplify_tolerance=0.01, offline=None):
+        if store_dir is None:
+            store_dir = os.environ.get('BEPMAT_BOUNDARY_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'bepmat', 'boundaries'))
+        if offline is None:
+            offline = os.environ.get('BEPMAT_OFFLINE', '0').lower() in ('1', 'true', 'yes')
+
+        self.store_dir = store_dir
+        self.simplify_tolerance = simplify_tolerance
+        self.offline = offline
+        self.path = os.path.join(store_dir, 'boundaries.gpkg')
+        self._cache = {}
+        os.makedirs(store_dir, exist_ok=True)
+
+    @staticmethod
+    def _layer(level, simplified=False, source='gadm'):
+        return f"{source}_level{level}" + ('_simplified' if simplified else '')
+
+    def layers(self):
+        if not os.path.exists(self.path):
+            return []
+        connection = sqlite3.connect(self.path)
+        try:
+            return [row[0] for row in connection.execute("SELECT table_name FROM gpkg_contents")]
+        finally:
+            connection.close()
+
+    @staticmethod
+    def country_code(country):
+        import pycountry
+        try:
+            return pycountry.countries.lookup(country).alpha_3
+        except LookupError:
+            return None
+
+    @staticmethod
+    def _quote(value):
+        return "'" + str(value).replace("'", "''") + "'"
+
+    def _where(self, country, province=None):
+        code = self.country_code(country)
+        where = f"GID_0 = {self._quote(code)}" if code else f"COUNTRY = {self._quote(country)}"
+        if province is not None:
+            where += f" AND NAME_1 = {self._quote(province)}"
+        return where
+
+    def _read(self, layer, where=None, bbox=None):
+        import geopandas as gpd
+        return gpd.read_file(self.path, layer=layer, where=where, bbox=bbox)
+
+    # Every geometry is stored as a MultiPolygon so that the polygons of all the countries fit in the same layer
+    def _write(self, boundaries, level, source):
+        boundaries = boundaries.to_crs('EPSG:4326') if boundaries.crs is not None else boundaries.set_crs('EPSG:4326')
+        boundaries = boundaries.set_geometry(
+            [MultiPolygon([geometry]) if geometry.geom_type == 'Polygon' else geometry for geometry in boundaries.geometry],
+            crs=boundaries.crs)
+        simplified = boundaries.set_geometry(boundaries.geometry.simplify(self.simplify_tolerance), crs=boundaries.crs)
+
+        existing = self.layers()
+        for is_simplified, data in ((False, boundaries), (True, simplified)):
+            layer = self._layer(level, is_simplified, source)
+            data.to_file(self.path, layer=layer, driver='GPKG', mode='a' if layer in existing else 'w')
+
+        # Index on the names so that a region is found without scanning the whole layer
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                for is_simplified in (False, True):
+                    layer = self._layer(level, is_simplified, source)
+                    columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{layer}")')]
+                    names = [column for column in ('GID_0', 'COUNTRY', 'NAME_1') if column in columns]
+                    if names:
+                        connection.execute(f'CREATE INDEX IF NOT EXISTS "{layer}_names" ON "{layer}" '
+                                           f'({", ".join(names)})')
+        finally:
+            connection.close()
+        self._cache.clear()
+
+    def add_country(self, country):
+        if self.offline:
+            raise ValueError(f"The boundaries of {country} are not in the boundary store and the store is offline")
+
+        from gadm import GADMDownloader
+        downloader = GADMDownloader(version="4.0")
+        for level in (0, 1):
+            boundaries = downloader.get_shape_data_by_country_name(country_name=country, ad_level=level)
+            if boundaries is not None:
+                self._write(boundaries, level, 'gadm')
+
+    # Adding all the countries of the catalog of countries and provinces at once
+    def build(self, countries=None):
+        if countries is None:
+            countries = pd.read_csv(os.path.join(data_dir, 'Countries&Provinces.csv'))['NAME_0'].unique()
+
+        added = []
+        for country in countries:
+            if not self.contains(country):
+                self.add_country(country)
+                added.append(country)
+        return added
+
+    # The boundaries given by the user need the columns GID_0 (ISO 3166 alpha-3 code of the country) or COUNTRY, and
+    # NAME_1 for provinces, which can be renamed from other columns with the columns argument.
+    def add_boundaries(self, boundaries, level, columns=None):
+        if isinstance(boundaries, str):
+            import geopandas as gpd
+            boundaries = gpd.read_file(boundaries)
+        if columns:
+            boundaries = boundaries.rename(columns=columns)
+        if 'GID_0' not in boundaries.columns and 'COUNTRY' in boundaries.columns:
+            boundaries = boundaries.assign(GID_0=[self.country_code(country) or '' for country in boundaries['COUNTRY']])
+        self._write(boundaries, level, 'user')
+
+    def _lookup(self, country, province, level, simplified):
+        layers = self.layers()
+        for source in ('user', 'gadm'):
+            layer = self._layer(level, simplified, source)
+            if layer in layers:
+                boundaries = self._read(layer, where=self._where(country, province))
+                if len(boundaries):
+                    return boundaries
+        return None
+
+    def contains(self, country, level=0):
+        return self._lookup(country, None, level, False) is not None
+
+    def get(self, country, province=None, level=None, simplified=False):
+        if level is None:
+            level = 1 if province else 0
+
+        key = (country, province, level, simplified)
+        if key not in self._cache:
+            boundaries = self._lookup(country, province, level, simplified)
+            if boundaries is None and not self.contains(country, level):
+                self.add_country(country)
+                boundaries = self._lookup(country, province, level, simplified)
+            if boundaries is None:
+                import geopandas as gpd
+                boundaries = gpd.GeoDataFrame(geometry=[], crs='EPSG:4326')
+            self._cache[key] = boundaries
+
+        return self._cache[key].copy()
+
+    # The regions of an administrative level intersecting a bounding box (min lon, min lat, max lon, max lat), found
+    # with the spatial index of the GeoPackage
+    def regions_in_bounds(self, bounds, level=1, simplified=True):
+        frames = [self._read(layer, bbox=tuple(bounds)) for layer in
+                  (self._layer(level, simplified, 'user'), self._layer(level, simplified, 'gadm')) if layer in self.layers()]
+        if not frames:
+            import geopandas as gpd
+            return gpd.GeoDataFrame(geometry=[], crs='EPSG:4326')
+        return pd.concat(frames, ignore_index=True)
+
+
+def get_boundary_store():
+    if 'boundary_store' not in globals():
+        set_boundary_store()
+    return boundary_store
+
+
+def set_boundary_store(store_dir=None, simplify_tolerance=0.01, offline=None):
+    global boundary_store
+    boundary_store = BoundaryStore(store_dir, simplify_tolerance, offline)
+    return boundary_store
+
+
+# ## Notebook work flow: 
+# - We start with the simplest calculations of the raw biomass energy we could have obtained from the harvests in the past using the data for years 2000 and 2010 (This is only applicable for cropland since this was the land that was actually harvested and we are keeping the marginal for maximizing the energy output in the future).
+# - Next we will calculate the residue and the raw biomass energy potential from the cropland in the future 
+# - Finally we will calculate the residue and the raw biomass energy potential from the marginal land in the future
+# - We will keep defining helper functions along the way wherever required.
+
+# ## I. Raw Biomass Energy Potential from Agricultural Residues using Actual Yields and Production (2000 and 2010) [GAEZv4 Theme 5 : Actual Yields and Productions]
+# Theme 5 spatial layers include mapped distributions of harvested area, yield and production at 5 arc-minute resolution for 26 major crops/crop groups, separately in rain-fed and irrigated cropland. Country totals are based on FAO statistics for the years 2009-2011. Also included are estimates of the spatial distribution of total crop production value and the production values of major crop groups (cereals, root crops, oil crops), all valued at year 2000 international prices, separately for rain-fed and irrigated cropland. 
+
+# ### Creating the dataset for calculating the biomass energy potential from the production values
+
+#  To be able to calculate the Biomass potential we will need the crop Residue-to-Product Ratio, Surplus Availability Factor/
+#  Availability Factor and Lower Heating Value. The following table summarizes these values for the crops we have from the 
+#  actual yields and production data:
+# 
+# | Crop         | Residue Type  | RPR   | SAF   | LHV (MJ/kg) | Sources         |
+# |--------------|---------------|-------|-------|-------------|-----------------|
+# | Maize        | Stalk         | 2     | 0.8   | 16.3        | a, b, j         |
+# |              | Cob           | 0.273 | 1     | 16.63       |                 |
+# |              | Husk          | 0.2   | 1     | 15.56       |                 |
+# | Rice         | Straw         | 1.757 | 0.684 | 8.83        | b, d, e         |
+# |              | Husk          | 0.23  | 0.83  | 12.9        | c, e, f         |
+# | Sorghum      | Straw         | 1.25  | 0.8   | 12.38       | a, b            |
+# |              | Husk          | 1.4   | 1     | 13          | c, j            |
+# | Millet       | Straw         | 1.4   | 1     | 13          | c, j            |
+# |              | Stalk         | 1.75  | 0.8   | 15.51       | a, b, f         |
+# | Wheat        | Straw         | 1.2   | 0.29  | 15.6        | b, j            |
+# |              | Husk          | 0.23  | 0.29  | 12.9        | b, f            |
+# | Cassava      | Stalk         | 0.062 | 0.407 | 16.99       | a, d, e         |
+# |              | Peelings      | 3     | 0.2   | 10.61       | a, i            |
+# | Cocoyam      | Peelings      | 0.2   | 0.8   | 10.61       | i, j            |
+# | Sweet potato | Peelings      | 0.6   | 0.8   | 10.61       | b, j            |
+# | Yam          | Peelings      | 0.2   | 0.8   | 10.61       | i, j            |
+# | Potatoes     | Peelings      | 0.75  | 0.8   | 10.61       | i, j            |
+# | Groundnuts   | Shells/husks  | 0.477 | 1     | 15.56       | a, i, c         |
+# |              | Straw         | 2.3   | 1     | 17.58       | a               |
+# | Palm oil     | Fiber         | 0.147 | 1     | 19.94       | a, i            |
+# |              | Shells        | 0.049 | 1     | 21.1        | a, i            |
+# |              | Fronds        | 2.604 | 1     | 7.97        | i               |
+# |              | Empty bunches | 0.428 | 1     | 19.41       | a, i            |
+# |              | Male bunches  | 0.233 | 1     | 14.86       | i, j            |
+# | Beans(In Pulses)| Straw      | 2.5   | 1     | 12.38       | j               |
+# | Soybean      | Straw         | 2.66  | 0.8   | 18          | b, f            |
+# |              | Pods          | 1     | 0.8   | 18          | a, b, f         |
+# | Banana       | leaves        | 0.35  | 1     | 11.37       | g               |
+# |              | stem          | 5.6   | 1     | 11.66       | a, j            |
+# |              | peels         | 0.25  | 1     | 17          | h, j            |
+# | Plantain(With Bananas)| leaves| 0.35 | 0.8   | 12.12       | g, i            |
+# |              | stem          | 3.91  | 0.8   | 10.9        | g, i            |
+# |              | peels         | 0.25  | 1     | 12.56       | a, h            |
+# | Sugar Cane   | baggase       | 0.25  | 1     | 6.43        | b, c            |
+# |              | tops/leaves   | 0.32  | 0.8   | 15.8        | b, c            |
+# | Coffee       | husk          | 1     | 1     | 12.8        | b, c            |
+# | Cocoa        | pods/husks    | 1     | 1     | 15.48       | j               |
+# | Cotton       | stalk         | 2.1   | 1     | 15.9        | c, i            |
+# | Barley       | straw         | 0.75  | 0.15  | 17.5        | k               |
+# |              | stalk         | 1.60  | 0.60  | 18.5        | k               |
+# | Tobacco      | stalk         | 1.20  | 0.60  | 16.1        | k               |
+# | Sunflower    | stalk         | 2.50  | 0.60  | 14.2        | k               |
+# | Sugarbeet    | residue       | 0.66  | 0.09  | 20.85       | p,q             |
+# | Rapeseed     | straw         | 1.58  | 0.23  | 14.55       | l               |    
+# | Olives       | cake          | 0.40  | 0.90  | 19.7        | k               |
+# | Lettuce      | waste         |1.2    | 0.50  | 12.8        | l               |
+# | Tomatoes     | stem          |0.3    | 0.50  | 13.7        | l               |
+# | Tomatoes     | leaves        |0.3    | 0.50  | 13.7        | l               |
+# | Green peppers| residues      |0.45   | 0.50  | 12.0        | l               |
+# | Red Peppers  | residues      |0.45   | 0.50  | 12.0        | l               |
+# | Other Cereals| straw         | 1.2   | 0.40  | 16.845      | n,o             |
+# | Rest of Crops| residue       | 0     | 0     | 0           | Not found       |
+# | Fodder Crops | straw         | 0.4   | 0     | 0           | p               |   
+# | Tur          | stalk         | 2.5   | 0.38  |18.58        | m               |
+# | Lentils      | stalk         | 1.8   | 0.38  |14.65        | m               |
+# | Gaur         | stalk         | 1.0   | 0.38  |16.02        | m               |
+# | Gram         | stalk         | 1.1   | 0.38  |16.02        | m               |
+# | Fruits and Nuts|pruning      | 0     | 0     |0            | Not found       |
+
+# So for calculating the biomass potential of residues we have the production values data from GAEZ v4 for the years 2000 and 2010 which we will be using. The data in these rasters gives us the production of the particular crop in 1000 tonnes or 1 mln GK\\$. The other unit present in the data is mln GK\\$ which is used by FAO for crop groups like Fodder Crops, Pulses, Vegetables etc.
+# 
+# The documentation of the GAEZ v4 describes the yield as either tonnes/hectare or 1000 GK\\$/hectare. From this, we derive that 1 million GK\\$ = 1000 tonnes.
+# 
+# The following group contains the following crops according the GAEZ v4 Documentation:
+# - Fodder Crops: All commodities in FAOSTAT primary crop production domain ranging from forage and silage, maize to vegetables and roots fodders.
+# - Pulses: Bambara beans; beans, dry; broad beans, dry; chick peas; cow peas, dry;lentils; peas, dry; pigeon peas; pulses, other
+# - Other cereals: Buckwheat; canary seed; fonio; mixed grain; oats; pop corn; quinoa; rye; triticale;
+# - Yams and other roots: Taro; yautia; yams; roots and tubers;
+# - Other crops: Includes all other crops from FAOSTAT production domain not covered by 25 crop groups above and excluding coir, vegetable tallow, oil of stillinga, oil of citronella, essential oils and rubber, natural.
+# 
+# 
+# Assumptions made on the basis of GAEZ V4 documentation, from which we are using actual yield data:
+# - Stimulants in the GAEZ v4 includes Cocoa Beans, Coffee, Green Tea, Tea. We have till now considered only Cocoa and Coffee.
+# - In Yams and other roots, till now we have only included Yams and Coco Yams(Taro)
+# - In Vegetables we have taken Green and Red Peppers (Residues), Tomatoes (Stem and Leaves) and Lettuce (Waste) (We will take their mean value for RPR, SAF, and LHV since individual weightage in the crop yield is not available.)
+# - In Pulses, we have taken Tur, Gaur, Gram, Beans and Lentils.(We will use their average based on same reason as above).
+# - In Other Cereals, we have taken oats and rye.(We will use their average based on same reason as above).
+# 
+# 
+
+# ## References for the above data:
+# RPR and LHV values given were obtained from already published studies conducted in other countries, such as Ghana, Uganda, Zambia and China.
+# 
+# A source for most of these references was: https://www.aimspress.com/article/doi/10.3934/energy.2023002?viewType=HTML.
+# The references are as follows:
+# - a. Jekayinfa SO, Scholz V (2009) Potential availability of energetically usable crop residues in Nigeria. Energy Sources, Part A: Recovery, Util, Environ Effects 31: 687–697. https://doi.org/10.1080/15567030701750549 doi: 10.1080/15567030701750549.
+# - b. Gabisa EW, Gheewala SH (2018) Potential of bio-energy production in Ethiopia based on available biomass residues. Biomass Bioenergy 111: 77–87. https://doi.org/10.1016/j.biombioe.2018.02.009 doi: 10.1016/j.biombioe.2018.02.009.
+# - c. Okello C, Pindozzi S, Faugno S, et al. (2013) Bioenergy potential of agricultural and forest residues in Uganda. Biomass Bioenergy 56: 515–525. https://doi.org/10.1016/j.biombioe.2013.06.003 doi: 10.1016/j.biombioe.2013.06.003.
+# - d. Koopmans A, Koppenjan J (1998) The Resource Base. Reg Consult Mod Appl Biomass Energy, 6–10.
+# - e. San V, Ly D, Check NI (2013) Assessment of sustainable energy potential on non-plantation biomass resources in Sameakki Meanchey district in Kampong Chhnan pronice, Cambonia. Int J Environ Rural Dev 4: 173–178.
+# - f. Yang J, Wang X, Ma H, et al. (2014) Potential usage, vertical value chain and challenge of biomass resource: Evidence from China's crop residues. Appl Energy 114: 717–723. https://doi.org/10.1016/j.apenergy.2013.10.019 doi: 10.1016/j.apenergy.2013.10.019.
+# - g. Patiño FGB, Araque JA, Kafarov DV (2016) Assessment of the energy potential of agricultural residues in non-interconnected zones of Colombia: Case study of Chocó and Putumayo katherine Rodríguez cáceres. Chem Eng Trans 50: 349–354. https://doi.org/10.3303/CET1650059 doi: 10.3303/CET1650059.
+# - h. Milbrandt A (2011) Assessment of biomass resources in Liberia. Liberia: Dev Resour, 117–166.
+# - i.Kemausuor F, Kamp A, Thomsen ST, et al. (2014) Assessment of biomass residue availability and bioenergy yields in Ghana. Resou Conser Recycl 86: 28–37. https://doi.org/10.1016/j.resconrec.2014.01.007 doi: 10.1016/j.resconrec.2014.01.007.
+# - j. Mboumboue E, Njomo D (2018) Biomass resources assessment and bioenergy generation for a clean and sustainable development in Cameroon. Biomass Bioenergy 118: 16–23. https://doi.org/10.1016/j.biombioe.2018.08.002 doi: 10.1016/j.biombioe.2018.08.002.
+# - k. https://www.researchgate.net/publication/342000532_Agricultural_Residues_Potential_of_Hatay.
+# - l. https://www.ncbi.nlm.nih.gov/pmc/articles/PMC9941997/.
+# - m. https://www.saarcenergy.org/wp-content/uploads/2020/03/Final-Draft-SEC-report-on-crop-residue_14022020-1540-IM-1.pdf.
+# - n. https://www.sciencedirect.com/science/article/pii/S0956053X10002436?via%3Dihub.
+# - o. https://www.sciencedirect.com/science/article/pii/S0921344920305280.
+# - p. https://www.diva-portal.org/smash/get/diva2:1208954/FULLTEXT01.pdf.
+# - q.https://www.researchgate.net/publication/317490809_VALORIZATION_OF_SUGAR_BEET_PULP_RESIDUE_AS_A_SOLID_FUEL_VIA_TORREFACTION
+
+# Now the final table sorted by crop names which will be converted into a pandas data frame for us to use will contain: 
+# - All the vegetables combined into Vegetables row.
+# - Coffee & Cocoa combined under stimulants row.
+# - All the pulses as mentioned above will be grouped under pulses row.
+# 
+# <h2><center>Final Crop Table with RPR, SAF and LHV values</center></h2>
+# 
+# | Crop         | Residue Type  | RPR   | SAF   | LHV (MJ/kg) |
+# |--------------|---------------|-------|-------|-------------|
+# | Banana       | leaves        | 0.35  | 0.9   | 11.745      |
+# | Banana       | peels         | 0.25  | 1     | 14.78       |
+# | Banana       | stem          | 4.90  | 0.9   | 11.66       |
+# | Barley       | stalk         | 1.60  | 0.60  | 18.5        |
+# | Barley       | straw         | 0.75  | 0.15  | 17.5        |
+# | Cassava      | Peelings      | 3     | 0.2   | 10.61       |
+# | Cassava      | Stalk         | 0.062 | 0.407 | 16.99       |
+# | Cotton       | stalk         | 2.1   | 1     | 15.9        |
+# | Fodder Crops | straw         | 0.4   | 0     | 0           |
+# |Fruits and nuts| pruning      | 0     | 0     | 0           |
+# | Groundnut    | Shells/husks  | 0.477 | 1     | 15.56       |
+# | Groundnut    | Straw         | 2.3   | 1     | 17.58       |
+# | Maize        | Cob           | 0.273 | 1     | 16.63       |
+# | Maize        | Husk          | 0.2   | 1     | 15.56       |
+# | Maize        | Stalk         | 2     | 0.8   | 16.3        |
+# | Millet       | Stalk         | 1.75  | 0.8   | 15.51       |
+# | Millet       | Straw         | 1.4   | 1     | 13          |
+# | Other Cereals| straw         | 1.2   | 0.40  | 16.845      |
+# | Oil palm     | Empty bunches | 0.428 | 1     | 19.41       |
+# | Oil palm     | Fiber         | 0.147 | 1     | 19.94       |
+# | Oil palm     | Fronds        | 2.604 | 1     | 7.97        |
+# | Oil palm     | Male bunches  | 0.233 | 1     | 14.86       |
+# | Oil palm     | Shells        | 0.049 | 1     | 21.1        |
+# | Olive        | Cake          | 0.40  | 0.9   | 19.7        |
+# | Potato and Sweet Potato | Peelings | 0.675 |0.8  |10.61|
+# | Pulses       | stalk         | 1.78  | 0.504 |15.53        |
+# | Rapeseed     | straw         | 1.58  | 0.23  | 14.55       |
+# | Wetland rice | Husk          | 0.23  | 0.83  | 12.9        |
+# | Wetland rice | Straw         | 1.757 | 0.684 | 8.83        |
+# | Sorghum      | Husk          | 1.4   | 1     | 13          |
+# | Sorghum      | Straw         | 1.25  | 0.8   | 12.38       |
+# | Soybean      | Pods          | 1     | 0.8   | 18          |
+# | Soybean      | Straw         | 2.66  | 0.8   | 18          |
+# | Stimulants   | husks         | 1     | 1     | 14.14       |
+# | Sugar Cane   | bagasse       | 0.25  | 1     | 6.43        |
+# | Sugar Cane   | tops/leaves   | 0.32  | 0.8   | 15.8        |
+# | Sugar beet   | residue       | 0.66  | 0.09  | 20.85       |
+# | Sunflower    | stalk         | 2.50  | 0.60  | 14.2        |
+# | Tobacco      | stalk         | 1.20  | 0.60  | 16.1        |
+# | Vegetables   | residue       | 0.675 | 0.50  | 12.625      |
+# | Wheat        | Husk          | 0.23  | 0.29  | 12.9        |
+# | Wheat        | Straw         | 1.2   | 0.29  | 15.6        |
+# | Yam and others| Peelings     | 0.2   | 0.8   | 10.61       |
+# | Rest of crops| Residue       | 0.0   | 0.0   | 0           |
+# |
+# 
+
+# ### REMARK : Incase you have your own RPR , SAF and LHV values for your region, you can pass them to the biomass functions with the residue_table argument as a DataFrame with the same columns as the tables below (load_residue_table can read one from a CSV file) to obtain more region specific results.
+
+# In[4]:
+
+
+# Now importing the table in pandas format so that we can use it for geospatial analysis
+# Defining the table data
+data = [
+    ['Banana', 'leaves', 0.35, 0.9, 11.745],
+    ['Banana', 'peels', 0.25, 1, 14.78],
+    ['Banana', 'stem', 4.90, 0.9, 11.66],
+    ['Barley', 'stalk', 1.60, 0.60, 18.5],
+    ['Barley', 'straw', 0.75, 0.15, 17.5],
+    ['Cassava', 'Peelings', 3, 0.2, 10.61],
+    ['Cassava', 'Stalk', 0.062, 0.407, 16.99],
+    ['Cotton', 'stalk', 2.1, 1, 15.9],
+    ['Fodder crops', 'straw', 0.4, 0, 0],
+    ['Fruits and nuts', 'Pruning' , 0, 0, 0],
+    ['Groundnut', 'Shells/husks', 0.477, 1, 15.56],
+    ['Groundnut', 'Straw', 2.3, 1, 17.58],
+    ['Maize', 'Cob', 0.273, 1, 16.63],
+    ['Maize', 'Husk', 0.2, 1, 15.56],
+    ['Maize', 'Stalk', 2, 0.8, 16.3],
+    ['Millet', 'Stalk', 1.75, 0.8, 15.51],
+    ['Millet', 'Straw', 1.4, 1, 13],
+    ['Other cereals', 'straw', 1.2, 0.40, 16.845],
+    ['Oil palm', 'Empty bunches', 0.428, 1, 19.41],
+    ['Oil palm', 'Fiber', 0.147, 1, 19.94],
+    ['Oil palm', 'Fronds', 2.604, 1, 7.97],
+    ['Oil palm', 'Male bunches', 0.233, 1, 14.86],
+    ['Oil palm', 'Shells', 0.049, 1, 21.1],
+    ['Olive' , 'Cake', 0.4, 0.9, 19.7],
+    ['Potato and Sweet Potato', 'Peelings', 0.675, 0.8, 10.61],
+    ['Pulses', 'stalk', 1.78, 0.504, 15.53],
+    ['Rapeseed', 'straw', 1.58, 0.23, 14.55],
+    ['Wetland rice', 'Husk', 0.23, 0.83, 12.9],
+    ['Wetland rice', 'Straw', 1.757, 0.684, 8.83],
+    ['Sorghum', 'Husk', 1.4, 1, 13],
+    ['Sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Soybean', 'Pods', 1, 0.8, 18],
+    ['Soybean', 'Straw', 2.66, 0.8, 18],
+    ['Stimulants', 'husks', 1, 1, 14.14],
+    ['Sugarcane', 'baggase', 0.25, 1, 6.43],
+    ['Sugarcane', 'tops/leaves', 0.32, 0.8, 15.8],
+    ['Sugarbeet', 'residue', 0.66, 0.09, 20.85],
+    ['Sunflower', 'stalk', 2.50, 0.60, 14.2],
+    ['Tobacco', 'stalk', 1.20, 0.60, 16.1],
+    ['Vegetables', 'residue', 0.675, 0.50, 12.625],
+    ['Wheat', 'Husk', 0.23, 0.29, 12.9],
+    ['Wheat', 'Straw', 1.2, 0.29, 15.6],
+    ['Yams and other roots', 'Peelings', 0.2, 0.8, 10.61],
+    ['Rest of crops', 'Residue' , 0, 0, 0]
+]
+
+# Defining the column names
+columns = ['Crop', 'Residue Type', 'RPR', 'SAF', 'LHV (MJ/kg)']
+
+# Create the DataFrame
+residue_values = pd.DataFrame(data, columns=columns)
+
+
+# ### Defining the function for calculating raw biomass energy potential in the past (years 2000 and 2010)
+# This function will output an xarray containing all the crops and their corresponding biomass energy potential in each pixel and a final xarray called 'Combined' which gives the sum of all of these.
+
+# In[5]:
+
+
+# The band dimension comes up in a lot of places and is not needed for our calculations
+def remove_band_dimension(array):
+    if array.ndim == 3:
+        return array[0]
+    return array
+
+
+# In[6]:
+
+
+def get_lat_lon_from_transform(transform, shape):
+    ny, nx = shape
+    lons , lats = transform * np.mgrid[:nx, :ny]
+    return lats, lons
+
+
+# ### Reading only the window of a raster which covers the selected region
+# All the rasters used here are global, while we only need the few pixels that lie within the selected region. The 
+# RegionWindow below is computed once from the shapefile and is then used by every function to read only the
+# window of each raster intersecting the region. The polygon mask is rasterized once for every raster grid it is
+# used on (all the crop rasters of a theme share the same grid) and reused for every later read on that grid. The
+# arrays returned by read() are the same as the ones returned by rasterio's mask(src, shapes, crop=True).
+
+# In[ ]:
+
+
+class RegionWindow:
+
+    def __init__(self, shapefile):
+        self.shapefile = shapefile
+        self.shapes = list(shapefile.geometry)
+        self.bounds = tuple(shapefile.total_bounds)
+        self._windows = {}
+        self._masks = {}
+        self._memo = {}
+
+    # Rasters sharing the same transform and size share the same window and mask
+    @staticmethod
+    def _grid_key(src):
+        return tuple(src.transform)[:6] + (src.width, src.height)
+
+    def window(self, src):
+        key = self._grid_key(src)
+        if key not in self._windows:
+            try:
+                self._windows[key] = geometry_window(src, self.shapes)
+            except WindowError:
+                raise ValueError('Input shapes do not overlap raster.')
+        return self._windows[key]
+
+    def region_mask(self, src):
+        key = self._grid_key(src)
+        if key not in self._masks:
+            window = self.window(src)
+            self._masks[key] = geometry_mask(self.shapes, transform=src.window_transform(window),
+                                             out_shape=(int(window.height), int(window.width)))
+        return self._masks[key]
+
+    def read(self, src, nodata=None):
+        if nodata is None:
+            nodata = src.nodata if src.nodata is not None else 0
+
+        window = self.window(src)
+        data = src.read(window=window, masked=True)
+        trace_count('bytes_read', data.nbytes, layer_name(src.name))
+        data.mask = data.mask | self.region_mask(src)
+
+        return data.filled(nodata), src.window_transform(window)
+
+    # Intermediate results which do not depend on the scenario (the 2010 harvested areas, the exclusion, tree cover
+    # and pasture layers, ...) are computed once per region and layer and then reused by every scenario.
+    def memoize(self, layer, params, compute):
+        key = (layer,) + tuple(params)
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    # The window of a raster which is to be downsampled is grown to whole blocks of the downscale factor so that
+    # the downsampled pixels line up with the ones of the global downsampled raster.
+    def aligned_window(self, src, factor):
+        window = self.window(src)
+        col_start = (int(window.col_off) // factor) * factor
+        row_start = (int(window.row_off) // factor) * factor
+        col_stop = min(-(-int(window.col_off + window.width) // factor) * factor, src.width)
+        row_stop = min(-(-int(window.row_off + window.height) // factor) * factor, src.height)
+        return Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+
+def get_region_window(shapefile, region=None):
+    if region is None:
+        region = RegionWindow(shapefile)
+    return region
+
+
+# ### Grid of the selected region
+# The RegionGrid extends the region window with everything that describes the 5 arc-minute grid of the selected
+# region: its transform and shape, the boolean mask of the pixels lying inside the region, the latitude and longitude
+# of every pixel and the area of each pixel. It is built once from the GADM geometry and the reference raster and
+# is then passed to every function, so that the polygon is rasterized only once per run, however many crops, RCPs
+# and time periods are computed on it.
+
+# In[ ]:
+
+
+class RegionGrid(RegionWindow):
+
+    @traced('region_grid')
+    def __init__(self, shapefile, reference_raster=None, area_method='cosine'):
+        super().__init__(shapefile)
+        self.area_method = area_method
+
+        # Just a reference raster on the 5 arc-minute grid so the crop doesn't matter
+        if reference_raster is None:
+            reference_raster = catalog.reference_raster
+        self.reference_raster = reference_raster
+
+        with open_raster(reference_raster) as src:
+            window = self.window(src)
+            self.crs = src.crs
+            self.transform = src.window_transform(window)
+            self.shape = (int(window.height), int(window.width))
+            self.mask = ~self.region_mask(src)  # True for the pixels inside the region
+
+        self.lats, self.lons = get_lat_lon_from_transform(self.transform, self.shape)
+        self._pixel_area = None
+        trace_count('allocated_bytes', self.mask.nbytes + self.lats.nbytes + self.lons.nbytes, 'region_grid')
+
+    # Area of the pixels inside the region in hectares, 0 outside and where the reference raster has no data, as
+    # extract_pixel_area gives it. It keeps the band dimension of the rasters.
+    @property
+    def pixel_area(self):
+        if self._pixel_area is None:
+            row_area = pixel_area_per_row(self.transform, self.shape[0], self.area_method)
+            with open_raster(self.reference_raster) as src:
+                clipped_data, _ = self.read(src)
+                valid = self.mask if src.nodata is None else (clipped_data[0] != src.nodata) & self.mask
+            self._pixel_area = (row_area[:, np.newaxis] * valid)[np.newaxis]
+            trace_count('allocated_bytes', self._pixel_area.nbytes, 'pixel_area')
+        return self._pixel_area
+
+
+def get_region_grid(shapefile, region=None):
+    if region is None:
+        region = RegionGrid(shapefile)
+    return region
+
+
+# Reading the clipped raster of a crop from a selection of one of the catalogs (see catalog.select). Rasters which are
+# used by every scenario, like the 2010 harvested areas, are kept in the region's memo.
+def read_crop_raster(required_rasters, crop, region, memoize=False):
+    required_url = required_rasters[crop]
+
+    def read():
+        with open_raster(required_url) as src:
+            clipped, _ = region.read(src)
+        return clipped
+
+    if memoize:
+        return region.memoize('raster', (required_url,), read)
+    return read()
+
+
+# Keeping only the given crops of a catalog, in the order of the catalog, when a list of crops is passed
+def select_crops(unique_crops, crops=None):
+    if crops is None:
+        return unique_crops
+    if isinstance(crops, str):
+        crops = [crops]
+
+    wanted = set(crops)
+    selected = [crop for crop in unique_crops if crop in wanted]
+    if not selected:
+        raise ValueError(f"None of the crops {list(crops)} are available, the crops are {list(unique_crops)}")
+    return np.array(selected, dtype=object)
+
+
+
+# In[7]:
+
+
+@traced()
+def biomass_potential_past(shapefile, time_period, water_supply, region=None, residue_table=None, lazy=False,
+                           crops=None):
+
+    region = get_region_grid(shapefile, region)
+    if lazy:
+        return lazy_biomass_potential_past(time_period, water_supply, region, residue_table, crops)
+
+    unique_crops_actual = select_crops(catalog.crops('production_values'), crops)
+    required_production_values = catalog.select('production_values', unique_crops_actual, time_period=time_period,
+                                                water_supply=water_supply)
+
+    # For defining size of the array to be used 
+    lats_init, lons_init = region.lats, region.lons
+
+    # Create xarray Dataset to store individual biomass potentials for each crop
+    individual_biomass_potentials = {}
+
+    # Variable to hold the net sum of all crops and their residues
+    net_sum = 0.0
+
+    # Initialize 'net_biomass_potential_array' before the loop
+    net_biomass_potential_array = xr.DataArray(data=np.zeros(region.shape,  dtype='float32'),
+                                               dims=('y', 'x'),
+            coords={'y': range(region.shape[0]), 'x': range(region.shape[1]),
+                                'latitude': (('x', 'y'), lats_init), 'longitude': (('x', 'y'), lons_init)},
+                                               attrs={'units': 'PetaJoules',
+                                                      'sum production': 0.0})  # Add initial sum as an attribute
+
+    # Stacking the clipped production of every crop into a single (crop, y, x) array
+    crop_production = np.stack([remove_band_dimension(read_crop_raster(required_production_values, crop, region))
+                                for crop in unique_crops_actual])
+    trace_count('allocated_bytes', crop_production.nbytes, 'biomass_potential_past')
+
+    # Multiplying each crop with the sum of LHV * SAF * RPR over its residues
+    # Unit conversion for MJ to J and 1000 tonnes to kilograms ; Then multiplying by 10**-12 for PetaJoules
+    factors = energy_factor_vector(unique_crops_actual, residue_table, residue_factors)
+    crop_residue_potentials = crop_production * factors[:, None, None]
+    crop_residue_sums = np.nansum(crop_production, axis=(1, 2)) * factors
+
+    with trace_span('xarray_assembly'):
+        for crop, crop_residue_shapefile, crop_residue_sum in zip(unique_crops_actual, crop_residue_potentials,
+                                                                   crop_residue_sums):
+        # Calculate the net sum for all crops and their residues
+            net_sum += crop_residue_sum
+
+        # Create xarray DataArray to store individual biomass potential for the current crop
+            crop_biomass_potential_array = xr.DataArray(data=crop_residue_shapefile,
+                                                        dims=('y', 'x'),
+                coords={'y': range(region.shape[0]), 'x': range(region.shape[1]),
+                                    'latitude': (('x', 'y'), lats_init), 'longitude': (('x', 'y'), lons_init)},
+                                                        attrs={'units': 'PetaJoules',
+                                                               'sum_production': crop_residue_sum})  # Add sum as an attribute
+
+            # Sum the individual biomass potential with the net biomass potential
+            net_biomass_potential_array += crop_biomass_potential_array
+
+            # Store the individual biomass potential for the current crop in the dictionary
+            individual_biomass_potentials[crop] = crop_biomass_potential_array
+
+        # Create xarray Dataset to hold all the individual biomass potentials for each crop
+        biomass_potentials_dataset = xr.Dataset(individual_biomass_potentials)
+
+        # Add the net sum of all crops and their residues as an attribute to the Dataset
+        biomass_potentials_dataset.attrs['Net Potential in PetaJ'] = net_sum
+
+        # Add the net_biomass_potential_array as a new variable named 'combined' to the biomass_potentials_dataset
+        biomass_potentials_dataset['Combined'] = net_biomass_potential_array
+    
+        biomass_potentials_dataset['Combined'].attrs['sum_production'] = net_sum
+
+    return biomass_potentials_dataset
+
+
+# #### Additional functions:
+# - The following functions help estimate the final numbers for the raw biomass energy potential for a region. It has two options.
+#     - Consolidated crop agnostic estimate
+#     - Crop-specific estimate
+
+# In[8]:
+
+
+def get_actual_data_biomass_potential_all(shapefile, time_period, water_supply, region=None):
+    
+    value = biomass_potential_past_totals(shapefile, time_period, water_supply, region)
+    
+    answer = value.sum()
+    
+    return answer
+
+def get_actual_data_biomass_potential_crop(shapefile, time_period, water_supply, crop, region=None):
+    
+    value = biomass_potential_past_totals(shapefile, time_period, water_supply, region, crops=[crop])
+    
+    answer = value[crop]
+    
+    return answer
+
+
+# These helpers only need the sums, so the rasters of the selected crops are read one at a time and reduced to
+# their sum without building the per pixel Dataset.
+@traced()
+def biomass_potential_past_totals(shapefile, time_period, water_supply, region=None, residue_table=None, crops=None):
+    region = get_region_window(shapefile, region)
+
+    unique_crops_actual = select_crops(catalog.crops('production_values'), crops)
+    required_production_values = catalog.select('production_values', unique_crops_actual, time_period=time_period,
+                                                water_supply=water_supply)
+
+    factors = energy_factor_vector(unique_crops_actual, residue_table, residue_factors)
+    crop_residue_sums = [np.nansum(read_crop_raster(required_production_values, crop, region)) * factor
+                         for crop, factor in zip(unique_crops_actual, factors)]
+    return pd.Series(crop_residue_sums, index=list(unique_crops_actual), dtype='float64')
+
+
+# So the above functions and code finishes our task of getting the Raw Biomass Energy Potential from the Cropland in the past. Next we will see the functions for calculating the Raw Biomass Energy Potential from the Cropland in the future.
+
+# ## II. Raw Biomass Energy Potential from Agricultural Residues using Actual Yields and Production for Harvested Area and Agro-Climatic Potential Yield for future yields [GAEZ-V4 Theme 5 and 3 respectively]
+# 
+# Theme 3 provides crop-wise information about: (1) Agro-Climatic Yield, (2) Constraint Factors, (3) Growth Cycle Attributes, and (4) Land Utilization Types (LUT) Selection.
+# 
+# Theme 5 spatial layers include mapped distributions of harvested area, yield and production at 5 arc-minute resolution for 26 major crops/crop groups, separately in rain-fed and irrigated cropland. Country totals are based on FAO statistics for the years 2009-2011. Also included are estimates of the spatial distribution of total crop production value and the production values of major crop groups (cereals, root crops, oil crops), all valued at year 2000 international prices, separately for rain-fed and irrigated cropland. 
+
+# Now since the future cropland data area data is not available to us we will be making an assumption. The assumption is that in the future the area under cropland which is required for us to ensure food security will remain the same as is was in the year 2010. So the harvest area data that we had from actual yields and production will serve as the cropland area for all future calculations. But since, with time the yield will vary and so will the residue from each crop. 
+# 
+# Assuming that RPR, SAF and LHV values also remain same for the crops in the future we will get the harvested area from the 2010 data for any shapefile and then multiply it with the future yield to get the future production. This will further be multiplied by RPR, SAF and LHV giving us raw biomass energy potential from cropland in the future. These values can then be compared with the past values calculated in part I to give us an idea as to how different future conditions affect the energy poential of the cropland. 
+
+# In[9]:
+
+
+@traced()
+def future_potential_cropland(time_period, climate_model, rcp, water_supply_future, input_level, shapefile_path, water_supply_2010,
+                              region=None, residue_table=None, lazy=False, crops=None):
+    
+    region = get_region_grid(shapefile_path, region)
+    if lazy:
+        return lazy_future_potential_cropland(time_period, climate_model, rcp, water_supply_future, input_level,
+                                              water_supply_2010, region, residue_table, crops)
+
+    unique_crops = select_crops(cropland_crops(), crops)
+    required_harvested_area = harvested_area_2010(water_supply_2010, unique_crops)
+
+    required_potential_yields = potential_yield_rasters(unique_crops, time_period, climate_model, rcp,
+                                                        water_supply_future, input_level)
+    
+    # For defining size of the xarray
+    lats_init, lons_init = region.lats, region.lons
+
+
+    # Create xarray DataArray to store the net biomass potential for each pixel
+    net_biomass_potential_array = xr.DataArray(data=0.0,
+                                               dims=('y', 'x'),
+            coords={'y': range(region.shape[0]), 'x': range(region.shape[1]),
+                                'latitude': (('x', 'y'), lats_init), 'longitude': (('x', 'y'), lons_init)},
+                                               attrs={'units': 'PetaJoules'})
+    
+
+    # Create xarray Dataset to store individual biomass potentials for each crop
+    individual_biomass_potentials = {}
+
+    # Variable to store the net sum of sum products
+    net_sum = 0.0
+
+    # Stacking the product of the 2010 harvested area and the future yield of every crop into a (crop, y, x) array
+    products = []
+    for crop in unique_crops:
+        clipped_1 = np.nan_to_num(read_crop_raster(required_harvested_area, crop, region, memoize=True))
+        clipped_3 = np.nan_to_num(read_crop_raster(required_potential_yields, crop, region))
+        
+         # Remove the 'bands' dimension if it exists (since it's not needed)
+        clipped_1 = remove_band_dimension(clipped_1)
+        clipped_3 = remove_band_dimension(clipped_3)
+
+        products.append(np.multiply(clipped_1, clipped_3))
+    products = np.stack(products)
+    trace_count('allocated_bytes', products.nbytes, 'future_potential_cropland')
+
+    # Multiply the products with the sum of RPR * SAF * LHV over the residues of each crop
+    factors = energy_factor_vector(unique_crops, residue_table, residue_factors) * (10 ** -3) # Unit conversion factor to PetaJoules
+    net_product_arrays = products * factors[:, None, None]
+    crop_sums = np.nansum(products, axis=(1, 2)) * factors
+
+    with trace_span('xarray_assembly'):
+        for crop, net_product_array, temp_sum in zip(unique_crops, net_product_arrays, crop_sums):
+            net_sum += temp_sum
+
+            # Create xarray DataArray to store individual biomass potential for the current crop
+            crop_biomass_potential_array = xr.DataArray(data= net_product_array,
+                                                        dims=('y', 'x'),
+                coords={'y': range(region.shape[0]), 'x': range(region.shape[1]),
+                                    'latitude': (('x', 'y'), lats_init), 'longitude': (('x', 'y'), lons_init)},
+                                                        attrs={'units': 'PetaJoules',
+                                                               'sum_production': temp_sum})  # Add sum as an attribute
+
+            # Sum the individual biomass potential with the net biomass potential
+            net_biomass_potential_array += crop_biomass_potential_array
+
+            # Store the individual biomass potential for the current crop in the dictionary
+            individual_biomass_potentials[crop] = crop_biomass_potential_array
+
+        # Create xarray Dataset to hold all the individual biomass potentials for each crop
+        biomass_potentials_dataset = xr.Dataset(individual_biomass_potentials)
+
+        # Add the net sum of all crops and their residues as an attribute to the Dataset
+        biomass_potentials_dataset.attrs['net_sum in PJ'] = net_sum
+
+        # Add the net_biomass_potential_array as a new variable named 'combined' to the biomass_potentials_dataset
+        biomass_potentials_dataset['Combined'] = net_biomass_potential_array
+    
+        biomass_potentials_dataset['Combined'].attrs['sum_production'] = net_sum
+
+    return biomass_potentials_dataset
+
+
+# #### Additional functions:
+# The following functions are available if you just need the final numbers for the biomass energy potential for the 
+# region. It has two options either it can give you the net or it can give you the values for a specific crop as well.
+
+# The crops and the 2010 harvested area rasters used for the future cropland, shared with the functions which
+# prepare the layers reused across a sweep of scenarios
+
+def cropland_crops():
+    potential_crops = set(catalog.crops('potential_yield'))
+    return np.array([crop for crop in catalog.crops('harvested_area') if crop in potential_crops], dtype=object)
+
+
+def harvested_area_2010(water_supply_2010, crops=None):
+    if crops is None:
+        crops = cropland_crops()
+    return catalog.select('harvested_area', crops, time_period=2010, water_supply=water_supply_2010)
+
+
+# In[10]:
+
+
+# Function doing as described above
+
+def future_residues_all(time_period, climate_model, rcp, water_supply_future, input_level, shapefile_path, water_supply_2010,
+                        region=None):
+    
+    value = future_potential_cropland_totals(time_period, climate_model, rcp, water_supply_future, input_level,
+                                             shapefile_path, water_supply_2010, region)
+    
+    answer = value.sum()
+    
+    return answer
+
+
+# Like future_potential_cropland but only reading the rasters of the selected crops and keeping their sums
+@traced()
+def future_potential_cropland_totals(time_period, climate_model, rcp, water_supply_future, input_level, shapefile_path,
+                                     water_supply_2010, region=None, residue_table=None, crops=None):
+    region = get_region_window(shapefile_path, region)
+
+    unique_crops = select_crops(cropland_crops(), crops)
+    required_harvested_area = harvested_area_2010(water_supply_2010, unique_crops)
+    required_potential_yields = potential_yield_rasters(unique_crops, time_period, climate_model, rcp,
+                                                        water_supply_future, input_level)
+
+    factors = energy_factor_vector(unique_crops, residue_table, residue_factors) * (10 ** -3) # Unit conversion factor to PetaJoules
+    crop_sums = []
+    for crop, factor in zip(unique_crops, factors):
+        product = (np.nan_to_num(read_crop_raster(required_harvested_area, crop, region, memoize=True)) *
+                   np.nan_to_num(read_crop_raster(required_potential_yields, crop, region)))
+        crop_sums.append(np.nansum(product) * factor)
+    return pd.Series(crop_sums, index=list(unique_crops), dtype='float64')
+
+
+# In[11]:
+
+
+# We also wanted to create a function that does this for a single crop as well.
+
+def future_residues_crop(crop, time_period, climate_model, rcp, water_supply_future, input_level, shapefile_path, water_supply_2010,
+                         region=None):
+    
+    value = future_potential_cropland_totals(time_period, climate_model, rcp, water_supply_future, input_level,
+                                             shapefile_path, water_supply_2010, region, crops=[crop])
+    
+    answer = value[crop]
+    
+    return answer
+
+
+# So this completes all cropland residue calculations for us. Next we will move to residue and biomass energy potential from the marginal land but before we get into this we will have to generate the marginal land. So we need to extract certain pixels from certain rasters which will be masked later to account for removal of deserts, water, glaciers etc. as described in the paper
+
+# ## III. Raw Biomass Energy Potential from Agricultural Residues using Agro-Climatic Potential Yield for future yields data [GAEZ- V4 Theme: 3]
+# 
+# Theme 3 provides crop-wise information about: (1) Agro-Climatic Yield, (2) Constraint Factors, (3) Growth Cycle Attributes, and (4) Land Utilization Types (LUT) Selection.
+
+# Before moving on to describe the functions, we need to obtain the RPR, SAF and LHV values for the crops available in the potential yield theme in GAEZ. The following is the table followed by the assumptions made and references:
+
+# <h2><center>Final Potential Yield Crop Table with RPR, SAF and LHV values</center></h2>
+# 
+# | Crop                  | Residue Type    | RPR   | SAF   | LHV (MJ/kg) |
+# |:----------------------:|:-----------------:|:-------:|:-------:|:-------------:|
+# | Alfalfa               | residue         | 0.25  | 0.0   | 0.0         |
+# | Banana                | leaves          | 0.35  | 0.9   | 11.745      |
+# | Banana                | peels           | 0.25  | 1     | 14.78       |
+# | Banana                | stem            | 4.90  | 0.9   | 11.66       |
+# | Barley                | stalk           | 1.60  | 0.60  | 18.5        |
+# | Barley                | straw           | 0.75  | 0.15  | 17.5        |
+# | Biomass highland sorghum |Husk            | 1.4   | 1     | 13          |
+# | Biomass highland sorghum | Straw           | 1.25  | 0.8   | 12.38       |
+# | Biomass lowland sorghum  |Husk            | 1.4   | 1     | 13          |
+# |Biomass lowland sorghum  | Straw           | 1.25  | 0.8   | 12.38       |
+# | Biomass sorghum       |Husk            | 1.4   | 1     | 13          |
+# |Biomass sorghum        | Straw           | 1.25  | 0.8   | 12.38       |
+# | Biomass temperate sorghum | Husk            | 1.4   | 1     | 13          |
+# | Biomass temperate sorghum | Straw           | 1.25  | 0.8   | 12.38       |
+# | Buckwheat             | straw         | 1.2   | 0.40  | 16.845      |
+# | Cabbage               | residue       | 0.675 | 0.50  | 12.625      |
+# | Carrot                | residue       | 0.675 | 0.50  | 12.625      |
+# | Cassava               | Peelings        | 3     | 0.2   | 10.61       |
+# | Cassava               | Stalk           | 0.062 | 0.407 | 16.99       |
+# | Chickpea              | stalk         | 1.78  | 0.504 |15.53        |
+# | Citrus                | pruning        | 0.29     | 0.8   | 17.85       |
+# | Cocoa                 |  pods/husks    | 1     | 1     | 15.48       |
+# | Cocoa cumoun          |  pods/husks    | 1     | 1     | 15.48       |
+# | Cocoa hybrid          |  pods/husks    | 1     | 1     | 15.48       |
+# | Coconut               | Husk           | 1.03  | 1     | 18.6        |
+# | Coconut               | Coir dust      | 0.62  | 1     | 13.4        |
+# | Cocoyam               |  Peelings      | 0.2   | 0.8   | 10.61       |
+# | Coffee                | husk          | 1     | 1     | 12.8         |
+# | Coffee arabica        |husk          | 1     | 1     | 12.8          |
+# | Coffee robusta        |husk          | 1     | 1     | 12.8          |
+# | Cotton                | stalk           | 2.1   | 1     | 15.9       |
+# | Cowpea                | stalk         | 1.78  | 0.504 |15.53         |
+# | Dry pea               |stalk         | 1.78  | 0.504 |15.53          |
+# | Dryland rice          | Husk            | 0.23  | 0.83  | 12.9       |
+# | Dryland rice          | Straw           | 1.757 | 0.684 | 8.83       |
+# | Flax                  |  stalk           | 2.50  | 0.60  | 14.2      |
+# | Foxtail millet        |  Stalk           | 1.75  | 0.8   | 15.51     |
+# | Foxtail millet                | Straw           | 1.4   | 1     | 13 |
+# | Gram                  |stalk         | 1.1   | 0.38  |16.02          |
+# | Grass                 |  straw         | 0.4   | 0     | 0           |
+# | Greater yam           |Peelings      | 0.2   | 0.8   | 10.61         |
+# | Groundnut             | Shells/husks    | 0.477 | 1     | 15.56      |
+# | Groundnut             | Straw           | 2.3   | 1     | 17.58      |
+# | Highland maize        | Cob             | 0.273 | 1     | 16.63      |
+# | Highland maize                 | Husk            | 0.2   | 1     | 15.56|
+# | Highland maize                 | Stalk           | 2     | 0.8   | 16.3 |
+# | Highland sorghum      | Husk            | 1.4   | 1     | 13         |
+# |Highland sorghum       | Straw           | 1.25  | 0.8   | 12.38      |
+# | Jatropha | Woody Biomass | 0.25 | 0.8 | 15.5 |
+# | Jatropha | Leaves | 0.25 | 0.8 | 12 |
+# | Jatropha | Pericarp | 0.20 | 0.8 | 10 |
+# | Jatropha | Tegument | 0 | 10.8 | 16.9 |
+# | Jatropha | Endosperm Cake | 0.2 | 0.8 | 13.6 |
+# | Lowland maize         | Cob             | 0.273 | 1     | 16.63       |
+# | Lowland maize                 | Husk            | 0.2   | 1     | 15.56       |
+# | Lowland maize                 | Stalk           | 2     | 0.8   | 16.3        |
+# | Lowland sorghum       |Husk            | 1.4   | 1     | 13          |
+# |Lowland sorghum        | Straw           | 1.25  | 0.8   | 12.38       |
+# | Maize                 | Cob             | 0.273 | 1     | 16.63       |
+# | Maize                 | Husk            | 0.2   | 1     | 15.56       |
+# | Maize                 | Stalk           | 2     | 0.8   | 16.3        |
+# | Millet                | Stalk           | 1.75  | 0.8   | 15.51       |
+# | Millet                | Straw           | 1.4   | 1     | 13          |
+# | Miscanthus            | residue        | 0.42   | 1     | 17.44       |
+# | Napier grass          |  straw         | 0.4   | 0     | 0            |
+# | Oat                   | straw  |    1.15 |  0.40 | 18.45|
+# | Oil palm              | Empty bunches   | 0.428 | 1     | 19.41       |
+# | Oil palm              | Fiber           | 0.147 | 1     | 19.94       |
+# | Oil palm              | Fronds          | 2.604 | 1     | 7.97        |
+# | Oil palm              | Male bunches    | 0.233 | 1     | 14.86       |
+# | Oil palm              | Shells          | 0.049 | 1     | 21.1        |
+# | Olive                 | cake          | 0.40  | 0.90  | 19.7        |
+# | Onion                 | residue       | 0.675 | 0.50  | 12.625      |
+# | Para rubber           | residue               | 0     | 0     | 0           |
+# | Pasture legumes       | stalk         | 1.78  | 0.504 |15.53        |
+# | Pearl millet          |  Stalk           | 1.75  | 0.8   | 15.51       |
+# | Pearl millet                | Straw           | 1.4   | 1     | 13          |
+# | Phaseolus bean        |stalk         | 1.78  | 0.504 |15.53        |
+# | Pigeonpea             |stalk         | 1.78  | 0.504 |15.53        |
+# | Rapeseed              | straw           | 1.58  | 0.23  | 14.55       |
+# | Reed canary grass     |  straw         | 0.4   | 0     | 0           |
+# | Rye                   |   straw| 1.25|   0.40  | 15.24|
+# | Silage maize          | Cob             | 0.273 | 1     | 16.63       |
+# | Silage maize                 | Husk            | 0.2   | 1     | 15.56       |
+# | Silage maize                 | Stalk           | 2     | 0.8   | 16.3        |
+# | Sorghum               | Husk            | 1.4   | 1     | 13          |
+# | Sorghum               | Straw           | 1.25  | 0.8   | 12.38       |
+# | Soybean               | Pods            | 1     | 0.8   | 18          |
+# | Soybean               | Straw           | 2.66  | 0.8   | 18          |
+# | Spring barley         | stalk           | 1.60  | 0.60  | 18.5        |
+# | Spring barley                | straw           | 0.75  | 0.15  | 17.5        |
+# | Spring rye            |  straw| 1.25|   0.40  | 15.24|
+# | Spring wheat          |  Husk            | 0.23  | 0.29  | 12.9        |
+# | Spring wheat                 | Straw           | 1.2   | 0.29  | 15.6        |
+# | Sugarbeet             | residue         | 0.66  | 0.09  | 0           |
+# | Sugar Cane   | baggase       | 0.25  | 1     | 6.43        |
+# | Sugar Cane   | tops/leaves   | 0.32  | 0.8   | 15.8        |
+# | Sunflower             | stalk           | 2.50  | 0.60  | 14.2        |
+# | Sweet potato          |  Peelings      | 0.6   | 0.8   | 10.61       |
+# | Switchgrass           | straw         | 0.4   | 0     | 0           |
+# | Tea                   | husks         | 1     | 1     | 14.14       |
+# | Temperate maize       | Cob             | 0.273 | 1     | 16.63       |
+# | Temperate maize                 | Husk            | 0.2   | 1     | 15.56       |
+# | Temperate maize                 | Stalk           | 2     | 0.8   | 16.3        |
+# | Temperate sorghum     |Husk            | 1.4   | 1     | 13          |
+# | Temperate sorghum     | Straw           | 1.25  | 0.8   | 12.38       |
+# | Tobacco               | stalk           | 1.20  | 0.60  | 16.1        |
+# | Tomato                | stem          |0.3    | 0.50  | 13.7        | l               |
+# | Tomato                | leaves        |0.3    | 0.50  | 13.7        | l               |
+# | Wetland rice          | Husk            | 0.23  | 0.83  | 12.9        |
+# | Wetland rice          | Straw           | 1.757 | 0.684 | 8.83        |
+# | Wheat                 | Husk            | 0.23  | 0.29  | 12.9        |
+# | Wheat                 | Straw           | 1.2   | 0.29  | 15.6        |
+# | White potato          | Peelings      | 0.75  | 0.8   | 10.61       |
+# | White yam             | Peelings      | 0.2   | 0.8   | 10.61       |
+# | Winter barley         |  stalk           | 1.60  | 0.60  | 18.5        |
+# | Winter barley                | straw           | 0.75  | 0.15  | 17.5        |
+# | Winter rye            |   straw| 1.25|   0.40  | 15.24|
+# | Winter wheat          |  Husk            | 0.23  | 0.29  | 12.9        |
+# | Winter wheat                 | Straw           | 1.2   | 0.29  | 15.6        |
+# | Yam                   |Peelings      | 0.2   | 0.8   | 10.61       |
+# | Yellow yam            | Peelings      | 0.2   | 0.8   | 10.61       |
+# 
+
+# Since some extra crops have been added to this table in comparison to the previous table here are the references and few assumptions that have been made in order to make this table complete:
+# 
+# For a few of the crops I have assigned them value based on the following assumptions:
+# 
+# - Biomass highland sorghum, Biomass lowland sorghum, Biomass temperate sorghum, Highland sorghum, Lowland sorghum, Temperate sorghum will all be assigned just the sorghum value.
+# - Buckwheat will take the value of other cereals
+# - Onion, Cabbage, Carrot will take the value for vegetables
+# - Cocoa, Cocoa cumoun, Cocoa hybrid will take the value of Cocoa.
+# - Coffee, Coffee arabica, Coffee robusta will take the value of Coffee.
+# - Dryland Rice will take the value of Rice/Wetland Rice.
+# - Pearl millet, Foxtail millet, Millet will take the value of Millet.
+# - Greater yam, White yam, Yam, Yellow yam will all be assigned the value of Yam.
+# - Highland maize, Lowland maize, Silage maize, Temperate maize and Maize will be assigned the value of Maize.
+# - Spring barley, Winter barley will take the value of Barley 
+# - Spring rye, Winter rye will take the value of rye
+# - Spring wheat, Winter wheat will take the value of wheat
+# - White potato will take the value of Potato
+# - Tea will take the value of stimulants.
+# - ChickPea, Cowpea, Dry Pea, Pasture Legumes, Phaseolus bean, Pigeonpea will take the value of pulses.
+# - Alfalfa, Grass, Napier grass, Para, Rubber, Reed canary grass will take the value of fodder crops.(Alfalfa takes green fodder values which will have different RPR(0.25) but SAF will be 0.)
+# - Flax, being similar to sunflower, takes the values of sunflower since they belong to similar crop category.
+# - Citrus here includes the average of Oranges and Lemons
+# 
+# For the crops included above and not in the previous table here are the references:
+# 
+# - Coconut : Reference: https://www.aimspress.com/article/doi/10.3934/energy.2023002?viewType=HTML
+# - Citrus :  Reference:https://www.ncbi.nlm.nih.gov/pmc/articles/PMC9941997/
+# - Jatropha : Reference : doi: 10.1016/j.rser.2015.10.009.
+# - Miscanthus RPR/SAF & LHV: https://www.sciencedirect.com/science/article/pii/S1161030101001022. & https://www.researchgate.net/publication/338950136_Calorific_values_of_Miscanthus_x_giganteus_biomass_cultivated_under_suboptimal_conditions_in_marginal_soils            
+# - Para Rubber : None
+
+# In[12]:
+
+
+# The final crop data being added to a pandas dataframe:
+
+data = [
+    ['Alfalfa', 'residue', 0.25, 0.0, 0.0],
+    ['Banana', 'leaves', 0.35, 0.9, 11.745],
+    ['Banana', 'peels', 0.25, 1, 14.78],
+    ['Banana', 'stem', 4.90, 0.9, 11.66],
+    ['Barley', 'stalk', 1.60, 0.60, 18.5],
+    ['Barley', 'straw', 0.75, 0.15, 17.5],
+    ['Biomass highland sorghum', 'Husk', 1.4, 1, 13],
+    ['Biomass highland sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Biomass lowland sorghum', 'Husk', 1.4, 1, 13],
+    ['Biomass lowland sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Biomass sorghum', 'Husk', 1.4, 1, 13],
+    ['Biomass sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Biomass temperate sorghum', 'Husk', 1.4, 1, 13],
+    ['Biomass temperate sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Buckwheat', 'straw', 1.2, 0.40, 16.845],
+    ['Cabbage', 'residue', 0.675, 0.50, 12.625],
+    ['Carrot', 'residue', 0.675, 0.50, 12.625],
+    ['Cassava', 'Peelings', 3, 0.2, 10.61],
+    ['Cassava', 'Stalk', 0.062, 0.407, 16.99],
+    ['Chickpea', 'stalk', 1.78, 0.504, 15.53],
+    ['Citrus', 'prunings', 0.29 , 0.80 , 17.85],
+    ['Cocoa', 'pods/husks', 1, 1, 15.48],
+    ['Cocoa cumoun', 'pods/husks', 1, 1, 15.48],
+    ['Cocoa hybrid', 'pods/husks', 1, 1, 15.48],
+    ['Coconut', 'husk', 1.03, 1, 18.6],
+    ['Coconut','coir dust', 0.62, 1, 13.4],
+    ['Cocoyam', 'Peelings', 0.2, 0.8, 10.61],
+    ['Coffee', 'husk', 1, 1, 12.8],
+    ['Coffee arabica', 'husk', 1, 1, 12.8],
+    ['Coffee robusta', 'husk', 1, 1, 12.8],
+    ['Cotton', 'stalk', 2.1, 1, 15.9],
+    ['Cowpea', 'stalk', 1.78, 0.504, 15.53],
+    ['Dry pea', 'stalk', 1.78, 0.504, 15.53],
+    ['Dryland rice', 'Husk', 0.23, 0.83, 12.9],
+    ['Dryland rice', 'Straw', 1.757, 0.684, 8.83],
+    ['Flax', 'stalk', 2.5, 0.6, 14.2],
+    ['Foxtail millet', 'Stalk', 1.75, 0.8, 15.51],
+    ['Foxtail millet', 'Straw', 1.4, 1, 13],
+    ['Gram', 'stalk', 1.1, 0.38, 16.02],
+    ['Grass', 'straw', 0.4, 0, 0],
+    ['Greater yam', 'Peelings', 0.2, 0.8, 10.61],
+    ['Groundnut', 'Shells/husks', 0.477, 1, 15.56],
+    ['Groundnut', 'Straw', 2.3, 1, 17.58],
+    ['Highland maize', 'Cob', 0.273, 1, 16.63],
+    ['Highland maize', 'Husk', 0.2, 1, 15.56],
+    ['Highland maize', 'Stalk', 2, 0.8, 16.3],
+    ['Highland sorghum', 'Husk', 1.4, 1, 13],
+    ['Highland sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Jatropha', 'Woody Biomass', 0.25, 0.8, 15.5],
+    ['Jatropha', 'Leaves', 0.25, 0.8, 12],
+    ['Jatropha', 'Pericarp', 0.20, 0.8, 10],
+    ['Jatropha', 'Tegument', 0, 10.8, 16.9],
+    ['Jatropha', 'Endosperm Cake', 0.2, 0.8, 13.6],
+    ['Lowland maize', 'Cob', 0.273, 1, 16.63],
+    ['Lowland maize', 'Husk', 0.2, 1, 15.56],
+    ['Lowland maize', 'Stalk', 2, 0.8, 16.3],
+    ['Lowland sorghum', 'Husk', 1.4, 1, 13],
+    ['Lowland sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Maize', 'Cob', 0.273, 1, 16.63],
+    ['Maize', 'Husk', 0.2, 1, 15.56],
+    ['Maize', 'Stalk', 2, 0.8, 16.3],
+    ['Millet', 'Stalk', 1.75, 0.8, 15.51],
+    ['Millet', 'Straw', 1.4, 1, 13],
+    ['Miscanthus', 'residue', 0.42, 1, 17.44],
+    ['Napier grass', 'straw', 0.4, 0, 0],
+    ['Oat', 'straw', 1.15, 0.4, 18.45],
+    ['Oil palm', 'Empty bunches', 0.428, 1, 19.41],
+    ['Oil palm', 'Fiber', 0.147, 1, 19.94],
+    ['Oil palm', 'Fronds', 2.604, 1, 7.97],
+    ['Oil palm', 'Male bunches', 0.233, 1, 14.86],
+    ['Oil palm', 'Shells', 0.049, 1, 21.1],
+    ['Olive', 'cake', 0.4, 0.9, 19.7],
+    ['Onion', 'residue', 0.675, 0.5, 12.625],
+    ['Para rubber', 'residue', 0, 0, 0],
+    ['Pasture legumes', 'stalk', 0, 0, 0],
+    ['Pearl millet', 'Stalk', 1.75, 0.8, 15.51],
+    ['Pearl millet', 'Straw', 1.4, 1, 13],
+    ['Phaseolus bean', 'stalk', 1.78, 0.504, 15.53],
+    ['Pigeonpea', 'stalk', 1.78, 0.504, 15.53],
+    ['Rapeseed', 'straw', 1.58, 0.23, 14.55],
+    ['Reed canary grass', 'straw', 0.4, 0, 0],
+    ['Rye', 'straw', 1.25, 0.4, 15.24],
+    ['Silage maize', 'Cob', 0.273, 1, 16.63],
+    ['Silage maize', 'Husk', 0.2, 1, 15.56],
+    ['Silage maize', 'Stalk', 2, 0.8, 16.3],
+    ['Sorghum', 'Husk', 1.4, 1, 13],
+    ['Sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Soybean', 'Pods', 1, 0.8, 18],
+    ['Soybean', 'Straw', 2.66, 0.8, 18],
+    ['Spring barley', 'stalk', 1.6, 0.6, 18.5],
+    ['Spring barley', 'straw', 0.75, 0.15, 17.5],
+    ['Spring rye', 'straw', 1.25, 0.4, 15.24],
+    ['Spring wheat', 'Husk', 0.23, 0.29, 12.9],
+    ['Spring wheat', 'Straw', 1.2, 0.29, 15.6],
+    ['Sugarbeet', 'residue', 0.66, 0.09, 0],
+    ['Sugar Cane', 'baggase', 0.25, 1, 6.43],
+    ['Sugar Cane', 'tops/leaves', 0.32, 0.8, 15.8],
+    ['Sunflower', 'stalk', 2.5, 0.6, 14.2],
+    ['Sweet potato', 'Peelings', 0.6, 0.8, 10.61],
+    ['Switchgrass', 'straw', 0.4, 0, 0],
+    ['Tea', 'husks', 1, 1, 14.14],
+    ['Temperate maize', 'Cob', 0.273, 1, 16.63],
+    ['Temperate maize', 'Husk', 0.2, 1, 15.56],
+    ['Temperate maize', 'Stalk', 2, 0.8, 16.3],
+    ['Temperate sorghum', 'Husk', 1.4, 1, 13],
+    ['Temperate sorghum', 'Straw', 1.25, 0.8, 12.38],
+    ['Tobacco', 'stalk', 1.2, 0.6, 16.1],
+    ['Tomato', 'stem', 0.3, 0.5, 13.7],
+    ['Tomato', 'leaves', 0.3, 0.5, 13.7],
+    ['Wetland rice', 'Husk', 0.23, 0.83, 12.9],
+    ['Wetland rice', 'Straw', 1.757, 0.684, 8.83],
+    ['Wheat', 'Husk', 0.23, 0.29, 12.9],
+    ['Wheat', 'Straw', 1.2, 0.29, 15.6],
+    ['White potato', 'Peelings', 0.75, 0.8, 10.61],
+    ['White yam', 'Peelings', 0.2, 0.8, 10.61],
+    ['Winter barley', 'stalk', 1.6, 0.6, 18.5],
+    ['Winter barley', 'straw', 0.75, 0.15, 17.5],
+    ['Winter rye', 'straw', 1.25, 0.4, 15.24],
+    ['Winter wheat', 'Husk', 0.23, 0.29, 12.9],
+    ['Winter wheat', 'Straw', 1.2, 0.29, 15.6],
+    ['Yam', 'Peelings', 0.2, 0.8, 10.61],
+    ['Yellow yam', 'Peelings', 0.2, 0.8, 10.61]
+]
+
+# Defining the column names
+columns = ['Crop', 'Residue Type', 'RPR', 'SAF', 'LHV (MJ/kg)']
+
+# Create the DataFrame
+all_residue_values = pd.DataFrame(data, columns=columns)
+
+
+# ### Energy factor of each crop
+# For every crop the residues only ever enter the calculations through the product LHV * SAF * RPR, summed over all
+# its residue types. These sums are compiled once for each table into an energy factor per crop, so that the
+# biomass potential of all the crops can be obtained by multiplying the stacked (crop, y, x) array of crop rasters
+# with the vector of energy factors in a single operation. Crops missing from the table get a factor of 0.
+
+# In[ ]:
+
+
+def residue_energy_factors(residue_table):
+    missing_columns = {'Crop', 'RPR', 'SAF', 'LHV (MJ/kg)'} - set(residue_table.columns)
+    if missing_columns:
+        raise ValueError(f"The residue table is missing the columns {sorted(missing_columns)}")
+
+    energy = residue_table['LHV (MJ/kg)'] * residue_table['SAF'] * residue_table['RPR']
+    return energy.groupby(residue_table['Crop']).sum()
+
+
+# Reading a user supplied table with the columns Crop, Residue Type, RPR, SAF and LHV (MJ/kg)
+def load_residue_table(path):
+    residue_table = pd.read_csv(path)
+    residue_energy_factors(residue_table)  # Checking the columns
+    return residue_table
+
+
+# The factors of the two tables defined above are compiled once
+residue_factors = residue_energy_factors(residue_values)
+all_residue_factors = residue_energy_factors(all_residue_values)
+
+
+def energy_factor_vector(crops, residue_table=None, default_factors=residue_factors):
+    if residue_table is None:
+        factors = default_factors
+    elif isinstance(residue_table, pd.Series):
+        factors = residue_table
+    else:
+        factors = residue_energy_factors(residue_table)
+
+    return factors.reindex(list(crops), fill_value=0.0).to_numpy(dtype='float32')
+
+
+# ### Helper function for clipping a raster according to the selected region
+
+# In[13]:
+
+
+def maskingwithshapefile(shapefile, raster_path, region=None):
+    
+    region = get_region_window(shapefile, region)
+
+    with open_raster(raster_path) as src:
+        crs= src.crs
+        shapefile.crs=crs
+        clipped, transform = region.read(src)
+        # This returns a numpy array on which we will conduct operations.
+    return clipped
+
+
+# ### Helper functions for converting numpy arrays to raster format again to give us a clipped raster ( We have used the memory file data type in rasterio which allows us to create rasters in the active memory without the need to download these to the computer)
+
+# In[14]:
+
+
+# For clipped arrays :
+
+# The clipped one has extra parameters which ensure that the clipped raster has the correct latitudes and 
+# longitudes acc. to the chosen CRS. This will be mostly useful when we will try to extract rasters with the
+# correct longitude and latitude values.
+
+
+# Create a function to convert a NumPy array to an in-memory raster
+def array_to_inmemory_raster_for_clipped(array, transform, crs, shapefile):
+    
+    if len(array.shape) == 2:
+        array = array.reshape((1, array.shape[0], array.shape[1]))  # Add a singleton dimension
+
+    _, height, width = array.shape  # Extract the height and width from the shape
+
+    # Reshape the array to 2 dimensions
+    array = array[0]  # Extract the first dimension to remove the extra dimension
+    
+    # Correcting the transform for correct axes value representation
+    
+    shapefile.geometry.iloc[0]
+    xmin = shapefile.bounds.iloc[0,3]
+    ymax = shapefile.bounds.iloc[0,0]
+    topleft_corner = (xmin,ymax)
+
+
+    a = transform.a
+    b = transform.b
+    d = transform.d
+    e = transform.e
+
+    transform = Affine(a, b, ymax, d, e, xmin)
+    
+    # Update the transform with corrected values to make sure only the region of shapefile is represented
+    transform = Affine(transform.a, transform.b, ymax, transform.d, transform.e, xmin)
+    
+    # Define the raster metadata
+    meta = {
+        'count': 1,
+        'dtype': array.dtype,
+        'width': width,
+        'height': height,
+        'crs': crs,
+        'transform': transform
+    }
+
+    # Create an in-memory raster file
+    memory_file = rasterio.MemoryFile()
+    with memory_file.open(driver='GTiff', **meta) as dst:
+        dst.write(array, 1)
+
+    return memory_file
+
+
+# In[15]:
+
+
+# For Non-Clipped :
+
+# This function might not be as used like the above one and will mostly be used only when converting the full 
+# rasters from one resolution to the other along with resampling of data.
+
+def array_to_inmemory_raster_for_non_clipped(array, transform, crs):
+    if len(array.shape) == 2:
+        array = array.reshape((1, array.shape[0], array.shape[1]))  # Add a singleton dimension
+
+    _, height, width = array.shape  # Extract the height and width from the shape
+
+    # Reshape the array to 2 dimensions
+    array = array[0]  # Extract the first dimension to remove the extra dimension
+
+    # Define the raster metadata
+    meta = {
+        'count': 1,
+        'dtype': array.dtype,
+        'width': width,
+        'height': height,
+        'crs': crs,
+        'transform': transform
+    }
+
+    # Create an in-memory raster file
+    memory_file = rasterio.MemoryFile()
+    with memory_file.open(driver='GTiff', **meta) as dst:
+        dst.write(array, 1)
+
+    return memory_file
+
+
+# ### Helper Functions for extracting select pixels from selected rasters and then consolidating them in a data frame along with their coordinates so that they can be removed/masked later.
+
+# In[16]:
+
+
+# Once we have the rasters we are ready to extract specific pixels from it. The following functions
+# will help us do exactly that. One of them will extract pixels with specific values and the other will 
+# extract pixels having value above a certain threshold.
+
+def coordinates_and_values(raster_path, pixel_values):
+    
+    with open_raster(raster_path) as src:
+        df = pd.DataFrame()  
+        raster_band = src.read(1) 
+        trace_count('bytes_read', raster_band.nbytes, layer_name(src.name))
+        transform_coordinate_conversion = src.transform
+
+        for i in pixel_values:
+            rows, cols = np.where(raster_band == i)  # extract row and column numbers for each pixel
+            coords = transform_coordinate_conversion * (cols, rows)
+            lon, lat = coords[0], coords[1]  
+
+            values = raster_band[rows,cols]
+            df_i = pd.DataFrame({'lon': lon, 'lat': lat, 'pixel': values, 'row': rows, 'col': cols}) 
+            df = pd.concat([df, df_i], ignore_index=True)  # append to get DataFrame of lon, lat, row, col, and 
+            # pixel
+
+    return df
+
+def coordinates_and_threshold(raster_path, threshold):
+    
+    with open_raster(raster_path) as src:
+        df = pd.DataFrame()  
+        raster_band = src.read(1)  
+        trace_count('bytes_read', raster_band.nbytes, layer_name(src.name))
+        transform_coordinate_conversion = src.transform
+
+        rows, cols = np.where(raster_band > threshold)  # find row and column indices for pixel values above 
+        # threshold
+        coords = transform_coordinate_conversion * (cols, rows)
+        lon, lat = coords[0], coords[1] 
+
+        values = raster_band[rows, cols]  # extract pixel values above threshold
+        df = pd.DataFrame({'lon': lon, 'lat': lat, 'row': rows, 'col': cols, 'pixel': values})  
+
+    return df
+
+
+# ### Helper functions for converting the clipping to shape file and conversion back to raster in a single function . It also converts the data frames generated above to a GeoDataFrame (gdf) so that the stored locations can be used to remove/mask these pixels later
+
+# In[17]:
+
+
+def clipper(shapefile, raster_path, region=None):
+    
+    with open_raster(raster_path) as src:
+        transform_store = src.transform
+        crs_store = src.crs
+        
+    masked = maskingwithshapefile(shapefile , raster_path, region)
+    output_raster = array_to_inmemory_raster_for_clipped(masked, transform_store, crs_store, shapefile)
+    
+    return output_raster
+
+
+# In[18]:
+
+
+# Creating this function since both the value and threshold functions give us dataframes and we will need
+# geodataframes containing the geometry column with the Point values for each pixel.
+
+def convert_df_to_gdf(dataframe):
+    
+    # Convert the DataFrame of coordinates to a GeoDataFrame
+    import geopandas as gpd
+    geometry = [Point(lon, lat) for lon, lat in zip(dataframe['lon'], dataframe['lat'])]
+    coordinates_gdf = gpd.GeoDataFrame(dataframe, geometry=geometry)
+    
+    return coordinates_gdf
+
+
+# ### Block aggregation of the fine layers onto the working grid
+# The AEZ, exclusion and tree cover layers are on the 30 arc-second grid while the crops are on the 5 arc-minute grid,
+# so every pixel of the working grid covers an exact block of k x k fine pixels (k = 10 for the GAEZ layers). Rather
+# than having GDAL resample the layers, the blocks covering the region are read and reduced with numpy by viewing
+# them as an array of shape (rows, cols, k * k):
+#
+# - 'mode' for the classes (AEZ classes, exclusion codes): the most frequent class of the block, the smallest one
+#   when several classes are as frequent, so that the result does not depend on the order of the pixels.
+# - 'mean' for the continuous layers (tree cover share), as float32 rather than rounded to the type of the raster.
+# - 'fraction_above' for the share of the pixels of the block whose value is above a given value.
+#
+# Nodata pixels and pixels outside the raster are left out of every block, and blocks without any valid pixel get the
+# nodata value of the raster (0 if it has none). The factor and the offset of the blocks are derived from the
+# transforms of the raster and of the target grid, so the layers do not have to be global, only aligned with the
+# working grid. The window is reduced in strips of rows of blocks to bound the memory used on large regions.
+
+# In[ ]:
+
+
+block_methods = ('mode', 'mean', 'fraction_above')
+resampling_block_methods = {Resampling.mode: 'mode', Resampling.average: 'mean'}
+
+# Rows of blocks reduced at a time
+block_rows_per_strip = 32
+
+
+# The block method of a resampling, given as one of block_methods or as a rasterio Resampling, or None for the
+# resamplings which are left to GDAL
+def block_method(resampling):
+    if isinstance(resampling, str):
+        if resampling not in block_methods:
+            raise ValueError(f"Unknown block method {resampling}, expected one of {', '.join(block_methods)}")
+        return resampling
+    return resampling_block_methods.get(resampling)
+
+
+def block_view(array, factor):
+    rows, cols = array.shape[0] // factor, array.shape[1] // factor
+    blocks = array[:rows * factor, :cols * factor].reshape(rows, factor, cols, factor)
+    return blocks.swapaxes(1, 2).reshape(rows, cols, factor * factor)
+
+
+# Summing the rows of the blocks first keeps the inner loop on contiguous memory
+def block_sum(array, factor, dtype=np.int64):
+    rows, cols = array.shape[0] // factor, array.shape[1] // factor
+    blocks = array[:rows * factor, :cols * factor].reshape(rows, factor, cols, factor)
+    return blocks.sum(axis=1, dtype=dtype).sum(axis=-1)
+
+
+def block_mode(data, factor, valid=None):
+    rows, cols = data.shape[0] // factor, data.shape[1] // factor
+    data = data[:rows * factor, :cols * factor]
+    values = data if valid is None else data[valid]
+
+    # Small integer classes are counted in a single bincount of the codes block * n_classes + class, which does not
+    # need the pixels to be grouped by block
+    if data.dtype.kind in 'ui' and data.dtype.itemsize <= 4 and values.size:
+        low, high = int(values.min()), int(values.max())
+        n_classes = high - low + 1
+        if n_classes <= 256:
+            codes = np.add(data, (np.arange(rows).repeat(factor) * (cols * n_classes) - low)[:, np.newaxis],
+                           dtype=np.intp)
+            codes += (np.arange(cols).repeat(factor) * n_classes)[np.newaxis]
+            codes = codes.ravel() if valid is None else codes[valid]
+            counts = np.bincount(codes, minlength=rows * cols * n_classes).reshape(rows, cols, n_classes)
+            return (counts.argmax(axis=-1) + low).astype(data.dtype)
+
+    # Otherwise the blocks are sorted (the invalid pixels last) and the longest run of equal values is kept
+    blocks = block_view(data, factor)
+    valid = np.ones(blocks.shape, dtype=bool) if valid is None else block_view(valid, factor)
+    order = np.lexsort((blocks, ~valid), axis=-1)
+    sorted_values = np.take_along_axis(blocks, order, axis=-1)
+    sorted_valid = np.take_along_axis(valid, order, axis=-1)
+    positions = np.arange(factor * factor)
+    starts = np.ones(blocks.shape, dtype=bool)
+    starts[..., 1:] = sorted_values[..., 1:] != sorted_values[..., :-1]
+    run_start = np.maximum.accumulate(np.where(starts, positions, 0), axis=-1)
+    run_length = np.where(sorted_valid, positions - run_start + 1, 0)
+    longest = run_length.argmax(axis=-1)[..., np.newaxis]
+    return np.take_along_axis(sorted_values, longest, axis=-1)[..., 0]
+
+
+# Reducing every factor x factor block of a 2D array, leaving out the pixels where valid is False
+def block_reduce(data, factor, method='mode', valid=None, above=None, fill=0):
+    rows, cols = data.shape[0] // factor, data.shape[1] // factor
+    data = data[:rows * factor, :cols * factor]
+    if valid is not None:
+        valid = valid[:rows * factor, :cols * factor]
+        if valid.all():
+            valid = None
+    count = np.full((rows, cols), factor * factor) if valid is None else block_sum(valid, factor)
+
+    if method == 'mode':
+        reduced = block_mode(data, factor, valid)
+    elif method == 'mean':
+        values = data if valid is None else np.where(valid, data, 0)
+        reduced = (block_sum(values, factor, 'float64') / np.maximum(count, 1)).astype('float32')
+    elif method == 'fraction_above':
+        if above is None:
+            raise ValueError("The fraction_above method needs the value to compare the pixels with (above)")
+        above_pixels = data > above if valid is None else valid & (data > above)
+        reduced = (block_sum(above_pixels, factor) / np.maximum(count, 1)).astype('float32')
+    else:
+        raise ValueError(f"Unknown block method {method}, expected one of {', '.join(block_methods)}")
+
+    if valid is None:
+        return reduced
+    return np.where(count > 0, reduced, np.array(fill).astype(reduced.dtype))
+
+
+# Reading a window which may extend beyond the raster, with the mask of the valid pixels
+def read_padded(src, window, band=1):
+    row_off, col_off = int(window.row_off), int(window.col_off)
+    height, width = int(window.height), int(window.width)
+    data = np.zeros((height, width), dtype=src.dtypes[band - 1])
+    valid = np.zeros((height, width), dtype=bool)
+
+    row_start, row_stop = max(row_off, 0), min(row_off + height, src.height)
+    col_start, col_stop = max(col_off, 0), min(col_off + width, src.width)
+    if row_stop > row_start and col_stop > col_start:
+        part = src.read(band, window=Window(col_start, row_start, col_stop - col_start, row_stop - row_start))
+        trace_count('bytes_read', part.nbytes, layer_name(src.name))
+        inside = (slice(row_start - row_off, row_stop - row_off), slice(col_start - col_off, col_stop - col_off))
+        data[inside] = part
+        if src.nodata is None:
+            valid[inside] = True
+        elif np.isnan(src.nodata):
+            valid[inside] = ~np.isnan(part)
+        else:
+            valid[inside] = part != src.nodata
+    return data, valid
+
+
+# Aggregating the blocks of a window of the raster whose size is a multiple of the factor
+def aggregate_window(src, window, factor, method='mode', above=None, band=1):
+    rows, cols = int(window.height) // factor, int(window.width) // factor
+    fill = src.nodata if src.nodata is not None else 0
+    dtype = src.dtypes[band - 1] if method == 'mode' else 'float32'
+    aggregated = np.full((rows, cols), fill, dtype=dtype)
+    trace_count('allocated_bytes', aggregated.nbytes, 'aggregate_window')
+
+    for first in range(0, rows, block_rows_per_strip):
+        count = min(block_rows_per_strip, rows - first)
+        strip = Window(int(window.col_off), int(window.row_off) + first * factor, cols * factor, count * factor)
+        data, valid = read_padded(src, strip, band)
+        aggregated[first:first + count] = block_reduce(data, factor, method, valid, above, fill)
+    return aggregated
+
+
+# The window of the raster covering the grid given by its transform and shape, and the size of the blocks
+def block_window(src, transform, shape):
+    factor = transform.a / src.transform.a
+    col_off = (transform.c - src.transform.c) / src.transform.a
+    row_off = (transform.f - src.transform.f) / src.transform.e
+    k = int(round(factor))
+    aligned = (k >= 1 and abs(transform.e / src.transform.e - factor) < 1e-6
+               and all(abs(value - round(value)) < 1e-3 for value in (factor, col_off, row_off)))
+    if not aligned:
+        raise ValueError(f"The grid of {src.name} is not aligned with the target grid, its pixels do not fall into "
+                         f"whole blocks of the target pixels")
+    return Window(int(round(col_off)), int(round(row_off)), shape[1] * k, shape[0] * k), k
+
+
+# A layer aggregated onto the grid given by its transform and shape, e.g. the grid of a RegionGrid
+@traced()
+def aggregate_blocks(raster_path, transform, shape, method='mode', above=None):
+    with open_raster(raster_path) as src:
+        window, factor = block_window(src, transform, shape)
+        return aggregate_window(src, window, factor, block_method(method), above)
+
+
+# ### Helper function for conversion of rasters from higher to lower resolution
+
+# In[19]:
+
+
+# Also since the crop data is in a lower resolution than the AEZ classsification and other data so we will also 
+# create a fn. for the conversion of Resolution from a higher to lower resolution along with resampling of the 
+# pixel values. Mode and average are done by block aggregation (see above), the other resampling methods by GDAL.
+# The downscale factor defaults to the ratio of the resolution of the working grid to the one of the raster, and the
+# transform is the one of the raster scaled by the factor.
+# When a region window is given only the blocks of the raster covering the region are read and resampled, instead
+# of the whole global raster.
+
+@traced()
+def resolution_converter_mode(raster_path , resampling_method, region=None, downscale_factor=None):
+    
+    method = block_method(resampling_method)
+    with open_raster(raster_path) as dataset:
+        if downscale_factor is None:
+            downscale_factor = int(round(working_resolution() / dataset.res[0]))
+
+        if region is not None:
+            window = region.aligned_window(dataset, downscale_factor)
+        else:
+            window = Window(0, 0, dataset.width // downscale_factor * downscale_factor,
+                            dataset.height // downscale_factor * downscale_factor)
+        downsampled_shape = (int(window.height) // downscale_factor, int(window.width) // downscale_factor)
+        transform = dataset.window_transform(window) * Affine.scale(downscale_factor, downscale_factor)
+        crs_final = dataset.crs
+
+        if method is not None:
+            data = aggregate_window(dataset, window, downscale_factor, method)
+        else:
+            data = dataset.read(1, window=window, out_shape=downsampled_shape, resampling=resampling_method)
+            trace_count('bytes_read', data.nbytes, layer_name(dataset.name))
+
+    return array_to_inmemory_raster_for_non_clipped(data, transform, crs_final)
+
+
+# ### Helper function for removal of accumulated pixels in the GeoDataFrame
+
+# In[20]:
+
+
+# To explain it a bit more, what we do is get those pixels and assign the pixels to be removed a nodata value.
+# The pixels to be removed can either be given as a GeoDataFrame with their row and column numbers or as a boolean
+# exclusion mask on the grid of the region (see the exclusion mask below).
+
+def remove_pixels(raster_path, shapefile, geodataframe, region=None):
+    region = get_region_window(shapefile, region)
+
+    with open_raster(raster_path) as src:
+        # Mask the raster using the shapefile boundary
+        clipped, transform = region.read(src)
+
+    data = remove_band_dimension(clipped)
+    
+    # Apply the mask
+    data = np.where(excluded_pixels_mask(geodataframe, data.shape), np.nan, data)
+    
+    return data
+
+
+def excluded_pixels_mask(geodataframe, shape):
+    if isinstance(geodataframe, np.ndarray):
+        return geodataframe
+
+    # Create a mask with the same dimensions as the raster from the row and column numbers
+    excluded = np.zeros(shape, dtype=bool)
+    excluded[geodataframe['row'].to_numpy(dtype=int), geodataframe['col'].to_numpy(dtype=int)] = True
+    return excluded
+
+
+# So what this function does, is that it takes a sample raster path as input first clips it. Then it creates a
+# mask layer using the sample raster while assigning nodata values to the points we want removed. 
+
+
+# ### Exclusion mask for the marginal land
+# The pixels which cannot be used as marginal land (deserts, water bodies, glaciers, protected areas, forests and 
+# pastures as described in the paper) are found by combining a few layers as boolean rasters on the grid of the
+# region. Each layer is described by a rule which gives the raster to use, how it is resampled to the 5 arc-minute
+# grid and which of its pixels are excluded, either a set of values or a threshold above which the pixel is
+# excluded. The resampling is 'mode', 'mean' or 'fraction_above' (see aggregate_blocks) or a rasterio Resampling; with
+# 'fraction_above' the rule also gives the value 'above' which the fine pixels are compared with, and the threshold
+# applies to the share of the fine pixels above it, e.g. {'layer': 'tree_cover', 'resampling': 'fraction_above',
+# 'above': 50, 'threshold': 0.5} excludes the pixels where more than half of the land has more than 50% tree cover. The layer can be 'aez', 'exclusion', 'tree_cover' or 'pasture' for the layers of the catalogs or the
+# path of any raster. Passing your own list of rules to get_biomass_potential_for_marginal changes which land is
+# considered as marginal.
+# 
+# The layers are packed into a single array of bit flags where bit i is set if the pixel is excluded by rule i. A
+# pixel is excluded from the marginal land if any of its flags is set.
+
+# In[ ]:
+
+
+default_exclusion_rules = [
+    {'layer': 'aez', 'values': [49, 50, 52, 53, 55, 56, 57], 'resampling': Resampling.mode},
+    {'layer': 'exclusion', 'values': [2, 3, 4, 5, 6, 7], 'resampling': Resampling.mode},
+    {'layer': 'tree_cover', 'threshold': 50, 'resampling': Resampling.average},
+    # the reproject here is just to make the pixel size 0.083333 instead of 0.08328
+    {'layer': 'pasture', 'threshold': 0.5, 'resampling': None},
+]
+
+
+def exclusion_layer_path(layer, time_period, rcp):
+    if layer == 'aez':
+        aez_classification = load_catalog_table('aez_classification')
+        initial_aez_chosen = aez_classification[(aez_classification['Time Period']== time_period)&
+                                             (aez_classification['RCP']== rcp)]
+        return initial_aez_chosen['Download URL'].values[0].strip()
+    if layer == 'exclusion':
+        return load_catalog_table('exclusion_areas').iloc[0,9].strip()
+    if layer == 'tree_cover':
+        return load_catalog_table('tree_cover_share').iloc[0,9].strip()
+    if layer == 'pasture':
+        return os.path.join(data_dir, 'pasture_cubic_reproject.tif')
+    return layer
+
+
+# Reading a layer on the grid of the region, after converting its resolution if needed. Mode, mean and fraction_above
+# are aggregated straight onto the grid of the region, the pixels outside the region being set to 0 as region.read
+# does for the in-memory rasters of resolution_converter_mode.
+@traced()
+def read_layer_on_grid(raster_path, region, resampling=None, above=None):
+    def read():
+        if resampling is not None and block_method(resampling) is not None:
+            layer = aggregate_blocks(raster_path, region.transform, region.shape, resampling, above)
+            return np.where(region.mask, layer, np.array(0, dtype=layer.dtype))
+
+        converted_raster = raster_path
+        if resampling is not None:
+            converted_raster = resolution_converter_mode(raster_path, resampling, region)
+
+        with open_raster(converted_raster) as src:
+            clipped, _ = region.read(src)
+        clipped = remove_band_dimension(clipped)
+
+        if clipped.shape != tuple(region.shape):
+            raise ValueError(f"The layer {raster_path} is on a {clipped.shape} grid which does not match the "
+                             f"{tuple(region.shape)} grid of the region")
+        return clipped
+
+    # Each layer is only read and resampled once per region
+    return region.memoize('layer', (raster_path, resampling, above), read)
+
+
+@traced()
+def build_exclusion_flags(region, time_period, rcp, exclusion_rules=None):
+    if exclusion_rules is None:
+        exclusion_rules = default_exclusion_rules
+
+    flag_dtype = np.uint8 if len(exclusion_rules) <= 8 else np.uint32
+    flags = np.zeros(region.shape, dtype=flag_dtype)
+    trace_count('allocated_bytes', flags.nbytes, 'build_exclusion_flags')
+
+    for bit, rule in enumerate(exclusion_rules):
+        raster_path = exclusion_layer_path(rule['layer'], time_period, rcp)
+        layer = read_layer_on_grid(raster_path, region, rule.get('resampling'), rule.get('above'))
+
+        excluded = np.zeros(layer.shape, dtype=bool)
+        if 'values' in rule:
+            excluded |= np.isin(layer, rule['values'])
+        if 'threshold' in rule:
+            excluded |= layer > rule['threshold']
+
+        flags |= (excluded * (1 << bit)).astype(flag_dtype)
+
+    return flags
+
+
+def build_exclusion_mask(region, time_period, rcp, exclusion_rules=None):
+    return build_exclusion_flags(region, time_period, rcp, exclusion_rules) != 0
+
+
+# ### Helper function for going over the selected region and identifying which crop to grow to maximize energy extraction
+
+# In[22]:
+
+
+# Value of the crop layers (max_crops, best_crop) in the pixels where no crop gives any energy
+no_crop_value = -1
+
+
+# Remove spaces and special characters from crop names to make them valid variable names
+def crop_variable_name(crop):
+    return crop.replace(" ", "_").replace("-", "_").replace("(", "").replace(")", "").replace(",", "")
+
+
+# Attributes of a layer giving a crop for each pixel as its index in crop_names, as CF flag values
+def crop_flag_attrs(crops):
+    return {'flag_values': np.arange(len(crops), dtype='int16'),
+            'flag_meanings': ' '.join(crop_variable_name(crop) for crop in crops),
+            'no_crop_value': no_crop_value}
+
+
+@traced()
+def find_max_for_each_pixel(time_period, climate_model, rcp, water_supply_future, input_level,
+                            shapefile, geodataframe, region=None, residue_table=None, lazy=False):
+    region = get_region_grid(shapefile, region)
+    if lazy:
+        return lazy_find_max_for_each_pixel(time_period, climate_model, rcp, water_supply_future, input_level,
+                                            shapefile, geodataframe, region, residue_table)
+
+    unique_crops = catalog.crops('potential_yield')
+    required_potential_yields = potential_yield_rasters(unique_crops, time_period, climate_model, rcp,
+                                                        water_supply_future, input_level)
+    
+    # For defining size of the xarray
+    lats_init, lons_init = region.lats, region.lons
+
+    # Iterate over the global rasters and stack them in a single float32 (crop, y, x) array
+    crop_yields = np.empty((len(unique_crops),) + region.shape, dtype='float32')
+    trace_count('allocated_bytes', crop_yields.nbytes, 'find_max_for_each_pixel')
+    for i, crop in enumerate(unique_crops):
+        # Find the correct raster path for the rasters you want to access
+        raster_path = required_potential_yields[crop]
+        
+        # Remove pixels from the raster
+        crop_yields[i] = remove_pixels(raster_path, shapefile, geodataframe, region)
+
+    # Handle NaN values by converting them to zero and drop the negative values
+    np.nan_to_num(crop_yields, copy=False, nan=0)
+    np.maximum(crop_yields, 0, out=crop_yields)
+
+    # Multiply the values with the sum of RPR, SAF and LHV over the residues of each crop
+    factors = energy_factor_vector(unique_crops, residue_table, all_residue_factors)
+    crop_residue_sums = np.multiply(crop_yields, factors[:, None, None], out=crop_yields)
+
+    # The crop giving the maximum energy in each pixel is stored as its index in crop_names. Pixels where no crop
+    # gives any energy get -1 (these used to be assigned Alfalfa, the first crop, which has no usable residue).
+    max_index = np.argmax(crop_residue_sums, axis=0)
+    max_values = np.take_along_axis(crop_residue_sums, max_index[np.newaxis], axis=0)[0]
+    max_crops = np.where(max_values > 0, max_index, no_crop_value).astype('int16')
+
+    with trace_span('xarray_assembly'):
+        variable_names = [crop_variable_name(crop) for crop in unique_crops]
+
+        # Create xarray Dataset to hold all the individual biomass potentials for each crop
+        biomass_potentials_dataset = xr.Dataset()
+
+        # Add the crop_residue_sum_array as a variable for each crop
+        for variable_name, crop_residue_sum_array in zip(variable_names, crop_residue_sums):
+            # Create a DataArray for the crop_residue_sum_array
+            data_array = xr.DataArray(
+                crop_residue_sum_array,
+                dims=('y', 'x'),
+                coords={'latitude': (('x', 'y'), lats_init), 'longitude': (('x', 'y'), lons_init)},
+                attrs={'units': 'PetaJoules'}
+            )
+    
+            # Add the DataArray as a variable to the dataset
+            biomass_potentials_dataset[variable_name] = data_array
+    
+            # Add the yield sum as an attribute for the variable
+            biomass_potentials_dataset[variable_name].attrs['sum'] = np.nansum(crop_residue_sum_array)
+
+        # Add the max_values as a variable to the dataset
+        biomass_potentials_dataset['max_values'] = xr.DataArray(
+            max_values,
+            dims=('y', 'x'),
+            coords={'latitude': (('x', 'y'), lats_init), 'longitude': (('x', 'y'), lons_init)},
+            attrs={'units': 'PetaJoules'}
+        )
+        biomass_potentials_dataset['max_values'].attrs['sum'] = np.nansum(max_values)
+    
+        # Add the max_crops as a categorical variable to the dataset along with the lookup table of crop names
+        biomass_potentials_dataset['crop_names'] = xr.DataArray(np.array(unique_crops, dtype=str), dims=('crop',))
+        biomass_potentials_dataset['max_crops'] = xr.DataArray(
+            max_crops,
+            dims=('y', 'x'),
+            coords={'latitude': (('x', 'y'), lats_init), 'longitude': (('x', 'y'), lons_init)},
+            attrs=crop_flag_attrs(unique_crops)
+        )
+    
+        # Add attributes for the sum of max_values and units
+        biomass_potentials_dataset.attrs['net_sum'] = np.nansum(max_values)
+        biomass_potentials_dataset.attrs['units'] = 'PetaJoules'
+
+    return biomass_potentials_dataset
+
+
+# ### Lazy outputs with Dask
+# With lazy=True, biomass_potential_past, future_potential_cropland and find_max_for_each_pixel return Datasets
+# backed by Dask arrays instead of NumPy arrays. Every crop raster is read in its own chunk and only when a variable
+# using it is computed, so that asking for a single crop, e.g. float(dataset['Maize'].attrs['sum_production']), only
+# reads the rasters of that crop. Combined, max_values and max_crops, as well as the sums kept in the attributes (0-d
+# Dask arrays, evaluated with float() or .compute()), are only computed when they are requested. Dask is only needed
+# for this option.
+
+# In[ ]:
+
+
+def lazy_array(read, shape):
+    import dask
+    import dask.array as da
+
+    def read_float32():
+        return np.asarray(remove_band_dimension(read()), dtype='float32')
+
+    return da.from_delayed(dask.delayed(read_float32)(), shape=shape, dtype='float32')
+
+
+def lazy_crop_raster(required_rasters, crop, region, memoize=False):
+    return lazy_array(partial(read_crop_raster, required_rasters, crop, region, memoize), region.shape)
+
+
+def region_coords(region):
+    return {'y': range(region.shape[0]), 'x': range(region.shape[1]),
+            'latitude': (('x', 'y'), region.lats), 'longitude': (('x', 'y'), region.lons)}
+
+
+def lazy_biomass_potential_past(time_period, water_supply, region, residue_table=None, crops=None):
+    import dask.array as da
+
+    unique_crops_actual = select_crops(catalog.crops('production_values'), crops)
+    required_production_values = catalog.select('production_values', unique_crops_actual, time_period=time_period,
+                                                water_supply=water_supply)
+
+    factors = energy_factor_vector(unique_crops_actual, residue_table, residue_factors)
+    coords = region_coords(region)
+
+    individual_biomass_potentials = {}
+    net_biomass_potential = da.zeros(region.shape, dtype='float32')
+    net_sum = 0.0
+    for crop, factor in zip(unique_crops_actual, factors):
+        crop_production = lazy_crop_raster(required_production_values, crop, region)
+        crop_residue_sum = da.nansum(crop_production) * factor
+        net_sum = net_sum + crop_residue_sum
+        net_biomass_potential = net_biomass_potential + crop_production * factor
+        individual_biomass_potentials[crop] = xr.DataArray(crop_production * factor, dims=('y', 'x'), coords=coords,
+                                                           attrs={'units': 'PetaJoules',
+                                                                  'sum_production': crop_residue_sum})
+
+    biomass_potentials_dataset = xr.Dataset(individual_biomass_potentials)
+    biomass_potentials_dataset.attrs['Net Potential in PetaJ'] = net_sum
+    biomass_potentials_dataset['Combined'] = xr.DataArray(net_biomass_potential, dims=('y', 'x'), coords=coords,
+                                                          attrs={'units': 'PetaJoules', 'sum_production': net_sum})
+    return biomass_potentials_dataset
+
+
+def lazy_future_potential_cropland(time_period, climate_model, rcp, water_supply_future, input_level,
+                                   water_supply_2010, region, residue_table=None, crops=None):
+    import dask.array as da
+
+    unique_crops = select_crops(cropland_crops(), crops)
+    required_harvested_area = harvested_area_2010(water_supply_2010, unique_crops)
+    required_potential_yields = potential_yield_rasters(unique_crops, time_period, climate_model, rcp,
+                                                        water_supply_future, input_level)
+
+    factors = energy_factor_vector(unique_crops, residue_table, residue_factors) * (10 ** -3) # Unit conversion factor to PetaJoules
+    coords = region_coords(region)
+
+    individual_biomass_potentials = {}
+    net_biomass_potential = da.zeros(region.shape)
+    net_sum = 0.0
+    for crop, factor in zip(unique_crops, factors):
+        product = (da.nan_to_num(lazy_crop_raster(required_harvested_area, crop, region, memoize=True)) *
+                   da.nan_to_num(lazy_crop_raster(required_potential_yields, crop, region)))
+        temp_sum = da.nansum(product) * factor
+        net_sum = net_sum + temp_sum
+        net_biomass_potential = net_biomass_potential + product * factor
+        individual_biomass_potentials[crop] = xr.DataArray(product * factor, dims=('y', 'x'), coords=coords,
+                                                           attrs={'units': 'PetaJoules', 'sum_production': temp_sum})
+
+    biomass_potentials_dataset = xr.Dataset(individual_biomass_potentials)
+    biomass_potentials_dataset.attrs['net_sum in PJ'] = net_sum
+    biomass_potentials_dataset['Combined'] = xr.DataArray(net_biomass_potential, dims=('y', 'x'), coords=coords,
+                                                          attrs={'units': 'PetaJoules', 'sum_production': net_sum})
+    return biomass_potentials_dataset
+
+
+def lazy_find_max_for_each_pixel(time_period, climate_model, rcp, water_supply_future, input_level,
+                                 shapefile, geodataframe, region, residue_table=None):
+    import dask.array as da
+
+    unique_crops = catalog.crops('potential_yield')
+    required_potential_yields = potential_yield_rasters(unique_crops, time_period, climate_model, rcp,
+                                                        water_supply_future, input_level)
+    factors = energy_factor_vector(unique_crops, residue_table, all_residue_factors)
+    coords = {'latitude': (('x', 'y'), region.lats), 'longitude': (('x', 'y'), region.lons)}
+
+    crop_residue_sums = []
+    for crop, factor in zip(unique_crops, factors):
+        raster_path = required_potential_yields[crop]
+        crop_yield = lazy_array(partial(remove_pixels, raster_path, shapefile, geodataframe, region), region.shape)
+        crop_residue_sums.append(da.maximum(da.nan_to_num(crop_yield), 0) * factor)
+    crop_residue_sums = da.stack(crop_residue_sums)
+
+    max_values = crop_residue_sums.max(axis=0)
+    max_crops = da.where(max_values > 0, da.argmax(crop_residue_sums, axis=0), no_crop_value).astype('int16')
+
+    variable_names = [crop_variable_name(crop) for crop in unique_crops]
+
+    biomass_potentials_dataset = xr.Dataset()
+    for variable_name, crop_residue_sum_array in zip(variable_names, crop_residue_sums):
+        biomass_potentials_dataset[variable_name] = xr.DataArray(crop_residue_sum_array, dims=('y', 'x'), coords=coords,
+                                                                 attrs={'units': 'PetaJoules',
+                                                                        'sum': da.nansum(crop_residue_sum_array)})
+
+    biomass_potentials_dataset['max_values'] = xr.DataArray(max_values, dims=('y', 'x'), coords=coords,
+                                                            attrs={'units': 'PetaJoules', 'sum': da.nansum(max_values)})
+    biomass_potentials_dataset['crop_names'] = xr.DataArray(np.array(unique_crops, dtype=str), dims=('crop',))
+    biomass_potentials_dataset['max_crops'] = xr.DataArray(
+        max_crops,
+        dims=('y', 'x'),
+        coords=coords,
+        attrs=crop_flag_attrs(unique_crops)
+    )
+
+    biomass_potentials_dataset.attrs['net_sum'] = da.nansum(max_values)
+    biomass_potentials_dataset.attrs['units'] = 'PetaJoules'
+    return biomass_potentials_dataset
+
+
+# ### Helper function for obtaining harvested area and the net pixel area for each pixel
+
+# In[23]:
+
+
+# To be able to find the harvested area per pixel we need to sum up the harvested area for each crop in each pixel
+# and store it in the form of an numpy array. 
+
+@traced()
+def get_net_harvested_area(shapefile, geodataframe, region=None):
+    
+    region = get_region_window(shapefile, region)
+
+    # The sum over all the crops does not depend on the excluded pixels so it is computed once per region
+    def total_harvested_area():
+        net_harvested_area_obtained = None  # Initialize the net harvested area array
+
+        required_harvested_area = catalog.select('harvested_area', time_period=2010, water_supply='Total')
+
+        for required_url in required_harvested_area.values(): # This will loop pover all the available crops in cropland.
+            with open_raster(required_url) as src:
+                # Clip the raster using the shapefile
+                data, _ = region.read(src)
+
+            # Update the net harvested area array
+            if net_harvested_area_obtained is None:
+                net_harvested_area_obtained = remove_band_dimension(data)
+            else:
+                net_harvested_area_obtained = net_harvested_area_obtained + remove_band_dimension(data)
+
+        return net_harvested_area_obtained
+
+    net_harvested_area_obtained = region.memoize('net_harvested_area', (2010, 'Total'), total_harvested_area)
+    excluded = excluded_pixels_mask(geodataframe, net_harvested_area_obtained.shape)
+    
+    return np.where(excluded, np.nan, net_harvested_area_obtained)*1000 # To make the unit as hectares
+
+
+# In[24]:
+
+
+# Simply using a simple cosine of latitude approximation to account for the curvature of the Earth. The
+# consequences of making this simple approximation have been explored in detail in the paper.
+# 
+# Since the area of a pixel only depends on its latitude, it is computed once for every row of a grid and then
+# broadcast over the columns. Besides the cosine approximation ('cosine') the exact area of the cell on a sphere
+# ('spherical') or on the WGS84 ellipsoid ('ellipsoidal') can be used. The areas are cached for every grid.
+
+# In[24]:
+
+
+# Radius of the sphere with the same area as the WGS84 ellipsoid, and the WGS84 ellipsoid itself
+earth_authalic_radius = 6371007.2
+wgs84_semi_major_axis = 6378137.0
+wgs84_flattening = 1 / 298.257223563
+
+pixel_area_cache = {}
+
+
+def pixel_area_per_row(transform, height, method='cosine'):
+    key = (tuple(transform)[:6], height, method)
+    if key in pixel_area_cache:
+        return pixel_area_cache[key]
+
+    pixel_width = transform[0]
+    pixel_height = transform[4]
+    lat_top = transform[5] + pixel_height * np.arange(height)
+    lat_bottom = lat_top + pixel_height
+
+    if method == 'cosine':
+        lat_centre = np.radians(lat_top + pixel_height / 2)
+        row_area = np.abs(pixel_width * pixel_height * (111319.9)**2) * np.cos(lat_centre)
+    elif method == 'spherical':
+        row_area = (earth_authalic_radius**2 * np.radians(np.abs(pixel_width)) *
+                    np.abs(np.sin(np.radians(lat_top)) - np.sin(np.radians(lat_bottom))))
+    elif method == 'ellipsoidal':
+        # Area of the band between the equator and a latitude on the ellipsoid, per radian of longitude
+        e = np.sqrt(wgs84_flattening * (2 - wgs84_flattening))
+        b = wgs84_semi_major_axis * (1 - wgs84_flattening)
+
+        def band_area(lat):
+            sin_lat = np.sin(np.radians(lat))
+            return (b**2 / 2) * (sin_lat / (1 - e**2 * sin_lat**2) +
+                                 np.log((1 + e * sin_lat) / (1 - e * sin_lat)) / (2 * e))
+
+        row_area = np.radians(np.abs(pixel_width)) * np.abs(band_area(lat_top) - band_area(lat_bottom))
+    else:
+        raise ValueError(f"Unknown pixel area method {method}, use 'cosine', 'spherical' or 'ellipsoidal'")
+
+    row_area = (row_area / 10000).astype(np.float32) # conversion to hectares
+    pixel_area_cache[key] = row_area
+    return row_area
+
+
+@traced()
+def extract_pixel_area(raster_path, shapefile, region=None, method='cosine'):
+    region = get_region_window(shapefile, region)
+
+    with open_raster(raster_path) as src:
+    # Clip the raster using the shapefile boundaries
+        clipped_data, clipped_transform = region.read(src)
+        nodata = src.nodata
+
+    # Calculate the area of each pixel based on latitude and keep it only where the raster has data
+    row_area = pixel_area_per_row(clipped_transform, clipped_data.shape[1], method)
+    pixel_area = row_area[np.newaxis, :, np.newaxis] * (clipped_data != nodata)
+
+    return pixel_area.astype(np.float32)
+
+
+# #### Final output function for marginal land data. 
+# - It outputs an xarray containing the energy yields of each crop for the selected geography (These are not multiplied by the area since the area is the same and this saves compute). 
+# - It also outputs the net biomass energy potential from the marginal land using the the crop energy yields which give the max energy extractable from each pixel. 
+# - Finally it outputs the sum of this final array described in the second point.
+
+# In[25]:
+
+
+@traced()
+def get_biomass_potential_for_marginal(shapefile,time_period, climate_model, rcp, water_supply_future,
+                                       input_level, region=None, exclusion_rules=None, residue_table=None):
+    
+    # Grid of the selected region shared by all the rasters read below
+    region = get_region_grid(shapefile, region)
+
+    # Combining the AEZ, exclusion, tree cover and pasture layers into the mask of the excluded pixels
+    excluded_pixels = build_exclusion_mask(region, time_period, rcp, exclusion_rules)
+    
+    biomass_potential_xarray = find_max_for_each_pixel(time_period, climate_model, rcp,
+                                                       water_supply_future, input_level,
+                                                       shapefile, excluded_pixels, region, residue_table)
+    
+    harvested_area_from_shapefile = get_net_harvested_area(shapefile, excluded_pixels, region)
+    
+    net_area = region.pixel_area
+    
+    remaining_area = np.subtract(net_area,harvested_area_from_shapefile)
+    final_potential = np.multiply(biomass_potential_xarray['max_values'].values, remaining_area)*(10**-5)# Unit conversion MJ to Joules and 10 Kg to Kg and 
+    # then 10**-12 for peta joules
+    total_biomass_marginal_potential = np.nansum(final_potential)
+
+    
+    return total_biomass_marginal_potential, final_potential, biomass_potential_xarray
+
+
+# #### Total Raw Biomass Energy Potential : 
+# - This is the final total raw biomass energy potential function which gives us the sum of energy potential from each pixel for cropland and marginal land, which is the final intended output of our tool. 
+# - It also produces a final xarray which contains everything under their respective headings.
+
+# In[26]:
+
+
+@traced()
+def get_total_biomass_potential(shapefile, time_period, climate_model, rcp, water_supply_future, input_level, water_supply_2010,
+                                region=None, residue_table=None):
+    region = get_region_grid(shapefile, region)
+
+    # Calculate biomass potential for cropland
+    cropland_dataset = future_potential_cropland(time_period, climate_model, rcp, water_supply_future, input_level, shapefile, water_supply_2010, region,
+                                                 residue_table)
+
+    # Calculate biomass potential for marginal land
+    marginal_land_potential, marginal_land_array, marginal_land_dataset = get_biomass_potential_for_marginal(shapefile, time_period, climate_model, rcp, water_supply_future, input_level, region,
+                                                                                                             residue_table=residue_table)
+
+    total_biomass_dataset = combine_total_biomass(cropland_dataset, marginal_land_potential, marginal_land_array)
+
+    return total_biomass_dataset , cropland_dataset , marginal_land_dataset , marginal_land_array
+
+
+@traced()
+def combine_total_biomass(cropland_dataset, marginal_land_potential, marginal_land_array):
+    # Create an empty dataset to hold the outputs
+    total_biomass_dataset = xr.Dataset(coords=cropland_dataset.coords)
+
+    # Add attributes for the total sum of attributes for each pixel
+    total_sum_cropland = cropland_dataset.attrs['net_sum in PJ']
+    total_sum_marginal_land = marginal_land_potential
+    total_biomass_dataset.attrs['net_energy_potential'] = total_sum_cropland + total_sum_marginal_land
+    total_biomass_dataset.attrs['final_energy_array'] = marginal_land_array + cropland_dataset['Combined'].values
+
+    return total_biomass_dataset
+
+
+# ### Streaming totals
+# When only the potential in PJ is needed, the functions below compute it without keeping an array per crop. The crop
+# rasters are read one at a time and reduced straight away: to their sum for the cropland (see
+# biomass_potential_past_totals and future_potential_cropland_totals above) and, for the marginal land, to a running
+# maximum energy and the index of the crop giving it, which is all the final potential needs. The memory used is the
+# same whatever the number of crops. With per_crop=True the marginal land potential is also split between the crops
+# giving the maximum energy in each pixel. run_scenarios(..., totals_only=True) uses these functions for every scenario,
+# without the results store, which only keeps per pixel results.
+
+# In[ ]:
+
+
+@traced()
+def marginal_potential_totals(shapefile, time_period, climate_model, rcp, water_supply_future, input_level, region=None,
+                              exclusion_rules=None, residue_table=None, per_crop=False):
+    region = get_region_grid(shapefile, region)
+    excluded_pixels = build_exclusion_mask(region, time_period, rcp, exclusion_rules)
+
+    unique_crops = catalog.crops('potential_yield')
+    required_potential_yields = potential_yield_rasters(unique_crops, time_period, climate_model, rcp,
+                                                        water_supply_future, input_level)
+    factors = energy_factor_vector(unique_crops, residue_table, all_residue_factors)
+
+    # Running maximum of the energy over the crops and index of the first crop reaching it, as np.argmax
+    max_values = np.zeros(region.shape, dtype='float32')
+    max_index = np.zeros(region.shape, dtype='int16')
+    for i, (crop, factor) in enumerate(zip(unique_crops, factors)):
+        raster_path = required_potential_yields[crop]
+        crop_energy = np.asarray(remove_pixels(raster_path, shapefile, excluded_pixels, region), dtype='float32')
+        np.nan_to_num(crop_energy, copy=False, nan=0)
+        np.maximum(crop_energy, 0, out=crop_energy)
+        crop_energy *= factor
+
+        better = crop_energy > max_values
+        max_values[better] = crop_energy[better]
+        max_index[better] = i
+
+    harvested_area_from_shapefile = get_net_harvested_area(shapefile, excluded_pixels, region)
+    remaining_area = np.subtract(region.pixel_area, harvested_area_from_shapefile)
+    final_potential = np.multiply(max_values, remaining_area)*(10**-5)
+    total_biomass_marginal_potential = np.nansum(final_potential)
+
+    if not per_crop:
+        return total_biomass_marginal_potential
+
+    crop_potentials = np.bincount(max_index.ravel(), weights=np.nan_to_num(final_potential[0]).ravel(),
+                                  minlength=len(unique_crops))
+    return pd.Series(crop_potentials, index=list(unique_crops), dtype='float64')
+
+
+# ### Ensemble of climate models
+# Instead of computing the cropland and marginal land potential once per climate model and combining the results by
+# hand, ensemble_potential streams the potential yields of every climate model through the grid of the region once.
+# The layers which do not depend on the climate model (the 2010 harvested areas, the exclusion mask, the harvested
+# area to remove from the marginal land and the pixel areas) are read once, and each potential yield raster is read
+# once and used for both the cropland and the marginal land. The per pixel mean, minimum, maximum and standard
+# deviation (as np.std) over the models are updated after each model with Welford's running algorithm, and the best
+# crop of the marginal land in each pixel is counted per crop, so the memory used does not grow with the number of
+# models. best_crop is the crop chosen by the most models (-1 where no model finds any energy) and
+# best_crop_agreement the fraction of the models choosing it. The net potential of each model in PJ is kept along
+# the climate_model dimension.
+
+# In[ ]:
+
+
+class RunningStats:
+
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape, dtype='float64')
+        self.m2 = np.zeros(shape, dtype='float64')
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+    def add(self, values):
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (values - self.mean)
+        np.minimum(self.min, values, out=self.min)
+        np.maximum(self.max, values, out=self.max)
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / self.count)
+
+
+@traced()
+def ensemble_potential(shapefile, time_period, climate_models, rcp, water_supply_future, input_level,
+                       water_supply_2010='Total', region=None, exclusion_rules=None, residue_table=None):
+    region = get_region_grid(shapefile, region)
+
+    unique_crops = catalog.crops('potential_yield')
+    factors = energy_factor_vector(unique_crops, residue_table, all_residue_factors)
+    # The future cropland uses the residues of the cropland table, as in future_potential_cropland
+    cropland_factors = energy_factor_vector(unique_crops, residue_table, residue_factors) * (10 ** -3)  # Unit conversion factor to PetaJoules
+    required_harvested_area = harvested_area_2010(water_supply_2010)
+
+    # Checking that every model has all its rasters before reading any of them
+    required_potential_yields = {climate_model: potential_yield_rasters(unique_crops, time_period, climate_model, rcp,
+                                                                        water_supply_future, input_level)
+                                 for climate_model in climate_models}
+
+    # The layers shared by all the models
+    excluded_pixels = build_exclusion_mask(region, time_period, rcp, exclusion_rules)
+    harvested_area_from_shapefile = get_net_harvested_area(shapefile, excluded_pixels, region)
+    remaining_area = np.subtract(region.pixel_area, harvested_area_from_shapefile)[0]
+
+    stats = {name: RunningStats(region.shape) for name in ('cropland', 'marginal', 'total')}
+    best_crop_votes = np.zeros((len(unique_crops),) + region.shape, dtype='int16')
+    totals = {'cropland': [], 'marginal': []}
+
+    for climate_model in climate_models:
+        cropland = np.zeros(region.shape, dtype='float64')
+        cropland_sum = 0.0
+        max_values = np.zeros(region.shape, dtype='float32')
+        max_index = np.zeros(region.shape, dtype='int16')
+
+        for i, (crop, factor, cropland_factor) in enumerate(zip(unique_crops, factors, cropland_factors)):
+            crop_yield = remove_band_dimension(read_crop_raster(required_potential_yields[climate_model], crop, region))
+
+            # Future cropland: the 2010 harvested area times the future yield, as in future_potential_cropland
+            if crop in required_harvested_area:
+                harvested_area = remove_band_dimension(read_crop_raster(required_harvested_area, crop, region, memoize=True))
+                product = np.multiply(np.nan_to_num(harvested_area), np.nan_to_num(crop_yield))
+                cropland += product * cropland_factor
+                cropland_sum += np.nansum(product) * cropland_factor
+
+            # Marginal land: running maximum of the energy over the crops, as in find_max_for_each_pixel
+            crop_energy = np.where(excluded_pixels, np.nan, crop_yield).astype('float32')
+            np.nan_to_num(crop_energy, copy=False, nan=0)
+            np.maximum(crop_energy, 0, out=crop_energy)
+            crop_energy *= factor
+
+            better = crop_energy > max_values
+            max_values[better] = crop_energy[better]
+            max_index[better] = i
+
+        marginal = max_values * remaining_area * (10 ** -5)
+        for name, values in (('cropland', cropland), ('marginal', marginal), ('total', cropland + marginal)):
+            stats[name].add(values)
+        totals['cropland'].append(cropland_sum)
+        totals['marginal'].append(np.nansum(marginal))
+
+        rows, cols = np.nonzero(max_values > 0)
+        best_crop_votes[max_index[rows, cols], rows, cols] += 1
+
+    coords = {'latitude': (('x', 'y'), region.lats), 'longitude': (('x', 'y'), region.lons)}
+    outside = ~region.mask
+    ensemble = xr.Dataset(coords=coords)
+    for name, layer_stats in stats.items():
+        for statistic in ('mean', 'min', 'max', 'std'):
+            values = np.where(outside, np.nan, getattr(layer_stats, statistic))
+            ensemble[f'{name}_{statistic}'] = xr.DataArray(values, dims=('y', 'x'), attrs={'units': 'PetaJoules'})
+
+    votes = best_crop_votes.max(axis=0)
+    ensemble['crop_names'] = xr.DataArray(np.array(unique_crops, dtype=str), dims=('crop',))
+    ensemble['best_crop'] = xr.DataArray(
+        np.where(votes > 0, best_crop_votes.argmax(axis=0), no_crop_value).astype('int16'), dims=('y', 'x'),
+        attrs=crop_flag_attrs(unique_crops))
+    ensemble['best_crop_agreement'] = xr.DataArray((votes / len(climate_models)).astype('float32'), dims=('y', 'x'))
+
+    ensemble = ensemble.assign_coords(climate_model=list(climate_models))
+    for name, values in totals.items():
+        ensemble[f'{name}_pj'] = xr.DataArray(np.array(values, dtype='float64'), dims=('climate_model',),
+                                              attrs={'units': 'PetaJoules'})
+    ensemble['total_pj'] = ensemble['cropland_pj'] + ensemble['marginal_pj']
+
+    ensemble.attrs.update({'time_period': time_period, 'rcp': rcp, 'water_supply_future': water_supply_future,
+                           'input_level': input_level, 'water_supply_2010': water_supply_2010})
+    return ensemble
+
+
+# ### Running a sweep of scenarios in parallel
+# The graph_plotter functions below compute every combination of RCP and time period for the selected region. Since
+# all these scenarios are independent of each other, run_scenarios builds the list of tasks (the past cropland
+# potential for 2000 and 2010, the future cropland and marginal land potential of each scenario, and the total
+# potential which depends on the last two) and can run them in a pool of worker processes. The pool is opt-in: the
+# number of workers is set with max_workers or the BEPMAT_WORKERS environment variable, and by default everything
+# runs in the current process, as a pool only pays off once the rasters it re-reads in every worker are cached.
+# 
+# The results are returned as dictionaries of xarrays keyed by (RCP, time period), with the years '2000' and '2010'
+# for the past cropland potential, as in the graph_plotter functions. When a list of climate models is passed the
+# keys become (climate model, RCP, time period).
+
+# In[ ]:
+
+
+all_time_periods = ['2011-2040', '2041-2070', '2071-2100']
+all_rcps = ['RCP2.6', 'RCP4.5', 'RCP6.0', 'RCP8.5']
+
+
+# The number of worker processes when max_workers is not given, 1 (no pool) unless BEPMAT_WORKERS is set
+def worker_count(max_workers=None):
+    if max_workers is None:
+        max_workers = int(os.environ.get('BEPMAT_WORKERS', 1))
+    return max_workers
+
+# Grid of the region shared by the tasks run in a worker process
+sweep_region = None
+
+
+def init_scenario_worker(region):
+    global sweep_region
+    sweep_region = region
+
+
+def run_scenario_task(task, water_supply_future, input_level, water_supply_2010, totals_only=False):
+    with trace_span('scenario_task', task=list(task), water_supply_future=water_supply_future, input_level=input_level):
+        return scenario_task_result(task, water_supply_future, input_level, water_supply_2010, totals_only)
+
+
+def scenario_task_result(task, water_supply_future, input_level, water_supply_2010, totals_only=False):
+    region = sweep_region
+    kind = task[0]
+
+    if totals_only:
+        return run_scenario_totals_task(task, water_supply_future, input_level, water_supply_2010)
+
+    if kind == 'past':
+        return biomass_potential_past(region.shapefile, task[1], 'Total', region)
+
+    _, climate_model, rcp, time_period = task
+    if kind == 'cropland':
+        return future_potential_cropland(time_period, climate_model, rcp, water_supply_future, input_level,
+                                         region.shapefile, water_supply_2010, region)
+    if kind == 'marginal':
+        return get_biomass_potential_for_marginal(region.shapefile, time_period, climate_model, rcp,
+                                                  water_supply_future, input_level, region)
+    raise ValueError(f"Unknown scenario task {task}")
+
+
+# The potential of every crop in PJ, for the past and future cropland, and the total for the marginal land
+def run_scenario_totals_task(task, water_supply_future, input_level, water_supply_2010):
+    region = sweep_region
+    kind = task[0]
+
+    if kind == 'past':
+        return biomass_potential_past_totals(region.shapefile, task[1], 'Total', region)
+
+    _, climate_model, rcp, time_period = task
+    if kind == 'cropland':
+        return future_potential_cropland_totals(time_period, climate_model, rcp, water_supply_future, input_level,
+                                                region.shapefile, water_supply_2010, region)
+    if kind == 'marginal':
+        return marginal_potential_totals(region.shapefile, time_period, climate_model, rcp, water_supply_future,
+                                         input_level, region)
+    raise ValueError(f"Unknown scenario task {task}")
+
+
+# Checking that the catalogs have every raster a task needs, so that a missing combination is reported before the
+# sweep starts
+def check_scenario_rasters(task, water_supply_future, input_level, water_supply_2010):
+    kind = task[0]
+    if kind == 'past':
+        catalog.select('production_values', catalog.crops('production_values'), time_period=task[1], water_supply='Total')
+        return
+
+    _, climate_model, rcp, time_period = task
+    if kind == 'cropland':
+        harvested_area_2010(water_supply_2010)
+        potential_yield_rasters(cropland_crops(), time_period, climate_model, rcp, water_supply_future, input_level)
+    if kind == 'marginal':
+        potential_yield_rasters(catalog.crops('potential_yield'), time_period, climate_model, rcp, water_supply_future,
+                                input_level)
+
+
+def scenario_tasks(climate_models, rcps, time_periods, land_types, past_years):
+    # Every task maps to the tasks it depends on
+    tasks = {}
+    if 'cropland' in land_types:
+        for year in past_years:
+            tasks[('past', year)] = ()
+    for climate_model in climate_models:
+        for rcp in rcps:
+            for time_period in time_periods:
+                for land_type in land_types:
+                    tasks[(land_type, climate_model, rcp, time_period)] = ()
+                if 'cropland' in land_types and 'marginal' in land_types:
+                    tasks[('total', climate_model, rcp, time_period)] = (('cropland', climate_model, rcp, time_period),
+                                                                          ('marginal', climate_model, rcp, time_period))
+    return tasks
+
+
+# Computing the layers shared by all the scenarios once, before the region is sent to the workers
+def prepare_scenario_layers(region, land_types, water_supply_2010='Total', exclusion_rules=None):
+    if 'cropland' in land_types:
+        required_harvested_area = harvested_area_2010(water_supply_2010)
+        for crop in required_harvested_area:
+            read_crop_raster(required_harvested_area, crop, region, memoize=True)
+
+    if 'marginal' in land_types:
+        get_net_harvested_area(region.shapefile, np.zeros(region.shape, dtype=bool), region)
+        for rule in (exclusion_rules or default_exclusion_rules):
+            # The AEZ layer changes with the scenario
+            if rule['layer'] != 'aez':
+                read_layer_on_grid(exclusion_layer_path(rule['layer'], None, None), region, rule.get('resampling'))
+
+
+@traced()
+def run_scenarios(region, climate_models, rcps=None, time_periods=None, water_supply_future=None, input_level='High',
+                  water_supply_2010='Total', land_types=('cropland', 'marginal'), past_years=(2000, 2010),
+                  max_workers=None, store=None, totals_only=False):
+    if rcps is None:
+        rcps = all_rcps
+    if time_periods is None:
+        time_periods = all_time_periods
+    max_workers = worker_count(max_workers)
+    # The store keeps the per pixel Datasets, which a totals_only sweep does not compute
+    if totals_only and store is not None:
+        raise ValueError("A results store cannot be used with totals_only, which only computes the totals")
+    if store is None and not totals_only:
+        store = result_store
+
+    # The region can be given as a shapefile or as an already built RegionGrid
+    if not isinstance(region, RegionGrid):
+        region = RegionGrid(region)
+
+    single_model = isinstance(climate_models, str)
+    if single_model:
+        climate_models = [climate_models]
+
+    tasks = scenario_tasks(climate_models, rcps, time_periods, land_types, past_years)
+    task_args = (water_supply_future, input_level, water_supply_2010, totals_only)
+
+    # The scenarios already in the results store are not computed again
+    done = {}
+    if store is not None:
+        for task, dependencies in tasks.items():
+            if not dependencies:
+                stored = store.get(region, task[0], scenario_params(task, *task_args[:3]))
+                if stored is not None:
+                    done[task] = stored
+    leaf_tasks = [task for task, dependencies in tasks.items() if not dependencies and task not in done]
+    for task in leaf_tasks:
+        check_scenario_rasters(task, *task_args[:3])
+
+    def finish(task, result):
+        done[task] = result
+        if store is not None:
+            store.put(region, task[0], scenario_params(task, *task_args[:3]), result)
+
+    if leaf_tasks:
+        prepare_scenario_layers(region, land_types, water_supply_2010)
+
+    if max_workers <= 1:
+        init_scenario_worker(region)
+        for task in leaf_tasks:
+            finish(task, run_scenario_task(task, *task_args))
+    elif leaf_tasks:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_scenario_worker,
+                                 initargs=(region,)) as executor:
+            pending = {executor.submit(run_scenario_task, task, *task_args): task for task in leaf_tasks}
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(pending.pop(future), future.result())
+
+    # The total potential is combined from the cropland and marginal results once both are available
+    for task, dependencies in tasks.items():
+        if dependencies and totals_only:
+            done[task] = done[dependencies[0]].sum() + done[dependencies[1]]
+        elif dependencies:
+            cropland_dataset = done[dependencies[0]]
+            marginal_land_potential, marginal_land_array, _ = done[dependencies[1]]
+            done[task] = combine_total_biomass(cropland_dataset, marginal_land_potential, marginal_land_array)
+
+    results = {'cropland': {}, 'marginal': {}, 'marginal_arrays': {}, 'total': {}}
+    for task in tasks:
+        value = done[task]
+        if task[0] == 'past':
+            results['cropland'][str(task[1])] = value
+            continue
+
+        key = task[2:] if single_model else task[1:]
+        if task[0] == 'marginal' and not totals_only:
+            results['marginal'][key] = value[2]
+            results['marginal_arrays'][key] = value[1]
+        else:
+            results[task[0]][key] = value
+
+    return results
+
+
+# ### Storing the results of the scenarios
+# The ResultStore keeps the output of every (region, scenario, land type) in a compressed NetCDF file as soon as it
+# is computed, along with a SQLite index of the scenario keys and the net potential in PJ. When a store is given to
+# run_scenarios (or set for the whole module with set_result_store or the BEPMAT_RESULTS_DIR environment variable),
+# the scenarios which are already in the store are read back instead of being computed again. The region is
+# identified by a hash of its geometry so that the same country or province is found whichever way its shapefile
+# was obtained.
+
+# In[ ]:
+
+
+def region_key(region):
+    digest = hashlib.sha256()
+    for shape in region.shapes:
+        digest.update(shape.wkb)
+    digest.update(str(region.shapefile.crs).encode())
+    return digest.hexdigest()
+
+
+def region_name(region):
+    columns = [column for column in ('NAME_0', 'NAME_1', 'COUNTRY') if column in region.shapefile.columns]
+    return '_'.join(str(region.shapefile[column].iloc[0]) for column in columns[:2])
+
+
+def scenario_params(task, water_supply_future, input_level, water_supply_2010):
+    kind = task[0]
+    if kind == 'past':
+        return {'time_period': task[1], 'water_supply': 'Total'}
+
+    _, climate_model, rcp, time_period = task
+    params = {'time_period': time_period, 'climate_model': climate_model, 'rcp': rcp,
+              'water_supply_future': water_supply_future, 'input_level': input_level}
+    if kind == 'cropland':
+        params['water_supply_2010'] = water_supply_2010
+    return params
+
+
+class ResultStore:
+
+    def __init__(self, store_dir=None, complevel=4):
+        if store_dir is None:
+            store_dir = os.environ.get('BEPMAT_RESULTS_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'bepmat', 'results'))
+
+        self.store_dir = store_dir
+        self.complevel = complevel
+        self.index_path = os.path.join(store_dir, 'index.sqlite')
+        os.makedirs(store_dir, exist_ok=True)
+        self._execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, region TEXT, region_name TEXT, "
+                      "land_type TEXT, scenario TEXT, path TEXT, net_pj REAL, created REAL)")
+
+    def _execute(self, statement, params=()):
+        connection = sqlite3.connect(self.index_path, timeout=60)
+        try:
+            with connection:
+                return connection.execute(statement, params).fetchall()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _key(region_id, land_type, scenario):
+        return hashlib.sha256(f"{region_id}|{land_type}|{scenario}".encode()).hexdigest()
+
+    # The marginal land results are a tuple of the total, the final potential array and the dataset, which are stored
+    # together in a single dataset
+    @staticmethod
+    def _to_dataset(land_type, result):
+        if land_type != 'marginal':
+            net_pj = result.attrs.get('Net Potential in PetaJ', result.attrs.get('net_sum in PJ'))
+            return result, net_pj
+
+        total_biomass_marginal_potential, final_potential, biomass_potential_xarray = result
+        dataset = biomass_potential_xarray.copy()
+        dataset['final_potential'] = xr.DataArray(final_potential, dims=('band',) + biomass_potential_xarray['max_values'].dims)
+        dataset.attrs['total_biomass_marginal_potential'] = total_biomass_marginal_potential
+        return dataset, total_biomass_marginal_potential
+
+    @staticmethod
+    def _from_dataset(land_type, dataset):
+        if land_type != 'marginal':
+            return dataset
+
+        total_biomass_marginal_potential = dataset.attrs.pop('total_biomass_marginal_potential')
+        final_potential = dataset['final_potential'].values
+        return total_biomass_marginal_potential, final_potential, dataset.drop_vars('final_potential')
+
+    def put(self, region, land_type, params, result):
+        region_id = region_key(region)
+        scenario = json.dumps(params, sort_keys=True)
+        key = self._key(region_id, land_type, scenario)
+        dataset, net_pj = self._to_dataset(land_type, result)
+
+        encoding = {name: {'zlib': True, 'complevel': self.complevel}
+                    for name, variable in dataset.data_vars.items() if variable.dtype.kind in 'fiu'}
+        path = os.path.join(self.store_dir, f"{key}.nc")
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix='.nc')
+        os.close(fd)
+        dataset.to_netcdf(tmp_path, engine='netcdf4', encoding=encoding)
+        os.replace(tmp_path, path)
+
+        self._execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                      (key, region_id, region_name(region), land_type, scenario, path,
+                       None if net_pj is None else float(net_pj), time.time()))
+        return path
+
+    def get(self, region, land_type, params):
+        key = self._key(region_key(region), land_type, json.dumps(params, sort_keys=True))
+        rows = self._execute("SELECT path FROM results WHERE key = ?", (key,))
+        if not rows or not os.path.exists(rows[0][0]):
+            return None
+        return self._from_dataset(land_type, xr.load_dataset(rows[0][0], engine='netcdf4'))
+
+    # The net potential in PJ of a stored scenario, from the index only, or None when the scenario is not stored
+    def net_potential(self, region, land_type, params):
+        key = self._key(region_key(region), land_type, json.dumps(params, sort_keys=True))
+        rows = self._execute("SELECT path, net_pj FROM results WHERE key = ?", (key,))
+        if not rows or not os.path.exists(rows[0][0]):
+            return None
+        return rows[0][1]
+
+    def fetch(self, region, land_type, params, compute):
+        result = self.get(region, land_type, params)
+        if result is None:
+            result = compute()
+            self.put(region, land_type, params, result)
+        return result
+
+    # The index as a table of the scenario keys and the net potential of each of them
+    def totals(self, region=None):
+        statement = "SELECT region, region_name, land_type, scenario, net_pj, path FROM results"
+        params = ()
+        if region is not None:
+            statement += " WHERE region = ?"
+            params = (region_key(region),)
+        table = pd.DataFrame(self._execute(statement, params),
+                             columns=['region', 'region_name', 'land_type', 'scenario', 'net_pj', 'path'])
+        scenarios = pd.DataFrame([json.loads(scenario) for scenario in table['scenario']], index=table.index)
+        return pd.concat([table.drop(columns='scenario'), scenarios], axis=1)
+
+
+result_store = ResultStore() if os.environ.get('BEPMAT_RESULTS_DIR') else None
+
+
+def set_result_store(store_dir=None, complevel=4):
+    global result_store
+    result_store = ResultStore(store_dir, complevel)
+    return result_store
+
+
+# ### Potential of every province of a country in a single run
+# Instead of running every province separately, which reads and clips every raster once per province, the whole
+# country is computed once on the grid of all its provinces. The provinces are then rasterized into a raster of
+# zones (1 for the first province, 2 for the second, ..., 0 outside the country) on the same grid and the per pixel
+# potentials are summed per zone with np.bincount. Only the pixels whose centre lies in a province are counted,
+# as for a single province. The results are returned as a tidy table with one row per province and land type, and
+# optionally with a dataset per province holding the cropland, marginal land and total potential of its pixels.
+
+# In[ ]:
+
+
+def province_zones(provinces, region):
+    shapes = ((geometry, zone) for zone, geometry in enumerate(provinces.geometry, start=1))
+    zones = rasterize(shapes, out_shape=region.shape, transform=region.transform, fill=0, dtype='int32')
+    return np.where(region.mask, zones, 0)
+
+
+def zonal_sums(zones, values, n_zones):
+    values = np.nan_to_num(np.asarray(values, dtype='float64').reshape(zones.shape))
+    return np.bincount(zones.ravel(), weights=values.ravel(), minlength=n_zones + 1)[1:]
+
+
+def province_dataset(zones, zone, cropland_array, marginal_array, max_crops, lats, lons):
+    rows, cols = np.nonzero(zones == zone)
+    if not len(rows):
+        return None
+
+    window = (slice(rows.min(), rows.max() + 1), slice(cols.min(), cols.max() + 1))
+    inside = zones[window] == zone
+    coords = {'latitude': (('x', 'y'), lats[window[::-1]]), 'longitude': (('x', 'y'), lons[window[::-1]])}
+
+    dataset = xr.Dataset(coords=coords)
+    for name, array in (('cropland', cropland_array), ('marginal', marginal_array),
+                        ('total', cropland_array + marginal_array)):
+        dataset[name] = xr.DataArray(np.where(inside, array[window], np.nan), dims=('y', 'x'),
+                                     attrs={'units': 'PetaJoules', 'sum': np.nansum(array[window][inside])})
+    dataset['max_crops'] = xr.DataArray(np.where(inside, max_crops.values[window], no_crop_value).astype('int16'),
+                                        dims=('y', 'x'), attrs=max_crops.attrs)
+    return dataset
+
+
+@traced()
+def country_province_potentials(country, time_period, climate_model, rcp, water_supply_future, input_level,
+                                water_supply_2010, provinces=None, return_datasets=False, region=None):
+    if provinces is None:
+        provinces = get_boundary_store().get(country, level=1)
+    provinces = provinces.reset_index(drop=True)
+
+    # A single grid covering all the provinces
+    region = get_region_grid(provinces, region)
+    zones = region.memoize('zones', tuple(provinces['NAME_1']), lambda: province_zones(provinces, region))
+
+    cropland_dataset = future_potential_cropland(time_period, climate_model, rcp, water_supply_future, input_level,
+                                                 provinces, water_supply_2010, region)
+    marginal_land_potential, marginal_land_array, marginal_land_dataset = get_biomass_potential_for_marginal(
+        provinces, time_period, climate_model, rcp, water_supply_future, input_level, region)
+
+    cropland_array = np.nan_to_num(cropland_dataset['Combined'].values)
+    marginal_array = np.nan_to_num(marginal_land_array[0])
+
+    cropland = zonal_sums(zones, cropland_array, len(provinces))
+    marginal = zonal_sums(zones, marginal_array, len(provinces))
+
+    country_names = provinces['COUNTRY'] if 'COUNTRY' in provinces.columns else pd.Series(country, index=provinces.index)
+    table = pd.concat([pd.DataFrame({'COUNTRY': country_names, 'NAME_1': provinces['NAME_1'], 'land_type': land_type,
+                                     'potential_pj': values})
+                       for land_type, values in (('cropland', cropland), ('marginal', marginal),
+                                                 ('total', cropland + marginal))], ignore_index=True)
+    table = table.assign(time_period=time_period, climate_model=climate_model, rcp=rcp,
+                         water_supply_future=water_supply_future, input_level=input_level,
+                         water_supply_2010=water_supply_2010)
+
+    if not return_datasets:
+        return table
+
+    datasets = {}
+    for zone, name in enumerate(provinces['NAME_1'], start=1):
+        datasets[name] = province_dataset(zones, zone, cropland_array, marginal_array,
+                                          marginal_land_dataset['max_crops'], region.lats, region.lons)
+    return table, datasets
+
+
+# ### Tiled processing of large regions
+# For the largest countries, continents or the whole world, holding every crop layer of the whole region in memory
+# at once is not possible. In the tiled mode the grid of the region is split into square tiles of tile_size pixels
+# (BEPMAT_TILE_SIZE, 512 by default) and the cropland and marginal land potentials are computed tile by tile with the
+# same functions as for a whole region, a RegionTile standing in for the RegionGrid. The tiles which do not
+# intersect the region are skipped. Only the totals and the final per pixel layers (cropland, marginal land and total
+# potential, and the maximum energy crop of the marginal land) are kept from every tile: they are written to a tiled
+# and compressed GeoTIFF as soon as each tile is done when an output path is given, or gathered into arrays otherwise.
+# The tiles are run in a pool of max_workers processes with at most two tiles per worker in flight, so that the memory
+# used depends on the tile size and the number of workers and not on the size of the region. Every tile memoizes the
+# layers which do not depend on the scenario (the 2010 harvested areas, the exclusion layers, ...) for as long as it
+# lives, taking them from the memo of the whole region when they were already computed on it. run_tiled_scenarios
+# computes a list of scenarios tile by tile, all the scenarios of a tile on the same RegionTile, so that these layers
+# are read once per tile for the whole sweep instead of once per tile and scenario.
+
+# In[ ]:
+
+
+class RegionTile(RegionGrid):
+
+    def __init__(self, region, row_off, col_off, height, width):
+        RegionWindow.__init__(self, region.shapefile)
+        self.area_method = region.area_method
+        self.reference_raster = region.reference_raster
+        self.crs = region.crs
+        self.row_off, self.col_off = row_off, col_off
+        self.transform = region.transform * Affine.translation(col_off, row_off)
+        self.shape = (height, width)
+        self.slices = (slice(row_off, row_off + height), slice(col_off, col_off + width))
+        self.mask = region.mask[self.slices]
+        self.lats, self.lons = region.lats[self.slices[::-1]], region.lons[self.slices[::-1]]
+        self._pixel_area = None
+        self.region = region
+
+    # The window of the tile on any of the GAEZ grids, which are all aligned with each other
+    def window(self, src):
+        key = self._grid_key(src)
+        if key not in self._windows:
+            left, top = self.transform * (0, 0)
+            right, bottom = self.transform * (self.shape[1], self.shape[0])
+            col_start, row_start = (round(value) for value in ~src.transform * (left, top))
+            col_stop, row_stop = (round(value) for value in ~src.transform * (right, bottom))
+            self._windows[key] = Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+        return self._windows[key]
+
+    # On the grid of the region the tile takes its slice of the mask of the whole region, as rasterizing the polygon
+    # again on the tile can put the pixels on the border of the region on the other side
+    def region_mask(self, src):
+        window = self.window(src)
+        if (int(window.height), int(window.width)) == tuple(self.shape):
+            return ~self.mask
+        return super().region_mask(src)
+
+    # The layers are kept on the tile, which is dropped once done, so the memory does not grow with the number of tiles
+    def memoize(self, layer, params, compute):
+        key = (layer,) + tuple(params)
+        if key not in self._memo:
+            self._memo[key] = self._from_region(key)
+            if self._memo[key] is None:
+                self._memo[key] = compute()
+        return self._memo[key]
+
+    # The window of the tile in a layer memoized on the grid of the whole region, or None
+    def _from_region(self, key):
+        value = self.region._memo.get(key)
+        if isinstance(value, np.ndarray) and value.shape[-2:] == tuple(self.region.shape):
+            return value[(Ellipsis,) + self.slices].copy()
+        return None
+
+
+def region_tiles(region, tile_size):
+    height, width = region.shape
+    for row_off in range(0, height, tile_size):
+        for col_off in range(0, width, tile_size):
+            tile_window = (row_off, col_off, min(tile_size, height - row_off), min(tile_size, width - col_off))
+            if region.mask[row_off:row_off + tile_window[2], col_off:col_off + tile_window[3]].any():
+                yield tile_window
+
+
+tiled_layers = ['cropland', 'marginal', 'total', 'max_values', 'max_crops']
+
+
+def tile_scenario(tile, time_period, climate_model, rcp, water_supply_future, input_level, water_supply_2010,
+                  land_types):
+    layers = {name: np.zeros(tile.shape, dtype='float32') for name in tiled_layers}
+    layers['max_crops'][:] = no_crop_value
+    totals = {'cropland': 0.0, 'marginal': 0.0}
+    crop_sums = {}
+    crop_names = None
+
+    if 'cropland' in land_types:
+        cropland_dataset = future_potential_cropland(time_period, climate_model, rcp, water_supply_future, input_level,
+                                                     tile.shapefile, water_supply_2010, tile)
+        layers['cropland'][:] = np.nan_to_num(cropland_dataset['Combined'].values)
+        totals['cropland'] = cropland_dataset.attrs['net_sum in PJ']
+        crop_sums = {crop: cropland_dataset[crop].attrs['sum_production']
+                     for crop in cropland_dataset.data_vars if crop != 'Combined'}
+
+    if 'marginal' in land_types:
+        marginal_land_potential, marginal_land_array, marginal_land_dataset = get_biomass_potential_for_marginal(
+            tile.shapefile, time_period, climate_model, rcp, water_supply_future, input_level, tile)
+        layers['marginal'][:] = np.nan_to_num(marginal_land_array[0])
+        layers['max_values'][:] = marginal_land_dataset['max_values'].values
+        layers['max_crops'][:] = marginal_land_dataset['max_crops'].values
+        totals['marginal'] = marginal_land_potential
+        crop_names = list(marginal_land_dataset['crop_names'].values)
+
+    layers['total'][:] = layers['cropland'] + layers['marginal']
+    return layers, totals, crop_sums, crop_names
+
+
+# All the scenarios are computed on the same tile, so the layers memoized on it are read once for all of them
+@traced()
+def run_tile_task(tile_window, scenarios, water_supply_future, input_level, water_supply_2010, land_types):
+    tile = RegionTile(sweep_region, *tile_window)
+    return tile_window, [tile_scenario(tile, time_period, climate_model, rcp, water_supply_future, input_level,
+                                       water_supply_2010, land_types)
+                         for climate_model, rcp, time_period in scenarios]
+
+
+# The layers and totals of one scenario, gathered tile by tile into arrays or into a GeoTIFF
+class TiledScenario:
+
+    def __init__(self, region, output_path=None):
+        self.output_path = output_path
+        self.output = None
+        self.layers = None
+        if output_path is not None:
+            self.output = rasterio.open(output_path, 'w', driver='GTiff', height=region.shape[0], width=region.shape[1],
+                                        count=len(tiled_layers), dtype='float32', crs=region.crs,
+                                        transform=region.transform, nodata=np.nan, tiled=True, blockxsize=256,
+                                        blockysize=256, compress='deflate')
+            for band, name in enumerate(tiled_layers, start=1):
+                self.output.set_band_description(band, name)
+        else:
+            self.layers = {name: np.zeros(region.shape, dtype='float32') for name in tiled_layers}
+            self.layers['max_crops'][:] = no_crop_value
+
+        self.totals = {'cropland': 0.0, 'marginal': 0.0}
+        self.crop_sums = {}
+        self.crop_names = None
+
+    def add(self, tile_window, tile_result):
+        row_off, col_off, height, width = tile_window
+        tile_layers, tile_totals, tile_crop_sums, tile_crop_names = tile_result
+        for name in self.totals:
+            self.totals[name] += tile_totals[name]
+        for crop, crop_sum in tile_crop_sums.items():
+            self.crop_sums[crop] = self.crop_sums.get(crop, 0.0) + crop_sum
+        self.crop_names = self.crop_names or tile_crop_names
+
+        if self.output is not None:
+            window = Window(col_off, row_off, width, height)
+            for band, name in enumerate(tiled_layers, start=1):
+                self.output.write(tile_layers[name], band, window=window)
+        else:
+            for name in tiled_layers:
+                self.layers[name][row_off:row_off + height, col_off:col_off + width] = tile_layers[name]
+
+    def close(self):
+        if self.output is not None:
+            if self.crop_names:
+                self.output.update_tags(crop_names=json.dumps(self.crop_names), no_crop_value=no_crop_value)
+            self.output.close()
+
+    def result(self):
+        return {'cropland': self.totals['cropland'], 'marginal': self.totals['marginal'],
+                'total': self.totals['cropland'] + self.totals['marginal'],
+                'crop_sums': pd.Series(self.crop_sums, dtype='float64'), 'crop_names': self.crop_names,
+                'layers': self.layers, 'path': self.output_path}
+
+
+# Several scenarios at once, keyed by (climate_model, rcp, time_period) as in run_scenarios. With an output folder
+# every scenario is written to climate_model_rcp_time_period.tif in it. The layers of every scenario of a tile are
+# held together in memory, so the tile size may have to be reduced for long lists of scenarios.
+@traced()
+def run_tiled_scenarios(region, climate_models, rcps=None, time_periods=None, water_supply_future=None,
+                        input_level='High', water_supply_2010='Total', land_types=('cropland', 'marginal'),
+                        tile_size=None, max_workers=None, output_dir=None):
+    if rcps is None:
+        rcps = all_rcps
+    if time_periods is None:
+        time_periods = all_time_periods
+    if isinstance(climate_models, str):
+        climate_models = [climate_models]
+    if tile_size is None:
+        tile_size = int(os.environ.get('BEPMAT_TILE_SIZE', 512))
+    max_workers = worker_count(max_workers)
+    if not isinstance(region, RegionGrid):
+        region = RegionGrid(region)
+
+    scenarios = [(climate_model, rcp, time_period) for climate_model in climate_models for rcp in rcps
+                 for time_period in time_periods]
+    output_paths = {scenario: None for scenario in scenarios}
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        output_paths = {scenario: os.path.join(output_dir, '_'.join(scenario) + '.tif') for scenario in scenarios}
+    return run_tiles(region, scenarios, output_paths, (water_supply_future, input_level, water_supply_2010, land_types),
+                     tile_size, max_workers)
+
+
+def run_tiles(region, scenarios, output_paths, task_args, tile_size, max_workers):
+    tiles = region_tiles(region, tile_size)
+    gathered = {}
+
+    def reduce(tile_result):
+        tile_window, scenario_results = tile_result
+        for scenario, scenario_result in zip(scenarios, scenario_results):
+            gathered[scenario].add(tile_window, scenario_result)
+
+    try:
+        for scenario in scenarios:
+            gathered[scenario] = TiledScenario(region, output_paths[scenario])
+
+        if max_workers <= 1:
+            init_scenario_worker(region)
+            for tile_window in tiles:
+                reduce(run_tile_task(tile_window, scenarios, *task_args))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=init_scenario_worker,
+                                     initargs=(region,)) as executor:
+                pending = set()
+                for tile_window in tiles:
+                    pending.add(executor.submit(run_tile_task, tile_window, scenarios, *task_args))
+                    if len(pending) >= 2 * max_workers:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            reduce(future.result())
+                for future in pending:
+                    reduce(future.result())
+    finally:
+        for tiled_scenario in gathered.values():
+            tiled_scenario.close()
+
+    return {scenario: tiled_scenario.result() for scenario, tiled_scenario in gathered.items()}
+
+
+@traced()
+def run_tiled(region, time_period, climate_model, rcp, water_supply_future, input_level, water_supply_2010='Total',
+              land_types=('cropland', 'marginal'), tile_size=None, max_workers=None, output_path=None):
+    if tile_size is None:
+        tile_size = int(os.environ.get('BEPMAT_TILE_SIZE', 512))
+    max_workers = worker_count(max_workers)
+    if not isinstance(region, RegionGrid):
+        region = RegionGrid(region)
+
+    scenario = (climate_model, rcp, time_period)
+    results = run_tiles(region, [scenario], {scenario: output_path},
+                        (water_supply_future, input_level, water_supply_2010, land_types), tile_size, max_workers)
+    return results[scenario]
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Biomass Energy Potential Mapping and Analysis Tool (BEPMAT)
+
+# ### Local HTTP service
+# A small asynchronous HTTP service answering the potential of a region under a scenario, e.g.
+#
+#     python bepmat.py serve --port 8150 --workers 4
+#     curl 'http://127.0.0.1:8150/potential?country=India&province=Goa&time_period=2011-2040&climate_model=GFDL-ESM2M&rcp=RCP2.6&water_supply_future=Irr'
+#
+# which returns the cropland, marginal land and total potential in PJ as JSON. input_level defaults to High and
+# water_supply_2010 to Total. The service only uses the standard library (asyncio) on top of bepmat_core:
+#
+# - The scenarios already in the results store (see ResultStore) are answered from its index straight away.
+# - The other scenarios are computed in a pool of worker processes. At most one computation per worker runs at a
+#   time and the others wait in a queue of at most max_queue scenarios; when it is full the service answers 503.
+# - Identical requests arriving while a scenario is queued or running share the same computation instead of
+#   starting a new one.
+# - A queued scenario is cancelled when all the clients waiting for it have disconnected, or with a DELETE request
+#   on the same URL. A scenario which is already running goes on, and its result is kept in the store.
+#
+# GET /jobs lists the queued and running scenarios. Setting the data folder (--data-dir) to catalogs pointing at a
+# local folder of rasters gives a service which works without any network access.
+
+# In[ ]:
+
+
+import os
+import json
+import time
+import signal
+import asyncio
+import logging
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import bepmat_core as core
+
+
+logger = logging.getLogger('bepmat.service')
+
+query_fields = ('country', 'province', 'time_period', 'climate_model', 'rcp', 'water_supply_future', 'input_level',
+                'water_supply_2010')
+query_defaults = {'province': None, 'input_level': 'High', 'water_supply_2010': 'Total'}
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def parse_query(params):
+    unknown = sorted(set(params) - set(query_fields))
+    if unknown:
+        raise ValueError(f"Unknown query parameters: {', '.join(unknown)}")
+
+    query = dict(query_defaults, **params)
+    missing = [field for field in query_fields if field not in query]
+    if missing:
+        raise ValueError(f"Missing query parameters: {', '.join(missing)}")
+    if query['rcp'] not in core.all_rcps:
+        raise ValueError(f"Unknown RCP {query['rcp']}, expected one of {', '.join(core.all_rcps)}")
+    if query['time_period'] not in core.all_time_periods:
+        raise ValueError(f"Unknown time period {query['time_period']}, expected one of {', '.join(core.all_time_periods)}")
+    return query
+
+
+def query_params(query, land_type):
+    task = (land_type, query['climate_model'], query['rcp'], query['time_period'])
+    return core.scenario_params(task, query['water_supply_future'], query['input_level'], query['water_supply_2010'])
+
+
+def query_region(query, grid=False):
+    shapefile = core.shapefile_generator(query['country'], query['province'])
+    if not len(shapefile):
+        raise ValueError(f"No boundaries were found for {query['province'] or query['country']}")
+    return core.RegionGrid(shapefile) if grid else core.RegionWindow(shapefile)
+
+
+def potential_response(query, cropland_pj, marginal_pj):
+    return dict(query, cropland_pj=float(cropland_pj), marginal_pj=float(marginal_pj),
+                total_pj=float(cropland_pj) + float(marginal_pj))
+
+
+# The potential of a scenario from the index of the results store, or None when it has not been computed yet
+def stored_potential(query, store):
+    region = query_region(query)
+    cropland_pj = store.net_potential(region, 'cropland', query_params(query, 'cropland'))
+    marginal_pj = store.net_potential(region, 'marginal', query_params(query, 'marginal'))
+    if cropland_pj is None or marginal_pj is None:
+        return None
+    return potential_response(query, cropland_pj, marginal_pj)
+
+
+def init_service_worker(data_dir):
+    if data_dir is not None:
+        core.set_data_dir(data_dir)
+
+
+# Run in the worker processes; the results are written to the store as they are computed
+def compute_potential(query, store_dir):
+    region = query_region(query, grid=True)
+    store = core.ResultStore(store_dir)
+    results = core.run_scenarios(region, [query['climate_model']], [query['rcp']], [query['time_period']],
+                                 query['water_supply_future'], query['input_level'], query['water_supply_2010'],
+                                 past_years=(), max_workers=1, store=store)
+
+    key = (query['climate_model'], query['rcp'], query['time_period'])
+    return potential_response(query, results['cropland'][key].attrs['net_sum in PJ'],
+                              np.nansum(results['marginal_arrays'][key]))
+
+
+class Job:
+
+    def __init__(self, key, query):
+        self.key = key
+        self.query = query
+        self.state = 'queued'
+        self.waiters = 0
+        self.created = time.time()
+        self.started = None
+        self.task = None
+
+    def describe(self):
+        return dict(self.query, state=self.state, waiters=self.waiters, created=self.created, started=self.started)
+
+
+class PotentialService:
+
+    def __init__(self, store=None, max_workers=None, max_queue=None, data_dir=None):
+        if max_workers is None:
+            max_workers = int(os.environ.get('BEPMAT_WORKERS', os.cpu_count() or 1))
+        if max_queue is None:
+            max_queue = int(os.environ.get('BEPMAT_MAX_QUEUE', 64))
+        if data_dir is not None:
+            core.set_data_dir(data_dir)
+
+        self.store = store if store is not None else core.ResultStore()
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.data_dir = data_dir
+        self.jobs = {}
+        self.executor = None
+        self._slots = None
+
+    # Any executor can be given instead of the pool of worker processes, e.g. a thread pool to compute in this process
+    def start(self, executor=None):
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_service_worker,
+                                           initargs=(self.data_dir,))
+        self.executor = executor
+        self._slots = asyncio.Semaphore(self.max_workers)
+
+    async def close(self):
+        tasks = [job.task for job in self.jobs.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def job_key(query):
+        return json.dumps(query, sort_keys=True)
+
+    def queued(self):
+        return sum(job.state == 'queued' for job in self.jobs.values())
+
+    # Only as many scenarios as there are workers are sent to the pool, so that the queued ones can still be cancelled
+    async def _run(self, job):
+        async with self._slots:
+            job.state = 'running'
+            job.started = time.time()
+            logger.info("Computing %s", job.key)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, compute_potential, job.query, self.store.store_dir)
+
+    def _forget(self, job):
+        if self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+
+    async def potential(self, query):
+        key = self.job_key(query)
+        job = self.jobs.get(key)
+        source = 'coalesced'
+
+        if job is None:
+            loop = asyncio.get_running_loop()
+            stored = await loop.run_in_executor(None, stored_potential, query, self.store)
+            if stored is not None:
+                return dict(stored, source='store')
+
+            # An identical request may have started the computation in the meantime
+            job = self.jobs.get(key)
+            if job is None:
+                if self.queued() >= self.max_queue:
+                    raise ServiceBusy(f"{self.max_queue} scenarios are already queued")
+                job = Job(key, query)
+                job.task = asyncio.ensure_future(self._run(job))
+                job.task.add_done_callback(lambda _, job=job: self._forget(job))
+                self.jobs[key] = job
+                source = 'computed'
+
+        job.waiters += 1
+        try:
+            result = await asyncio.shield(job.task)
+        except asyncio.CancelledError:
+            # The job was cancelled with a DELETE request rather than this request being cancelled
+            if job.task.cancelled() and not asyncio.current_task().cancelling():
+                raise JobCancelled("The scenario was cancelled")
+            raise
+        finally:
+            job.waiters -= 1
+            if job.waiters == 0 and job.state == 'queued':
+                job.task.cancel()
+
+        return dict(result, source=source)
+
+    # Cancelling a queued scenario; a running one cannot be stopped
+    def cancel(self, query):
+        job = self.jobs.get(self.job_key(query))
+        if job is None:
+            return HTTPStatus.NOT_FOUND, {'error': 'The scenario is not queued'}
+        if job.state != 'queued':
+            return HTTPStatus.CONFLICT, {'error': 'The scenario is already running'}
+        job.task.cancel()
+        return HTTPStatus.OK, dict(query, state='cancelled')
+
+    def status(self):
+        return HTTPStatus.OK, {'workers': self.max_workers, 'max_queue': self.max_queue,
+                               'jobs': [job.describe() for job in self.jobs.values()]}
+
+    async def respond(self, method, target, reader):
+        url = urlsplit(target)
+        if url.path == '/jobs':
+            if method != 'GET':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"{method} is not allowed on /jobs"}
+            return self.status()
+        if url.path != '/potential':
+            return HTTPStatus.NOT_FOUND, {'error': f"Unknown path {url.path}"}
+
+        try:
+            query = parse_query(dict(parse_qsl(url.query)))
+        except ValueError as error:
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+
+        if method == 'DELETE':
+            return self.cancel(query)
+        if method != 'GET':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"{method} is not allowed on /potential"}
+
+        # Waiting for the result while watching for the client closing the connection
+        request = asyncio.ensure_future(self.potential(query))
+        while True:
+            closed = asyncio.ensure_future(reader.read(1024))
+            await asyncio.wait((request, closed), return_when=asyncio.FIRST_COMPLETED)
+            if request.done():
+                closed.cancel()
+                break
+            if closed.result() == b'':
+                request.cancel()
+                await asyncio.gather(request, return_exceptions=True)
+                return None
+
+        try:
+            return HTTPStatus.OK, request.result()
+        except ServiceBusy as error:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': str(error)}
+        except JobCancelled as error:
+            return HTTPStatus.CONFLICT, {'error': str(error)}
+        except (ValueError, KeyError) as error:
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+        except Exception as error:
+            logger.exception("Failed to compute %s", query)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(error).__name__}: {error}"}
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            if len(request_line) != 3:
+                response = HTTPStatus.BAD_REQUEST, {'error': 'Malformed request'}
+            else:
+                response = await self.respond(request_line[0], request_line[1], reader)
+
+            if response is not None:
+                status, body = response
+                payload = json.dumps(body).encode()
+                head = (f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\nConnection: close\r\n")
+                if status == HTTPStatus.SERVICE_UNAVAILABLE:
+                    head += "Retry-After: 30\r\n"
+                writer.write(head.encode() + b"\r\n" + payload)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8150, store=None, max_workers=None, max_queue=None, data_dir=None):
+    service = PotentialService(store, max_workers, max_queue, data_dir)
+    service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    logger.info("Serving on http://%s:%s with %s workers", host, port, service.max_workers)
+
+    # Stopping on SIGTERM as on Ctrl+C so that the worker processes are shut down with the service
+    loop = asyncio.get_running_loop()
+    serving = asyncio.ensure_future(server.serve_forever())
+    try:
+        loop.add_signal_handler(signal.SIGTERM, serving.cancel)
+    except NotImplementedError:
+        pass
+
+    try:
+        async with server:
+            await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await service.close()
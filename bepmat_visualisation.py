@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Biomass Energy Potential Mapping and Analysis Tool (BEPMAT)
+
+# ### Visualisation
+# The plotting functions of the tool, kept apart from the computational core in bepmat_core so that the plotting
+# libraries are only imported when the figures are needed.
+
+# In[ ]:
+
+
+import numpy as np
+import geopandas as gpd
+import matplotlib.pyplot as plt
+
+from rasterio.plot import show
+from rasterio.transform import Affine
+from rasterio.io import MemoryFile
+
+# Importing required libraries for plotting interactive rasters 
+from bokeh.plotting import figure
+from bokeh.plotting import show as bokeh_show
+from bokeh.models import LinearColorMapper, ColorBar, HoverTool, GeoJSONDataSource
+import bokeh.palettes as bp
+import bokeh.plotting as bpl
+import matplotlib.patches as mpatches
+import plotly
+import plotly.graph_objects as go
+import plotly.io as pio
+import seaborn as sns
+from bokeh.palettes import magma , Blues8 , plasma
+
+from bepmat_core import open_raster, catalog, array_to_inmemory_raster_for_clipped, run_scenarios
+
+
+# ### Functions to visualize the raster with pixel values shown & to display the crop selected int eh case of marginal lands
+
+# In[32]:
+
+
+# Assuming the rest of your code remains the same
+def bokeh_plot(shapefile, array ):
+    
+    with open_raster(catalog.reference_raster) as src:
+            standard_transform = src.transform 
+            standard_crs= src.crs
+    # Convert the GeoDataFrame to GeoJSONDataSource
+    
+    test = array_to_inmemory_raster_for_clipped(array, standard_transform,standard_crs,shapefile)
+    
+    geojson = gpd.GeoSeries(shapefile.geometry).to_json()
+    geojson_data = GeoJSONDataSource(geojson=geojson)
+
+    # Read the raster data using rasterio.open
+    raster_path = test
+    src = open_raster(raster_path)
+
+    # Read the raster data into a NumPy array
+    data = src.read(1)
+
+    # Flip the raster data along the y-axis to align with Bokeh's coordinate system
+    data = np.flipud(data)
+
+    # Calculate the minimum and maximum x and y coordinates
+    min_x, min_y, max_x, max_y = src.bounds
+
+    # Calculate the minimum and maximum values for the color mapper using the 'combined' array
+    combined_min = array.min().item()
+    combined_max = array.max().item()
+
+    # Create a new color mapper for the raster data
+    mapper = LinearColorMapper(palette=bp.Blues8, low=combined_min, high=combined_max)
+
+
+    # Create a Bokeh figure
+    p = figure(width=600, height=600, x_axis_label='Longitude', y_axis_label='Latitude', title='Interactive Raster')
+
+    # Add the raster image to the figure using the 'image' glyph
+    p.image(image=[data], x=min_x, y=min_y, dw=(max_x - min_x), dh= (max_y - min_y), color_mapper=mapper)
+
+    # Add color bar to the plot
+    color_bar = ColorBar(color_mapper=mapper, location=(0, 0))
+    p.add_layout(color_bar, 'right')
+
+# Add the boundary of Spain to the plot as a polygon
+    p.patches('xs', 'ys', source=geojson_data, line_color='black', fill_alpha=0)
+
+    # Add hover tool to display the pixel value when hovering over the raster
+    hover = HoverTool(tooltips=[('Value', '@image')], mode='mouse')
+    p.add_tools(hover)
+
+    # Show the plot
+    bpl.show(p)
+
+
+# In[33]:
+
+
+def bokeh_max_min_plot(shapefile, array):
+    with open_raster(catalog.reference_raster) as src:
+            standard_transform = src.transform 
+            standard_crs= src.crs
+
+    test = array_to_inmemory_raster_for_clipped(array, standard_transform, standard_crs, shapefile)
+    geojson = gpd.GeoSeries(shapefile.geometry).to_json()
+    geojson_data = GeoJSONDataSource(geojson=geojson)
+
+    src = open_raster(test)
+    data = src.read(1)
+    data = np.flipud(data)
+
+    min_x, min_y, max_x, max_y = src.bounds
+
+    # Ignore 0 as the minimum value and take the next higher value
+    # Filter the array to include only non-zero values, then find the minimum
+    non_zero_array = array[array > 0]
+    combined_min = non_zero_array.min().item() if non_zero_array.size > 0 else array.min().item()
+    combined_max = array.max().item()
+
+    palette = plasma(256)  # Using the Magma palette, or choose another
+
+    mapper = LinearColorMapper(palette=palette, low=combined_min, high=combined_max)
+
+    p = figure(width=600, height=600, x_axis_label='Longitude', y_axis_label='Latitude', title='Interactive Raster')
+    p.image(image=[data], x=min_x, y=min_y, dw=(max_x - min_x), dh=(max_y - min_y), color_mapper=mapper)
+
+    color_bar = ColorBar(color_mapper=mapper, location=(0, 0))
+    p.add_layout(color_bar, 'right')
+
+    p.patches('xs', 'ys', source=geojson_data, line_color='black', fill_alpha=0)
+
+    hover = HoverTool(tooltips=[('Value', '@image')], mode='mouse')
+    p.add_tools(hover)
+
+    bpl.show(p)
+
+
+# In[30]:
+
+
+# The max_crops layer stores the index of the crop in the crop_names lookup of the dataset (-1 for no crop), so
+# both have to be passed, e.g. crop_show(ds['max_crops'].values, shapefile, ds['crop_names'].values). Arrays of
+# crop names, as stored in the older NetCDF files, can be passed without crop_names.
+
+def crop_show(crop_array,shapefile, crop_names=None):
+    
+    crop_array = np.asarray(crop_array)
+    crops_present, color_index = np.unique(crop_array, return_inverse=True)
+    color_index = color_index.reshape(crop_array.shape).astype('int16')
+    if crop_names is not None:
+        crops_present = ['None' if i < 0 else str(crop_names[i]) for i in crops_present]
+    crop_indices = {crop: i for i, crop in enumerate(crops_present)}
+     # Define colormap with an additional color for 'None'
+    cmap = plt.get_cmap('tab20b', len(crop_indices))
+    
+    with open_raster(catalog.reference_raster) as src:
+        standard_transform = src.transform 
+        standard_crs= src.crs
+    
+    # Get the pixel size from the standard_transform
+    pixel_size_x = standard_transform.a
+    pixel_size_y = standard_transform.e
+    
+    graph_bounds = shapefile.bounds
+    
+    # Get the boundary values from the shapefile
+    xmin = graph_bounds['minx'].min()
+    xmax = graph_bounds['maxx'].max()
+    ymin = graph_bounds['miny'].min()
+    ymax = graph_bounds['maxy'].max()
+    
+    # Calculate the number of rows and columns in the raster
+    rows, cols = color_index.shape
+    
+    # Create the transformation matrix for the raster
+    transform = Affine(pixel_size_x, 0, xmin,
+                       0, pixel_size_y, ymax)
+    
+    # Create a memory file to store the raster
+    with MemoryFile() as memfile:
+        # Create a new raster dataset
+        with memfile.open(driver='GTiff', height=rows, width=cols, count=1,
+                          dtype=color_index.dtype, crs=standard_crs,
+                          transform=transform) as dataset:
+            # Write the color_index array to the raster dataset
+            dataset.write(color_index, 1)
+    
+            # Plot setup
+            fig, ax = plt.subplots()
+    
+            # Plot the raster with shapefile boundaries
+            show((dataset, 1), ax=ax, cmap=cmap, vmin=0, vmax=len(crop_indices)-1)
+    
+            # Plot the shapefile boundary
+            shapefile.plot(ax=ax, facecolor='none', edgecolor='black')
+            
+            legend_patches = [mpatches.Patch(color=cmap(i), label=crop) for crop, i in crop_indices.items()]
+            plt.legend(handles=legend_patches, bbox_to_anchor=(1.05, 1), loc='upper left', borderaxespad=0.)
+    
+            plt.title("Marginal Crop Distribution Across The Selected Region")
+            plt.show()
+
+
+# ### These are the final visualisation functions which output the net raw biomass energy potential from the marginal and the cropland respectively and show them with an interactive plotly graph.
+# The scenarios are computed in the current process unless max_workers (or the BEPMAT_WORKERS environment variable)
+# asks for a pool of worker processes, see run_scenarios.
+
+# In[3]:
+
+
+def graph_plotter_cropland(shapefile, climate_model, water_supply_future, input_level, max_workers=None):
+    time_periods = ['2000', '2010', '2011-2040', '2041-2070', '2071-2100']
+    RCPs = ['RCP2.6', 'RCP4.5', 'RCP6.0', 'RCP8.5']
+    
+    # Colors from the Google logo: Blue, Red, Yellow, Blue-Green
+    colors = ['#4285F4', '#DB4437', '#F4B400', '#0F9D58']
+
+    fig = go.Figure()
+    
+    # Dictionary of the xarray for each RCP and time period
+    xarrays = run_scenarios(shapefile, climate_model, RCPs, time_periods[2:], water_supply_future, input_level,
+                            'Total', land_types=('cropland',), max_workers=max_workers)['cropland']
+
+    initial_potential_1 = xarrays['2000'].attrs['Net Potential in PetaJ']
+    initial_potential_2 = xarrays['2010'].attrs['Net Potential in PetaJ']
+
+    # Add traces for 2000 and 2010 with different colors
+    fig.add_trace(go.Bar(x=['2000'], y=[initial_potential_1], name='2000', marker_color='#000000'))
+    fig.add_trace(go.Bar(x=['2010'], y=[initial_potential_2], name='2010', marker_color='#808080'))
+
+    for i, RCP in enumerate(RCPs):
+        biomass_potentials = [xarrays[(RCP, time_period)].attrs['net_sum in PJ'] for time_period in time_periods[2:]]
+
+        # Assign the corresponding color from the Google logo to each time period
+        color = colors[i % len(colors)]
+
+        fig.add_trace(go.Bar(x=time_periods[2:], y=biomass_potentials, name=RCP, marker_color=color))
+
+    fig.update_layout(
+        barmode='group',
+        xaxis_title='Years',
+        yaxis_title='Biomass Energy Potential from Cropland Land <br> in PetaJoules',
+        title='Cropland Biomass Energy Potential from different RCPs'
+    )
+    
+    fig.show()
+
+    return fig, xarrays
+
+
+# In[2]:
+
+
+def graph_plotter_marginal(shapefile, climate_model, water_supply_future, input_level, max_workers=None):
+    time_periods = ['2011-2040', '2041-2070', '2071-2100']
+    RCPs = ['RCP2.6', 'RCP4.5', 'RCP6.0', 'RCP8.5']
+
+    fig = go.Figure()
+
+    results = run_scenarios(shapefile, climate_model, RCPs, time_periods, water_supply_future, input_level,
+                            land_types=('marginal',), max_workers=max_workers)
+    xarrays = results['marginal']  # Dictionary to store the xarray for each RCP and time period
+    final_potentials = results['marginal_arrays']  # Dictionary to store the final potential array for each RCP
+
+    for i, RCP in enumerate(RCPs):
+        biomass_potentials = [np.nansum(final_potentials[(RCP, time_period)]) for time_period in time_periods]
+
+        fig.add_trace(go.Bar(x=time_periods, y=biomass_potentials, name=RCP))
+
+    fig.update_layout(
+        barmode='group',
+        xaxis_title='Time Periods',
+        yaxis_title='Biomass Energy Potential from Marginal Land <br> in PetaJoules',
+        title='Marginal Land Biomass Energy Potential from different RCPs in Time Periods'
+    )
+    
+    fig.show()
+
+    return fig, xarrays, final_potentials
+
+
+# In[1]:
+
+
+def graph_plotter_all(shapefile, climate_model, water_supply_future, input_level, water_supply_2010, max_workers=None):
+    time_periods = ['2011-2040','2041-2070', '2071-2100']
+    RCPs = ['RCP2.6', 'RCP4.5', 'RCP6.0', 'RCP8.5']
+    colors = ['#4285F4', '#DB4437', '#F4B400', '#0F9D58']
+    
+    fig_crop = go.Figure()
+    fig_marg = go.Figure()
+    fig_total = go.Figure()
+    
+    results = run_scenarios(shapefile, climate_model, RCPs, time_periods, water_supply_future, input_level,
+                            water_supply_2010, max_workers=max_workers)
+    
+    # For cropland 
+    
+    xarrays_crop = results['cropland']
+
+    initial_potential_1 = xarrays_crop['2000'].attrs['Net Potential in PetaJ']
+    initial_potential_2 = xarrays_crop['2010'].attrs['Net Potential in PetaJ']
+
+    # Add traces for 2000 and 2010 with different colors
+    fig_crop.add_trace(go.Bar(x=['2000'], y=[initial_potential_1], name='2000', marker_color='#000000'))
+    fig_crop.add_trace(go.Bar(x=['2010'], y=[initial_potential_2], name='2010', marker_color='#808080'))
+
+    # For marginal land
+    
+    xarrays_marg = results['marginal']  # Dictionary to store the xarray for each RCP and time period
+    final_potentials_marg = results['marginal_arrays']  # Dictionary to store the final potential array for each RCP
+    
+    # For total land 
+    
+    arrays_total = {key: total.attrs['final_energy_array'] for key, total in results['total'].items()}
+
+    for i, RCP in enumerate(RCPs):
+        keys = [(RCP, time_period) for time_period in time_periods]
+
+        biomass_potentials_crop = [xarrays_crop[key].attrs['net_sum in PJ'] for key in keys]
+        biomass_potentials_marg = [np.nansum(final_potentials_marg[key]) for key in keys]
+        biomass_potentials_total = [results['total'][key].attrs['net_energy_potential'] for key in keys]
+
+        # Assign the corresponding color from the Google logo to each time period
+        color = colors[i % len(colors)]
+        fig_crop.add_trace(go.Bar(x=time_periods, y=biomass_potentials_crop, name=RCP, marker_color=color))
+        fig_marg.add_trace(go.Bar(x=time_periods, y=biomass_potentials_marg, name=RCP))
+        fig_total.add_trace(go.Bar(x=time_periods, y=biomass_potentials_total, name=RCP))
+
+    fig_total.update_layout(
+        barmode='group',
+        xaxis_title='Time Periods',
+        yaxis_title='Biomass Energy Potential from Total Land <br> in PetaJoules',
+        title='Total Biomass Energy Potential from different RCPs in Time Periods'
+    )
+
+    fig_crop.update_layout(
+        barmode='group',
+        xaxis_title='Years',
+        yaxis_title='Biomass Energy Potential from Cropland Land <br> in PetaJoules',
+        title='Cropland Biomass Energy Potential from different RCPs'
+    )
+    
+    fig_marg.update_layout(
+        barmode='group',
+        xaxis_title='Time Periods',
+        yaxis_title='Biomass Energy Potential from Marginal Land <br> in PetaJoules',
+        title='Marginal Land Biomass Energy Potential from different RCPs in Time Periods'
+    )
+    
+    fig_crop.show()
+    fig_marg.show()
+    fig_total.show()
+
+    
+    return fig_crop, fig_marg , fig_total , xarrays_marg , xarrays_crop , final_potentials_marg , arrays_total
+
+
+# In[ ]:
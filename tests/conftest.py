@@ -0,0 +1,56 @@
+"""Fixtures shared by the tests.
+
+The tests needing rasters run offline on a small dataset made by the generator of the benchmarks
+(benchmarks/synthetic.py), once per session, and on an irregular region inside it so that the border pixels of the
+region are exercised.
+"""
+
+import os
+import sys
+
+import pytest
+import geopandas as gpd
+from shapely.geometry import Polygon
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bepmat_core as core
+
+
+dataset_bounds = (20.0, -4.0, 26.0, 2.0)
+climate_models = ('GFDL-ESM2M', 'HadGEM2-ES')
+
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    synthetic = pytest.importorskip('benchmarks.synthetic')
+    path = str(tmp_path_factory.mktemp('dataset'))
+    synthetic.generate_dataset(path, bounds=dataset_bounds, climate_models=climate_models, rcps=('RCP2.6', 'RCP4.5'),
+                               time_periods=('2041-2070',), input_levels=('High', 'Low'))
+    return path
+
+
+@pytest.fixture
+def synthetic_data(data_dir, monkeypatch):
+    previous = core.data_dir
+    core.set_data_dir(data_dir)
+    monkeypatch.setattr(core, 'result_store', None)
+    yield data_dir
+    core.set_data_dir(previous)
+
+
+@pytest.fixture
+def scenario():
+    return {'time_period': '2041-2070', 'climate_model': 'GFDL-ESM2M', 'rcp': 'RCP4.5', 'water_supply_future': 'Irr',
+            'input_level': 'High', 'water_supply_2010': 'Total'}
+
+
+@pytest.fixture
+def shapefile(synthetic_data):
+    polygon = Polygon([(20.6, -3.3), (25.1, -2.7), (24.4, 1.3), (21.2, 0.9)])
+    return gpd.GeoDataFrame({'NAME_0': ['Test']}, geometry=[polygon], crs='EPSG:4326')
+
+
+@pytest.fixture
+def region(shapefile):
+    return core.RegionGrid(shapefile)
@@ -0,0 +1,95 @@
+"""block_mode and block_reduce against a loop over the blocks, on the 30 arc-second layers of the synthetic dataset."""
+
+import os
+
+import numpy as np
+import pytest
+import rasterio
+
+import bepmat_core as core
+
+
+factor = 10
+
+
+def read_layer(data_dir, name, size=200):
+    with rasterio.open(os.path.join(data_dir, 'rasters', name + '.tif')) as src:
+        return src.read(1)[:size + 3, :size + 7]
+
+
+# The most frequent value of every block, the smallest one on ties, as np.unique returns the values sorted
+def reference_reduce(data, factor, method, valid=None, above=None, fill=0):
+    rows, cols = data.shape[0] // factor, data.shape[1] // factor
+    reduced = np.full((rows, cols), fill, dtype=data.dtype if method == 'mode' else 'float32')
+    for row in range(rows):
+        for col in range(cols):
+            block = (slice(row * factor, (row + 1) * factor), slice(col * factor, (col + 1) * factor))
+            values = data[block] if valid is None else data[block][valid[block]]
+            if method == 'mode':
+                if values.size:
+                    classes, counts = np.unique(values, return_counts=True)
+                    reduced[row, col] = classes[counts.argmax()]
+                continue
+            count = factor * factor if valid is None else values.size
+            if count == 0:
+                continue
+            if method == 'mean':
+                reduced[row, col] = values.sum(dtype='float64') / count
+            else:
+                reduced[row, col] = (values > above).sum() / count
+    return reduced
+
+
+def test_block_mode_of_aez_classes(data_dir):
+    classes = read_layer(data_dir, 'aez_RCP4.5_2041-2070')
+    expected = reference_reduce(classes, factor, 'mode')
+
+    reduced = core.block_mode(classes, factor)
+    assert reduced.dtype == classes.dtype
+    np.testing.assert_array_equal(reduced, expected)
+
+    # The lexsort path used for the classes which do not fit a bincount gives the same modes
+    np.testing.assert_array_equal(core.block_mode(classes.astype('float32'), factor), expected)
+
+
+def test_block_mode_ties_pick_the_smallest_class():
+    data = np.array([[3, 3, 1, 1],
+                     [5, 5, 2, 2],
+                     [7, 7, 7, 9],
+                     [9, 9, 9, 7]], dtype='int32')
+    np.testing.assert_array_equal(core.block_mode(data, 2), [[3, 1], [7, 7]])
+    np.testing.assert_array_equal(core.block_mode(data.astype('float64'), 2), [[3, 1], [7, 7]])
+
+
+def test_block_mode_with_valid_pixels(data_dir):
+    classes = read_layer(data_dir, 'aez_RCP4.5_2041-2070')
+    valid = read_layer(data_dir, 'GLCSv11_04_5m') < 60
+    # A block without any valid pixel
+    valid[:factor, :factor] = False
+    expected = reference_reduce(classes, factor, 'mode', valid)
+
+    np.testing.assert_array_equal(core.block_reduce(classes, factor, 'mode', valid), expected)
+    np.testing.assert_array_equal(core.block_reduce(classes.astype('float32'), factor, 'mode', valid), expected)
+
+
+@pytest.mark.parametrize('with_valid', [False, True])
+def test_block_mean_and_fraction_above(data_dir, with_valid):
+    tree_cover = read_layer(data_dir, 'GLCSv11_04_5m')
+    valid = None
+    if with_valid:
+        valid = read_layer(data_dir, 'exclusion_2017') < 6
+        valid[-2 * factor:, :factor] = False
+
+    for method, above in (('mean', None), ('fraction_above', 50)):
+        expected = reference_reduce(tree_cover, factor, method, valid, above, fill=-1)
+        reduced = core.block_reduce(tree_cover, factor, method, valid, above, fill=-1)
+        assert reduced.dtype == np.float32
+        np.testing.assert_allclose(reduced, expected, rtol=1e-6)
+
+
+def test_block_reduce_errors():
+    data = np.zeros((4, 4), dtype='uint8')
+    with pytest.raises(ValueError):
+        core.block_reduce(data, 2, 'fraction_above')
+    with pytest.raises(ValueError):
+        core.block_reduce(data, 2, 'median')
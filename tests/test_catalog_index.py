@@ -0,0 +1,68 @@
+"""CatalogIndex.select against the filtering of the catalog DataFrames it replaced."""
+
+import pytest
+
+import bepmat_core as core
+
+
+def filtered_urls(table, crops, **columns):
+    selected = table
+    for column, value in columns.items():
+        selected = selected[selected[column] == value]
+    return {crop: selected[selected['Crop'] == crop]['Download URL'].values[0].strip()
+            for crop in crops if (selected['Crop'] == crop).any()}
+
+
+@pytest.mark.parametrize('rcp', ['RCP2.6', 'RCP4.5'])
+def test_potential_yield_select(synthetic_data, rcp):
+    table = core.potential_yield
+    crops = core.catalog.crops('potential_yield')
+    assert list(crops) == list(table['Crop'].unique())
+
+    selected = core.catalog.select('potential_yield', crops, time_period='2041-2070', climate_model='GFDL-ESM2M',
+                                   rcp=rcp, water_supply='Irr', input_level='High')
+    expected = filtered_urls(table, crops, **{'Time Period': '2041-2070', 'Climate Model': 'GFDL-ESM2M', 'RCP': rcp,
+                                              'Water Supply': 'Irr', 'Input Level': 'High'})
+    assert selected == expected
+    assert len(set(selected.values())) == len(crops)
+
+
+# The years of the harvested area and production catalogs are integers, and can be given as strings
+@pytest.mark.parametrize('theme', ['harvested_area', 'production_values'])
+@pytest.mark.parametrize('time_period', [2000, 2010, '2010'])
+def test_actual_yield_select(synthetic_data, theme, time_period):
+    table = getattr(core, theme)
+    crops = core.catalog.crops(theme)
+
+    selected = core.catalog.select(theme, crops, time_period=time_period, water_supply='Total')
+    expected = filtered_urls(table, crops, **{'Time Period': int(time_period), 'Water Supply': 'Total'})
+    assert selected == expected
+    assert core.catalog.select(theme, time_period=time_period, water_supply='Total') == expected
+
+
+def test_select_without_crops_skips_missing_ones(synthetic_data):
+    assert core.catalog.select('potential_yield', time_period='2071-2100', climate_model='GFDL-ESM2M', rcp='RCP4.5',
+                               water_supply='Irr', input_level='High') == {}
+
+    selected = core.catalog.select('potential_yield', ['Maize', 'Wheat'], time_period='2041-2070',
+                                   climate_model='GFDL-ESM2M', rcp='RCP4.5', water_supply='Irr', input_level='High')
+    assert list(selected) == ['Maize', 'Wheat']
+
+
+def test_select_with_missing_crops_raises(synthetic_data):
+    with pytest.raises(ValueError, match='Rain'):
+        core.catalog.select('potential_yield', ['Maize'], time_period='2041-2070', climate_model='GFDL-ESM2M',
+                            rcp='RCP4.5', water_supply='Rain', input_level='High')
+    with pytest.raises(ValueError, match='Coffee'):
+        core.catalog.select('production_values', ['Maize', 'Coffee'], time_period=2010, water_supply='Total')
+
+
+def test_set_data_dir_clears_the_index(tmp_path, synthetic_data):
+    for theme in ('potential_yield', 'harvested_area', 'production_values'):
+        table = getattr(core, theme)
+        table[table['Crop'] != 'Wheat'].to_csv(tmp_path / core.catalog_files[theme], index=False)
+
+    core.set_data_dir(str(tmp_path))
+    assert 'Wheat' not in core.catalog.crops('production_values')
+    core.set_data_dir(synthetic_data)
+    assert 'Wheat' in core.catalog.crops('production_values')
@@ -0,0 +1,107 @@
+"""The bepmat command line."""
+
+import os
+import json
+
+import pytest
+
+import bepmat
+import bepmat_core as core
+
+
+# The sweep itself, which test_run_summary wraps to see how it is called
+run_scenarios = core.run_scenarios
+
+
+class RecordingCache:
+
+    cache_dir = 'cache'
+
+    def __init__(self):
+        self.resolved = []
+
+    def resolve(self, url):
+        self.resolved.append(url)
+        return url
+
+
+# The catalogs of the synthetic dataset with their rasters given as URLs, as in the GAEZ catalogs
+@pytest.fixture
+def remote_data_dir(tmp_path, synthetic_data):
+    for theme, file_name in core.catalog_files.items():
+        table = core.load_catalog_table(theme)
+        table['Download URL'] = 'https://example.org/' + table['Download URL'].str.strip().map(os.path.basename)
+        table.to_csv(tmp_path / file_name, index=False)
+    return str(tmp_path)
+
+
+def test_prefetch_command(remote_data_dir, monkeypatch):
+    cache = RecordingCache()
+    monkeypatch.setattr(core, 'get_raster_cache', lambda: cache)
+
+    assert bepmat.main(['prefetch', '--data-dir', remote_data_dir, '--themes', 'potential_yield', 'harvested_area',
+                        '--climate-model', 'GFDL-ESM2M', '--rcp', 'RCP4.5', '--time-period', '2041-2070', '2010', '--input-level', 'High']) == 0
+
+    potential_yields = [url for url in cache.resolved if '/yld_' in url]
+    harvested_areas = [url for url in cache.resolved if url.endswith('_har.tif')]
+    assert len(potential_yields) == 23
+    assert all('_GFDL-ESM2M_RCP4.5_2041-2070_Irr_High' in url for url in potential_yields)
+    # The harvested area catalog has no RCP or climate model, and its years are integers
+    assert len(harvested_areas) == 27
+    assert all(url.endswith('_2010_har.tif') for url in harvested_areas)
+    assert len(cache.resolved) == len(set(cache.resolved)) == 50
+
+
+# The rasters which are already local files are not fetched
+def test_prefetch_skips_local_rasters(synthetic_data, monkeypatch):
+    cache = RecordingCache()
+    monkeypatch.setattr(core, 'get_raster_cache', lambda: cache)
+    assert core.prefetch_rasters(['potential_yield'], RCP='RCP4.5') == []
+    assert cache.resolved == []
+
+
+@pytest.fixture
+def manifest(synthetic_data, shapefile, scenario, tmp_path):
+    manifest_dir = tmp_path / 'manifests'
+    manifest_dir.mkdir()
+    shapefile.to_file(manifest_dir / 'test.gpkg')
+    manifest = {'regions': [{'file': 'test.gpkg', 'name': 'Test'}], 'climate_models': [scenario['climate_model']],
+                'rcps': [scenario['rcp']], 'time_periods': [scenario['time_period']], 'water_supply': ['Irr'],
+                'input_levels': ['High', 'Low'], 'output': 'results'}
+    path = manifest_dir / 'sweep.json'
+    path.write_text(json.dumps(manifest))
+    return path
+
+
+# The past cropland is summarised once per region, whatever the number of future water supplies and input levels
+def test_run_summary(manifest, monkeypatch):
+    workers = []
+
+    def recording_run_scenarios(*args, **kwargs):
+        workers.append(kwargs['max_workers'])
+        return run_scenarios(*args, **kwargs)
+
+    monkeypatch.delenv('BEPMAT_WORKERS', raising=False)
+    monkeypatch.setattr(core, 'run_scenarios', recording_run_scenarios)
+    summary = bepmat.run_manifest(str(manifest))
+
+    assert workers == [1, 1]
+    assert os.path.exists(manifest.parent / 'results' / 'summary.csv')
+    past = summary[summary['land_type'] == 'past_cropland']
+    assert sorted(past['time_period']) == ['2000', '2010']
+    assert past['water_supply_future'].isna().all() and past['input_level'].isna().all()
+    assert not summary.duplicated(['climate_model', 'rcp', 'time_period', 'water_supply_future', 'input_level',
+                                   'land_type']).any()
+    for input_level in ('High', 'Low'):
+        assert set(summary.loc[summary['input_level'] == input_level, 'land_type']) == {'cropland', 'marginal', 'total'}
+
+
+# An output given on the command line is relative to the working directory, not to the manifest
+def test_run_output_from_the_command_line(manifest, tmp_path, monkeypatch):
+    work_dir = tmp_path / 'work'
+    work_dir.mkdir()
+    monkeypatch.chdir(work_dir)
+
+    assert bepmat.main(['run', str(manifest), '--output', 'results']) == 0
+    assert os.path.exists(work_dir / 'results' / 'summary.csv')
+    assert not os.path.exists(manifest.parent / 'results')
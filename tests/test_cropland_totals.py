@@ -0,0 +1,76 @@
+"""Scalar cropland helpers and crop-filtered engines, against the sums of the per pixel Datasets."""
+
+import numpy as np
+import pytest
+
+import bepmat_core as core
+
+
+@pytest.fixture
+def future_args(scenario, shapefile):
+    return (scenario['time_period'], scenario['climate_model'], scenario['rcp'], scenario['water_supply_future'],
+            scenario['input_level'], shapefile, scenario['water_supply_2010'])
+
+
+@pytest.mark.parametrize('time_period', [2000, 2010])
+def test_past_totals_match_the_dataset(shapefile, region, time_period):
+    dataset = core.biomass_potential_past(shapefile, time_period, 'Total', region)
+    totals = core.biomass_potential_past_totals(shapefile, time_period, 'Total', region)
+
+    assert list(totals.index) == [name for name in dataset.data_vars if name != 'Combined']
+    for crop, total in totals.items():
+        assert total == pytest.approx(np.nansum(dataset[crop].values), rel=1e-5)
+    assert totals.sum() == pytest.approx(np.nansum(dataset['Combined'].values), rel=1e-5)
+    assert totals.sum() == pytest.approx(dataset.attrs['Net Potential in PetaJ'], rel=1e-6)
+
+    assert core.get_actual_data_biomass_potential_all(shapefile, time_period, 'Total', region) == pytest.approx(
+        dataset.attrs['Net Potential in PetaJ'], rel=1e-6)
+    for crop in ('Maize', 'Wheat'):
+        assert core.get_actual_data_biomass_potential_crop(shapefile, time_period, 'Total', crop, region) == \
+            pytest.approx(np.nansum(dataset[crop].values), rel=1e-5)
+
+
+def test_future_totals_match_the_dataset(future_args, region):
+    dataset = core.future_potential_cropland(*future_args, region)
+    totals = core.future_potential_cropland_totals(*future_args, region)
+
+    for crop, total in totals.items():
+        assert total == pytest.approx(np.nansum(dataset[crop].values), rel=1e-5)
+    assert totals.sum() == pytest.approx(dataset.attrs['net_sum in PJ'], rel=1e-6)
+
+    assert core.future_residues_all(*future_args, region) == pytest.approx(dataset.attrs['net_sum in PJ'], rel=1e-6)
+    assert core.future_residues_crop('Maize', *future_args, region) == pytest.approx(
+        np.nansum(dataset['Maize'].values), rel=1e-5)
+
+
+# Asking for some crops gives the same values as the full run
+def test_crop_filtered_engines(shapefile, region, future_args):
+    crops = ['Maize', 'Wheat']
+    full_past = core.biomass_potential_past(shapefile, 2010, 'Total', region)
+    full_future = core.future_potential_cropland(*future_args, region)
+
+    past = core.biomass_potential_past(shapefile, 2010, 'Total', region, crops=crops)
+    future = core.future_potential_cropland(*future_args, region, crops=crops)
+    assert [name for name in past.data_vars if name != 'Combined'] == crops
+    for crop in crops:
+        np.testing.assert_allclose(past[crop].values, full_past[crop].values)
+        np.testing.assert_allclose(future[crop].values, full_future[crop].values)
+    assert past.attrs['Net Potential in PetaJ'] == pytest.approx(
+        sum(full_past[crop].attrs['sum_production'] for crop in crops))
+
+    with pytest.raises(ValueError):
+        core.biomass_potential_past_totals(shapefile, 2010, 'Total', region, crops=['Coffee'])
+
+
+# Only the rasters of the selected crops are opened, the grid of the region being read from one of them
+def test_crop_filtered_engines_only_open_their_rasters(shapefile, monkeypatch):
+    opened = []
+    open_raster = core.open_raster
+
+    def counting_open_raster(raster_path):
+        opened.append(raster_path)
+        return open_raster(raster_path)
+
+    monkeypatch.setattr(core, 'open_raster', counting_open_raster)
+    core.biomass_potential_past(shapefile, 2010, 'Total', core.RegionGrid(shapefile), crops=['Maize', 'Wheat'])
+    assert 0 < len(opened) <= 3
@@ -0,0 +1,64 @@
+"""RunningStats against NumPy, and ensemble_potential against the climate models run on their own."""
+
+import numpy as np
+import pytest
+import rasterio
+
+import bepmat_core as core
+
+
+def test_running_stats_match_numpy(synthetic_data):
+    # The potential yields of the crops of the synthetic dataset, as the values of successive models
+    values = []
+    for url in core.potential_yield['Download URL'].str.strip()[:12]:
+        with rasterio.open(url) as src:
+            values.append(np.where(src.read_masks(1) > 0, src.read(1), 0).astype('float64'))
+    values = np.stack(values)
+
+    stats = core.RunningStats(values.shape[1:])
+    for layer in values:
+        stats.add(layer)
+
+    assert stats.count == len(values)
+    np.testing.assert_allclose(stats.mean, values.mean(axis=0), rtol=1e-10)
+    np.testing.assert_allclose(stats.std, values.std(axis=0), rtol=1e-7, atol=1e-7)
+    np.testing.assert_array_equal(stats.min, values.min(axis=0))
+    np.testing.assert_array_equal(stats.max, values.max(axis=0))
+
+
+def test_running_stats_of_a_single_model():
+    stats = core.RunningStats((2, 3))
+    values = np.arange(6, dtype='float64').reshape(2, 3)
+    stats.add(values)
+    np.testing.assert_array_equal(stats.mean, values)
+    np.testing.assert_array_equal(stats.std, np.zeros((2, 3)))
+
+
+def test_ensemble_matches_the_models_on_their_own(scenario, shapefile, region):
+    climate_models = ['GFDL-ESM2M', 'HadGEM2-ES']
+    time_period, rcp = scenario['time_period'], scenario['rcp']
+    ensemble = core.ensemble_potential(shapefile, time_period, climate_models, rcp, 'Irr', 'High', 'Total', region)
+
+    cropland, marginal = [], []
+    for climate_model in climate_models:
+        dataset = core.future_potential_cropland(time_period, climate_model, rcp, 'Irr', 'High', shapefile, 'Total',
+                                                 region)
+        total, final_potential, marginal_dataset = core.get_biomass_potential_for_marginal(
+            shapefile, time_period, climate_model, rcp, 'Irr', 'High', region)
+        cropland.append(dataset['Combined'].values)
+        marginal.append(final_potential[0])
+        assert ensemble['cropland_pj'].sel(climate_model=climate_model) == pytest.approx(
+            dataset.attrs['net_sum in PJ'], rel=1e-5)
+        assert ensemble['marginal_pj'].sel(climate_model=climate_model) == pytest.approx(total, rel=1e-5)
+
+    # best_crop is encoded as the max_crops of a single model
+    for attr in ('flag_values', 'flag_meanings', 'no_crop_value'):
+        np.testing.assert_array_equal(ensemble['best_crop'].attrs[attr], marginal_dataset['max_crops'].attrs[attr])
+
+    inside = region.mask
+    for name, layers in (('cropland', np.stack(cropland)), ('marginal', np.stack(marginal))):
+        for statistic, expected in (('mean', layers.mean(axis=0)), ('std', layers.std(axis=0)),
+                                    ('min', layers.min(axis=0)), ('max', layers.max(axis=0))):
+            values = ensemble[f'{name}_{statistic}'].values
+            assert np.isnan(values[~inside]).all()
+            np.testing.assert_allclose(values[inside], expected[inside], rtol=1e-4, atol=1e-9)
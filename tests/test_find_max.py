@@ -0,0 +1,92 @@
+"""find_max_for_each_pixel against the crop by crop and residue by residue loop it replaced."""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.mask import mask
+
+import bepmat_core as core
+
+
+def variable_name(crop):
+    return crop.replace(" ", "_").replace("-", "_").replace("(", "").replace(")", "").replace(",", "")
+
+
+# The energy of every crop and the best crop of every pixel as computed before the crops were stacked, the excluded
+# pixels being given as a boolean mask instead of a table of rows and columns
+def reference_find_max(scenario, shapefile, excluded_pixels):
+    potential_yield = core.potential_yield
+    required_potential_yields = potential_yield[(potential_yield['Time Period'] == scenario['time_period']) &
+                                                (potential_yield['Climate Model'] == scenario['climate_model']) &
+                                                (potential_yield['RCP'] == scenario['rcp']) &
+                                                (potential_yield['Water Supply'] == scenario['water_supply_future']) &
+                                                (potential_yield['Input Level'] == scenario['input_level'])]
+
+    crop_residue_sum_dict = {}
+    max_values = None
+    max_crops = None
+    for crop in potential_yield['Crop'].unique():
+        raster_path = required_potential_yields[required_potential_yields['Crop'] == crop]['Download URL'].values[0].strip()
+        with rasterio.open(raster_path) as src:
+            clipped, _ = mask(src, shapefile.geometry, crop=True)
+        data = np.where(excluded_pixels, np.nan, clipped[0])
+
+        residue_rows = core.all_residue_values.loc[core.all_residue_values['Crop'] == crop]
+        crop_residue_sum_array = np.zeros_like(data)
+        for _, residue_row in residue_rows.iterrows():
+            data_final = data * residue_row['LHV (MJ/kg)'] * residue_row['SAF'] * residue_row['RPR']
+            data_final = np.nan_to_num(data_final, nan=0)
+            crop_residue_sum_array += data_final * (data_final >= 0)
+        crop_residue_sum_dict[crop] = crop_residue_sum_array
+
+        if max_values is None:
+            max_values = crop_residue_sum_array.copy()
+            max_crops = np.full(data.shape, crop, dtype=object)
+        else:
+            max_mask = crop_residue_sum_array > max_values
+            max_values[max_mask] = crop_residue_sum_array[max_mask]
+            max_crops[max_mask] = crop
+    return crop_residue_sum_dict, max_values, max_crops
+
+
+@pytest.mark.parametrize('rcp', ['RCP2.6', 'RCP4.5'])
+def test_matches_the_crop_by_crop_loop(scenario, shapefile, region, rcp):
+    scenario = dict(scenario, rcp=rcp)
+    excluded_pixels = core.build_exclusion_mask(region, scenario['time_period'], rcp)
+    assert excluded_pixels.any() and not excluded_pixels.all()
+
+    dataset = core.find_max_for_each_pixel(scenario['time_period'], scenario['climate_model'], rcp,
+                                           scenario['water_supply_future'], scenario['input_level'], shapefile,
+                                           excluded_pixels, region)
+    crop_residue_sums, max_values, max_crops = reference_find_max(scenario, shapefile, excluded_pixels)
+
+    crop_names = list(dataset['crop_names'].values)
+    assert crop_names == list(crop_residue_sums)
+    for crop, expected in crop_residue_sums.items():
+        np.testing.assert_allclose(dataset[variable_name(crop)].values, expected, rtol=1e-5, atol=1e-6)
+
+    np.testing.assert_allclose(dataset['max_values'].values, max_values, rtol=1e-5, atol=1e-6)
+    assert dataset.attrs['net_sum'] == pytest.approx(np.nansum(max_values), rel=1e-5)
+
+    # The pixels without any energy have no crop (-1) instead of the first crop
+    best_crops = dataset['max_crops'].values
+    has_energy = max_values > 0
+    assert has_energy.any()
+    assert (best_crops[~has_energy] == -1).all()
+    np.testing.assert_array_equal(np.array(crop_names, dtype=object)[best_crops[has_energy]], max_crops[has_energy])
+    assert dataset['max_crops'].attrs['flag_meanings'] == ' '.join(variable_name(crop) for crop in crop_names)
+    np.testing.assert_array_equal(dataset['max_crops'].attrs['flag_values'], np.arange(len(crop_names)))
+
+
+def test_lazy_matches_eager(scenario, shapefile, region):
+    pytest.importorskip('dask')
+    excluded_pixels = core.build_exclusion_mask(region, scenario['time_period'], scenario['rcp'])
+    args = (scenario['time_period'], scenario['climate_model'], scenario['rcp'], scenario['water_supply_future'],
+            scenario['input_level'], shapefile, excluded_pixels, region)
+
+    eager = core.find_max_for_each_pixel(*args)
+    lazy = core.find_max_for_each_pixel(*args, lazy=True).compute()
+    for name in ('max_values', 'max_crops', 'Maize'):
+        np.testing.assert_allclose(lazy[name].values, eager[name].values, rtol=1e-6)
+    assert float(lazy.attrs['net_sum']) == pytest.approx(eager.attrs['net_sum'], rel=1e-6)
+    assert lazy['max_crops'].attrs['flag_meanings'] == eager['max_crops'].attrs['flag_meanings']
@@ -0,0 +1,40 @@
+"""Streaming totals of the marginal land, against the arrays of get_biomass_potential_for_marginal."""
+
+import numpy as np
+import pytest
+
+import bepmat_core as core
+
+
+@pytest.mark.parametrize('rcp', ['RCP2.6', 'RCP4.5'])
+def test_total_matches_the_arrays(scenario, shapefile, region, rcp):
+    args = (shapefile, scenario['time_period'], scenario['climate_model'], rcp, scenario['water_supply_future'],
+            scenario['input_level'])
+    total, final_potential, dataset = core.get_biomass_potential_for_marginal(*args, region)
+
+    assert core.marginal_potential_totals(*args, region) == pytest.approx(np.nansum(final_potential), rel=1e-5)
+    assert total == pytest.approx(np.nansum(final_potential))
+
+    # The potential of every crop is the sum over the pixels where it gives the most energy
+    crop_potentials = core.marginal_potential_totals(*args, region, per_crop=True)
+    assert list(crop_potentials.index) == list(dataset['crop_names'].values)
+    assert crop_potentials.sum() == pytest.approx(total, rel=1e-5)
+    max_crops = dataset['max_crops'].values
+    for i, crop in enumerate(crop_potentials.index):
+        assert crop_potentials[crop] == pytest.approx(np.nansum(final_potential[0][max_crops == i]), rel=1e-5,
+                                                      abs=1e-9)
+
+
+def test_totals_only_sweep_matches_the_full_sweep(scenario, region):
+    sweep = {'climate_models': scenario['climate_model'], 'rcps': ['RCP2.6', 'RCP4.5'],
+             'time_periods': [scenario['time_period']], 'water_supply_future': 'Irr', 'max_workers': 1}
+    full = core.run_scenarios(region, **sweep)
+    totals = core.run_scenarios(region, totals_only=True, **sweep)
+
+    for year in ('2000', '2010'):
+        assert totals['cropland'][year].sum() == pytest.approx(full['cropland'][year].attrs['Net Potential in PetaJ'],
+                                                               rel=1e-6)
+    for key, total in full['total'].items():
+        assert totals['cropland'][key].sum() == pytest.approx(full['cropland'][key].attrs['net_sum in PJ'], rel=1e-6)
+        assert totals['marginal'][key] == pytest.approx(np.nansum(full['marginal_arrays'][key]), rel=1e-5)
+        assert totals['total'][key] == pytest.approx(total.attrs['net_energy_potential'], rel=1e-5)
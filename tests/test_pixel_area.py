@@ -0,0 +1,89 @@
+"""Area of the pixels, against the per pixel loop of extract_pixel_area and the area of the globe."""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.mask import mask
+from rasterio.transform import from_origin
+
+import bepmat_core as core
+
+
+# The cosine of latitude area of every pixel of a clipped raster, computed one pixel at a time
+def reference_pixel_area(raster_path, shapefile):
+    with rasterio.open(raster_path) as src:
+        clipped_data, clipped_transform = mask(src, shapefile.geometry, crop=True)
+        nodata = src.nodata
+
+    pixel_width = clipped_transform[0]
+    pixel_height = clipped_transform[4]
+    pixel_area = np.zeros_like(clipped_data, dtype=np.float32)
+    for band in range(clipped_data.shape[0]):
+        for row in range(clipped_data.shape[1]):
+            for col in range(clipped_data.shape[2]):
+                if clipped_data[band, row, col] != nodata:
+                    lat = rasterio.transform.xy(clipped_transform, row, col, offset='center')[1]
+                    pixel_area[band, row, col] = (np.abs(pixel_width * pixel_height * (111319.9)**2) *
+                                                  np.cos(np.radians(lat))) / 10000
+    return pixel_area
+
+
+def test_matches_the_per_pixel_loop(shapefile):
+    raster_path = core.potential_yield['Download URL'].iloc[0].strip()
+    expected = reference_pixel_area(raster_path, shapefile)
+
+    pixel_area = core.extract_pixel_area(raster_path, shapefile)
+    assert pixel_area.shape == expected.shape
+    np.testing.assert_allclose(pixel_area, expected, rtol=1e-6)
+
+
+@pytest.mark.parametrize('top', [60.0, 2.0, -30.0])
+def test_row_areas(top):
+    transform = from_origin(10.0, top, 1 / 12, 1 / 12)
+    height = 48
+    row_area = core.pixel_area_per_row(transform, height)
+    assert row_area.dtype == np.float32
+
+    expected = [np.abs(transform[0] * transform[4] * (111319.9)**2) *
+                np.cos(np.radians(rasterio.transform.xy(transform, row, 0, offset='center')[1])) / 10000
+                for row in range(height)]
+    np.testing.assert_allclose(row_area, expected, rtol=1e-6)
+    assert core.pixel_area_per_row(transform, height) is row_area
+
+
+# Summed over the whole globe the rows give the area of the sphere of the same area as the WGS84 ellipsoid, and of
+# the ellipsoid itself, in hectares
+@pytest.mark.parametrize('method', ['spherical', 'ellipsoidal'])
+def test_global_area(method):
+    transform = from_origin(-180.0, 90.0, 1.0, 1.0)
+    global_area = core.pixel_area_per_row(transform, 180, method).astype('float64').sum() * 360
+    assert global_area == pytest.approx(4 * np.pi * core.earth_authalic_radius**2 / 10000, rel=1e-6)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        core.pixel_area_per_row(from_origin(0.0, 10.0, 1.0, 1.0), 10, 'planar')
+
+
+
+# The area of the region grid leaves out the pixels where the reference raster has no data, as extract_pixel_area
+def test_region_grid_matches_extract_pixel_area(shapefile, tmp_path):
+    with rasterio.open(core.catalog.reference_raster) as src:
+        profile = src.profile
+        data = src.read()
+    # A lake in the middle of the region
+    data[:, 30:36, 30:40] = profile['nodata']
+    reference_raster = str(tmp_path / 'reference.tif')
+    with rasterio.open(reference_raster, 'w', **profile) as dst:
+        dst.write(data)
+
+    region = core.RegionGrid(shapefile, reference_raster)
+    expected = core.extract_pixel_area(reference_raster, shapefile)
+    assert region.pixel_area.shape == expected.shape
+    np.testing.assert_allclose(region.pixel_area, expected, rtol=1e-6)
+
+    with rasterio.open(reference_raster) as src:
+        clipped_data, _ = region.read(src)
+        lake = clipped_data[0] == src.nodata
+    assert (lake & region.mask).any()
+    assert (region.pixel_area[0][lake] == 0).all()
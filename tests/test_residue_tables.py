@@ -0,0 +1,53 @@
+"""User supplied residue tables, which must reach every cropland and marginal land pipeline."""
+
+import numpy as np
+import pytest
+
+import bepmat_core as core
+
+
+# Doubling the SAF of every residue doubles the energy factor of every crop
+@pytest.fixture
+def doubled_residues():
+    residue_table = core.all_residue_values.copy()
+    residue_table['SAF'] *= 2
+    return residue_table
+
+
+def test_energy_factors_of_a_table(doubled_residues):
+    crops = ['Maize', 'Wheat', 'Not a crop']
+    np.testing.assert_allclose(core.energy_factor_vector(crops, doubled_residues),
+                               2 * core.energy_factor_vector(crops, default_factors=core.all_residue_factors))
+    assert core.energy_factor_vector(crops, doubled_residues)[-1] == 0
+
+    with pytest.raises(ValueError):
+        core.energy_factor_vector(crops, doubled_residues.drop(columns='SAF'))
+
+
+def test_marginal_potential_uses_the_table(scenario, shapefile, region, doubled_residues):
+    args = (shapefile, scenario['time_period'], scenario['climate_model'], scenario['rcp'],
+            scenario['water_supply_future'], scenario['input_level'], region)
+    total, final_potential, dataset = core.get_biomass_potential_for_marginal(*args)
+    doubled_total, doubled_potential, doubled_dataset = core.get_biomass_potential_for_marginal(
+        *args, residue_table=doubled_residues)
+
+    assert doubled_total == pytest.approx(2 * total, rel=1e-5)
+    np.testing.assert_allclose(doubled_potential, 2 * final_potential, rtol=1e-5)
+    np.testing.assert_array_equal(doubled_dataset['max_crops'].values, dataset['max_crops'].values)
+
+
+def test_total_potential_uses_the_table(scenario, shapefile, region, doubled_residues):
+    args = (scenario['time_period'], scenario['climate_model'], scenario['rcp'], scenario['water_supply_future'],
+            scenario['input_level'])
+    total_dataset, cropland_dataset, _, marginal_array = core.get_total_biomass_potential(
+        shapefile, *args, scenario['water_supply_2010'], region, residue_table=doubled_residues)
+
+    cropland = core.future_potential_cropland(*args, shapefile, scenario['water_supply_2010'], region,
+                                              residue_table=doubled_residues)
+    marginal_total, _, _ = core.get_biomass_potential_for_marginal(shapefile, *args, region,
+                                                                   residue_table=doubled_residues)
+
+    assert cropland_dataset.attrs['net_sum in PJ'] == pytest.approx(cropland.attrs['net_sum in PJ'])
+    assert total_dataset.attrs['net_energy_potential'] == pytest.approx(
+        cropland.attrs['net_sum in PJ'] + marginal_total, rel=1e-6)
+    assert np.nansum(marginal_array) == pytest.approx(marginal_total, rel=1e-6)
@@ -0,0 +1,114 @@
+"""ResultStore round trips and sweeps resumed from a store."""
+
+import numpy as np
+import pytest
+import xarray as xr
+
+import bepmat_core as core
+
+
+@pytest.fixture
+def store(tmp_path):
+    return core.ResultStore(str(tmp_path))
+
+
+# Counting the scenarios computed by run_scenarios, which runs them in this process with max_workers=1
+@pytest.fixture
+def computed(monkeypatch):
+    tasks = []
+    run_scenario_task = core.run_scenario_task
+
+    def counting_task(task, *args, **kwargs):
+        tasks.append(task)
+        return run_scenario_task(task, *args, **kwargs)
+
+    monkeypatch.setattr(core, 'run_scenario_task', counting_task)
+    return tasks
+
+
+def test_cropland_round_trip(store, shapefile, region):
+    params = {'time_period': 2010, 'water_supply': 'Total'}
+    dataset = core.biomass_potential_past(shapefile, 2010, 'Total', region)
+
+    assert store.get(region, 'past', params) is None
+    assert store.net_potential(region, 'past', params) is None
+
+    store.put(region, 'past', params, dataset)
+    loaded = store.get(region, 'past', params)
+
+    xr.testing.assert_allclose(loaded.reset_coords(drop=True), dataset.reset_coords(drop=True))
+    assert loaded.attrs['Net Potential in PetaJ'] == pytest.approx(dataset.attrs['Net Potential in PetaJ'])
+    assert store.net_potential(region, 'past', params) == pytest.approx(dataset.attrs['Net Potential in PetaJ'])
+    assert store.get(region, 'past', dict(params, time_period=2000)) is None
+
+
+def test_marginal_round_trip(store, scenario, shapefile, region):
+    task = ('marginal', scenario['climate_model'], scenario['rcp'], scenario['time_period'])
+    params = core.scenario_params(task, 'Irr', 'High', 'Total')
+    result = core.get_biomass_potential_for_marginal(shapefile, scenario['time_period'], scenario['climate_model'],
+                                                     scenario['rcp'], 'Irr', 'High', region)
+
+    store.put(region, 'marginal', params, result)
+    total, final_potential, dataset = store.get(region, 'marginal', params)
+
+    assert total == pytest.approx(result[0])
+    np.testing.assert_allclose(final_potential, result[1])
+    np.testing.assert_array_equal(dataset['max_crops'].values, result[2]['max_crops'].values)
+    np.testing.assert_allclose(dataset['max_values'].values, result[2]['max_values'].values)
+    assert store.net_potential(region, 'marginal', params) == pytest.approx(result[0])
+
+    totals = store.totals(region)
+    assert list(totals['land_type']) == ['marginal']
+    assert totals['rcp'].iloc[0] == scenario['rcp']
+    assert totals['net_pj'].iloc[0] == pytest.approx(result[0])
+
+
+def test_resumed_run_skips_stored_scenarios(store, scenario, region, computed, monkeypatch):
+    sweep = {'climate_models': scenario['climate_model'], 'rcps': ['RCP2.6', 'RCP4.5'],
+             'time_periods': [scenario['time_period']], 'water_supply_future': 'Irr', 'max_workers': 1}
+    first = core.run_scenarios(region, store=store, **sweep)
+    assert len(computed) == 6
+
+    # Every scenario is in the store now, so none of them is computed again
+    computed.clear()
+    resumed = core.run_scenarios(region, store=store, **sweep)
+    assert computed == []
+
+    # The past cropland keeps its potential in 'Net Potential in PetaJ' and the future cropland in 'net_sum in PJ'
+    assert resumed['cropland'].keys() == first['cropland'].keys()
+    for key, dataset in first['cropland'].items():
+        xr.testing.assert_allclose(resumed['cropland'][key].reset_coords(drop=True), dataset.reset_coords(drop=True))
+    for key, total in first['total'].items():
+        assert resumed['total'][key].attrs['net_energy_potential'] == pytest.approx(
+            total.attrs['net_energy_potential'])
+        np.testing.assert_allclose(resumed['marginal_arrays'][key], first['marginal_arrays'][key])
+
+
+def test_partially_stored_run_computes_the_rest(store, scenario, region, computed):
+    sweep = {'climate_models': scenario['climate_model'], 'time_periods': [scenario['time_period']],
+             'water_supply_future': 'Irr', 'land_types': ('marginal',), 'max_workers': 1}
+    core.run_scenarios(region, rcps=['RCP2.6'], store=store, **sweep)
+
+    computed.clear()
+    results = core.run_scenarios(region, rcps=['RCP2.6', 'RCP4.5'], store=store, **sweep)
+
+    assert computed == [('marginal', scenario['climate_model'], 'RCP4.5', scenario['time_period'])]
+    assert set(results['marginal']) == {('RCP2.6', scenario['time_period']), ('RCP4.5', scenario['time_period'])}
+
+
+# The store keeps per pixel Datasets, which a totals_only sweep does not compute: an explicit store is rejected and
+# the default store is neither read nor written
+def test_totals_only_run_does_not_use_the_store(store, scenario, region, monkeypatch):
+    key = ('RCP4.5', scenario['time_period'])
+    sweep = {'climate_models': scenario['climate_model'], 'rcps': ['RCP4.5'], 'time_periods': [scenario['time_period']],
+             'water_supply_future': 'Irr', 'land_types': ('marginal',), 'max_workers': 1}
+    with pytest.raises(ValueError, match='totals_only'):
+        core.run_scenarios(region, store=store, totals_only=True, **sweep)
+
+    full = core.run_scenarios(region, store=store, **sweep)
+    monkeypatch.setattr(core, 'result_store', store)
+    totals = core.run_scenarios(region, totals_only=True, **sweep)
+
+    assert np.ndim(totals['marginal'][key]) == 0
+    assert totals['marginal'][key] == pytest.approx(np.nansum(full['marginal_arrays'][key]), rel=1e-5)
+    assert len(store.totals()) == 1
@@ -0,0 +1,173 @@
+"""The HTTP service on the synthetic dataset, with the region in an offline boundary store."""
+
+import asyncio
+import threading
+from http import HTTPStatus
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bepmat_core as core
+import bepmat_service as service_module
+
+
+
+@pytest.fixture
+def boundaries(shapefile, tmp_path, monkeypatch):
+    store = core.BoundaryStore(str(tmp_path / 'boundaries'), offline=True)
+    store.add_boundaries(shapefile.assign(COUNTRY='Test'), 0)
+    monkeypatch.setattr(core, 'boundary_store', store, raising=False)
+    return store
+
+
+@pytest.fixture
+def query(boundaries, scenario):
+    return service_module.parse_query({'country': 'Test', 'time_period': scenario['time_period'],
+                                       'climate_model': scenario['climate_model'], 'rcp': scenario['rcp'],
+                                       'water_supply_future': scenario['water_supply_future']})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return core.ResultStore(str(tmp_path / 'store'))
+
+
+# The computations wait for the gate to open, counting the scenarios they were started for
+@pytest.fixture
+def gate(monkeypatch):
+    gate = threading.Event()
+    gate.started = []
+
+    def gated_compute_potential(query, store_dir):
+        gate.started.append(query)
+        if not gate.wait(timeout=30):
+            raise TimeoutError("The gate was never opened")
+        return service_module.potential_response(query, 1.0, 2.0)
+
+    monkeypatch.setattr(service_module, 'compute_potential', gated_compute_potential)
+    yield gate
+    gate.set()
+
+
+def target(query, **changes):
+    return '/potential?' + urlencode({key: value for key, value in dict(query, **changes).items() if value is not None})
+
+
+# The response of the service to a request from a client which stays connected
+def respond(service, method, url):
+    return service.respond(method, url, asyncio.StreamReader())
+
+
+async def wait_for(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError("The service never reached the expected state")
+
+
+async def run_service(store, max_queue, scenario):
+    service = service_module.PotentialService(store, max_workers=1, max_queue=max_queue)
+    service.start(ThreadPoolExecutor(max_workers=1))
+    try:
+        return await scenario(service)
+    finally:
+        await service.close()
+
+
+def test_parse_query(scenario):
+    params = {'country': 'India', 'time_period': scenario['time_period'], 'climate_model': scenario['climate_model'],
+              'rcp': scenario['rcp'], 'water_supply_future': 'Irr'}
+    assert service_module.parse_query(params) == dict(params, province=None, input_level='High',
+                                                      water_supply_2010='Total')
+
+    for params, message in ((dict(params, crop='Maize'), 'Unknown query parameters: crop'),
+                            ({key: value for key, value in params.items() if key != 'rcp'},
+                             'Missing query parameters: rcp'),
+                            (dict(params, rcp='RCP9.9'), 'Unknown RCP RCP9.9'),
+                            (dict(params, time_period='2101-2130'), 'Unknown time period 2101-2130')):
+        with pytest.raises(ValueError, match=message):
+            service_module.parse_query(params)
+
+
+def test_bad_requests(store, query):
+    async def scenario(service):
+        status, body = await respond(service, 'GET', '/potential?country=Test')
+        assert status == HTTPStatus.BAD_REQUEST and 'Missing query parameters' in body['error']
+        status, _ = await respond(service, 'GET', '/nothing')
+        assert status == HTTPStatus.NOT_FOUND
+        status, _ = await respond(service, 'POST', target(query))
+        assert status == HTTPStatus.METHOD_NOT_ALLOWED
+
+    asyncio.run(run_service(store, 4, scenario))
+
+
+# A scenario computed once is answered from the index of the store, without starting a computation
+def test_answer_from_the_store(store, query, monkeypatch):
+    computed = service_module.compute_potential(query, store.store_dir)
+    assert computed['total_pj'] == pytest.approx(computed['cropland_pj'] + computed['marginal_pj'])
+
+    monkeypatch.setattr(service_module, 'compute_potential', None)
+    status, body = asyncio.run(run_service(store, 4, lambda service: respond(service, 'GET', target(query))))
+    assert status == HTTPStatus.OK
+    assert body == dict(computed, source='store')
+
+
+def test_identical_requests_share_a_computation(store, query, gate):
+    async def scenario(service):
+        first = asyncio.ensure_future(service.potential(query))
+        await wait_for(lambda: gate.started)
+        second = asyncio.ensure_future(service.potential(dict(query)))
+        await wait_for(lambda: service.jobs and next(iter(service.jobs.values())).waiters == 2)
+        gate.set()
+        return await asyncio.gather(first, second)
+
+    first, second = asyncio.run(run_service(store, 4, scenario))
+    assert len(gate.started) == 1
+    assert first['source'] == 'computed' and second['source'] == 'coalesced'
+    assert dict(first, source=None) == dict(second, source=None)
+
+
+# With one worker busy and one scenario queued, a third scenario is refused
+def test_full_queue(store, query, gate):
+    async def scenario(service):
+        running = asyncio.ensure_future(service.potential(query))
+        await wait_for(lambda: gate.started)
+        queued = asyncio.ensure_future(service.potential(dict(query, input_level='Low')))
+        await wait_for(lambda: service.queued() == 1)
+
+        status, body = await respond(service, 'GET', target(query, rcp='RCP2.6'))
+        assert status == HTTPStatus.SERVICE_UNAVAILABLE
+        assert '1 scenarios are already queued' in body['error']
+
+        gate.set()
+        return await asyncio.gather(running, queued)
+
+    results = asyncio.run(run_service(store, 1, scenario))
+    assert [result['source'] for result in results] == ['computed', 'computed']
+    assert len(gate.started) == 2
+
+
+def test_delete_cancels_a_queued_scenario(store, query, gate):
+    queued_query = dict(query, input_level='Low')
+
+    async def scenario(service):
+        running = asyncio.ensure_future(service.potential(query))
+        await wait_for(lambda: gate.started)
+        waiting = asyncio.ensure_future(respond(service, 'GET', target(queued_query)))
+        await wait_for(lambda: service.queued() == 1)
+        assert (await service.respond('GET', '/jobs', None))[1]['jobs'][1]['state'] == 'queued'
+
+        assert (await respond(service, 'DELETE', target(query)))[0] == HTTPStatus.CONFLICT
+        status, body = await respond(service, 'DELETE', target(queued_query))
+        assert status == HTTPStatus.OK and body['state'] == 'cancelled'
+        status, body = await waiting
+        assert status == HTTPStatus.CONFLICT and body['error'] == 'The scenario was cancelled'
+        assert (await respond(service, 'DELETE', target(queued_query)))[0] == HTTPStatus.NOT_FOUND
+
+        gate.set()
+        return await running
+
+    assert asyncio.run(run_service(store, 4, scenario))['source'] == 'computed'
+    assert gate.started == [query]